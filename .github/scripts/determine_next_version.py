@@ -1,8 +1,13 @@
+import argparse
 import os
 import subprocess
 import semver
 import sys
 
+# Shared helpers live in the repository's scripts/ directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scripts"))
+from tracing import add_trace_arguments, span, trace_from_args # noqa: E402
+
 def get_tags():
     try:
         result = subprocess.run(['git', 'tag', '-l', 'v*', '--sort=v:refname'], capture_output=True, text=True, check=True)
@@ -50,14 +55,27 @@ def get_latest_prerelease_for_base(tags, base_version, token):
             continue
     return latest_prerelease_v
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compute the next release version from BUMP_TYPE and the v* git tags.")
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    # The workflow parses the ::set-output lines on stdout, so the trace is reported on stderr.
+    with trace_from_args(args, "determine_next_version", file=sys.stderr):
+        determine_next_version()
+
+def determine_next_version():
     bump_type = os.environ.get('BUMP_TYPE')
     if not bump_type:
         print("Error: BUMP_TYPE environment variable not set.", file=sys.stderr)
         sys.exit(1)
 
-    tags = get_tags()
-    latest_v = get_latest_semver(tags)
+    with span("list tags", "git"):
+        tags = get_tags()
+    with span("find latest semver", "version", tags=len(tags)):
+        latest_v = get_latest_semver(tags)
 
     next_v_str = ""
     is_prerelease = "true"
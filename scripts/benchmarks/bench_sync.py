@@ -0,0 +1,296 @@
+"""Benchmarks sync_sdl3.py and update_tools.py against a local stand-in GitHub server.
+
+Each scenario runs the real scripts in a throwaway workspace (a copy of scripts/ plus
+stub SDL3-CS .csproj files) with NIGHT_GITHUB_API_URL pointed at the stand-in server and
+NIGHT_CACHE_DIR pointed at a scratch cache:
+
+  cold         fresh workspace, empty cache
+  no-change    the cold workspace and cache again; nothing should be downloaded
+  warm-cache   fresh workspace, the cold run's cache
+
+Every run is a separate process, so its wall time includes interpreter start-up and its
+peak RSS is its own. Results are compared to a stored baseline and the benchmark exits
+non-zero when wall time or peak RSS regresses by more than --tolerance.
+
+  python scripts/benchmarks/bench_sync.py                  # compare against baseline.json
+  python scripts/benchmarks/bench_sync.py --update-baseline
+  python scripts/benchmarks/bench_sync.py --latency 0.05 --failure-rate 0.1
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+# Only lightweight stdlib-backed imports here: Linux carries a parent's RSS high-water
+# mark into the children it spawns, so a heavy benchmark process would inflate peak RSS.
+from download_cache import parse_size # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_TOLERANCE = 0.5
+SCENARIOS = ("cold", "no-change", "warm-cache")
+# Metrics checked against the baseline; lower is better for both.
+REGRESSION_METRICS = ("wall_seconds", "peak_rss_kib")
+
+CSPROJ_TEMPLATE = """<Project Sdk="Microsoft.NET.Sdk">
+  <PropertyGroup Label="NuGet">
+    <Version>{version}.0</Version>
+  </PropertyGroup>
+</Project>
+"""
+
+class StandInServer:
+    """Runs stand_in_github.py in its own process, so its in-memory zips stay out of ours."""
+
+    def __init__(self, args):
+        command = [sys.executable, os.path.join(BENCH_DIR, "stand_in_github.py"),
+                   "--asset-size", str(args.asset_size), "--members", str(args.members),
+                   "--latency", str(args.latency), "--failure-rate", str(args.failure_rate), "--seed", str(args.seed)]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        line = self._process.stdout.readline()
+        if not line:
+            self.close()
+            raise RuntimeError("Stand-in GitHub server failed to start.")
+        started = json.loads(line)
+        self.url = started["url"]
+        self.layout = started["layout"]
+
+    def stats(self):
+        with urllib.request.urlopen(f"{self.url}/_stats", timeout=10) as response:
+            return json.load(response)
+
+    def close(self):
+        self._process.stdin.close()
+        self._process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def create_workspace(root, layout):
+    """Creates a repo-shaped workspace under root: a copy of scripts/ and stub csproj files."""
+    scripts_dir = os.path.join(root, "scripts")
+    os.makedirs(scripts_dir)
+    for path in glob.glob(os.path.join(SCRIPTS_DIR, "*.py")):
+        shutil.copy2(path, scripts_dir)
+    for relative_path, version in layout["csproj"].items():
+        csproj_path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(csproj_path), exist_ok=True)
+        with open(csproj_path, "w", encoding="utf-8") as f:
+            f.write(CSPROJ_TEMPLATE.format(version=version))
+    return root
+
+def run_script(workspace, script, args, env, log_path):
+    """Runs one script to completion, returning (wall_seconds, peak_rss_kib, exit_code).
+
+    Peak RSS comes from the child's own rusage and is None where os.wait4 is unavailable.
+    """
+    command = [sys.executable, os.path.join(workspace, "scripts", script), *args]
+    with open(log_path, "ab") as log:
+        log.write(f"$ {' '.join(command)}\n".encode("utf-8"))
+        log.flush()
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workspace, env=env, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is KiB on Linux and bytes on macOS.
+            peak_rss = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+        else:
+            process.wait()
+            wall = time.perf_counter() - start
+            peak_rss = None
+    return wall, peak_rss, process.returncode
+
+def check_outputs(workspace, script, layout):
+    """Returns a list of problems with what a script left in the workspace."""
+    problems = []
+    if script == "sync_sdl3.py":
+        for relative_path in layout["libraries"]:
+            if not os.path.isfile(os.path.join(workspace, relative_path)):
+                problems.append(f"missing {relative_path}")
+        return problems
+
+    tool = layout["tool"]
+    for platform_key in tool["platforms"]:
+        platform_dir = os.path.join(workspace, "tools", tool["name"], platform_key)
+        if not os.path.isdir(platform_dir) or not os.listdir(platform_dir):
+            problems.append(f"nothing extracted for {platform_key}")
+    try:
+        with open(os.path.join(workspace, "tools", "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get(tool["name"], {}).get("version") != tool["version"]:
+        problems.append("manifest not updated")
+    return problems
+
+SCRIPT_ARGS = {
+    "sync_sdl3.py": ["--platform", "all"],
+    "update_tools.py": [],
+}
+
+def measure(server, workspace, cache_dir, script, scenario, log_path):
+    env = dict(os.environ, NIGHT_GITHUB_API_URL=server.url, NIGHT_CACHE_DIR=cache_dir)
+    for name in ("GITHUB_TOKEN", "GH_TOKEN"):
+        env.pop(name, None)
+    before = server.stats()
+    wall, peak_rss, exit_code = run_script(workspace, script, SCRIPT_ARGS[script], env, log_path)
+    after = server.stats()
+    transferred = after["bytes_sent"] - before["bytes_sent"]
+    problems = [] if exit_code == 0 else [f"exit code {exit_code}"]
+    problems += check_outputs(workspace, script, server.layout)
+    return {
+        "script": script,
+        "scenario": scenario,
+        "wall_seconds": wall,
+        "peak_rss_kib": peak_rss,
+        "bytes": transferred,
+        "bytes_per_second": transferred / wall if wall else 0.0,
+        "requests": after["requests"] - before["requests"],
+        "problems": problems,
+    }
+
+def run_round(server, scratch, round_index, log_path):
+    """Runs every scenario once for both scripts and returns the measurements."""
+    results = []
+    for script in SCRIPT_ARGS:
+        base = os.path.join(scratch, f"{round_index}-{script[:-len('.py')]}")
+        cache_dir = os.path.join(base, "cache")
+        cold_workspace = create_workspace(os.path.join(base, "cold"), server.layout)
+        results.append(measure(server, cold_workspace, cache_dir, script, "cold", log_path))
+        results.append(measure(server, cold_workspace, cache_dir, script, "no-change", log_path))
+        warm_workspace = create_workspace(os.path.join(base, "warm"), server.layout)
+        results.append(measure(server, warm_workspace, cache_dir, script, "warm-cache", log_path))
+        shutil.rmtree(base, ignore_errors=True)
+    return results
+
+def summarise(rounds):
+    """Collapses repeated rounds into one result per (script, scenario) using the median."""
+    summary = {}
+    for results in zip(*rounds):
+        first = results[0]
+        key = f"{first['script'][:-len('.py')]}/{first['scenario']}"
+        entry = {"bytes": first["bytes"], "requests": first["requests"]}
+        for metric in ("wall_seconds", "peak_rss_kib", "bytes_per_second"):
+            values = [result[metric] for result in results if result[metric] is not None]
+            entry[metric] = statistics.median(values) if values else None
+        entry["problems"] = sorted({problem for result in results for problem in result["problems"]})
+        summary[key] = entry
+    return summary
+
+def find_regressions(summary, baseline, tolerance):
+    """Returns human-readable regressions of summary against baseline."""
+    regressions = []
+    for key, entry in summary.items():
+        expected = baseline.get("results", {}).get(key)
+        if not expected:
+            continue
+        for metric in REGRESSION_METRICS:
+            if entry.get(metric) is None or not expected.get(metric):
+                continue
+            limit = expected[metric] * (1 + tolerance)
+            if entry[metric] > limit:
+                regressions.append(f"{key} {metric}: {entry[metric]:.2f} > {limit:.2f} "
+                                   f"(baseline {expected[metric]:.2f} + {tolerance:.0%})")
+    return regressions
+
+def print_summary(summary):
+    print(f"{'run':<28} {'wall s':>8} {'peak RSS MiB':>13} {'MiB/s':>8} {'MiB':>8} {'reqs':>5}")
+    for key, entry in summary.items():
+        rss = f"{entry['peak_rss_kib'] / 1024:.1f}" if entry["peak_rss_kib"] is not None else "n/a"
+        print(f"{key:<28} {entry['wall_seconds']:>8.2f} {rss:>13} {entry['bytes_per_second'] / 2**20:>8.1f} "
+              f"{entry['bytes'] / 2**20:>8.1f} {entry['requests']:>5}")
+        for problem in entry["problems"]:
+            print(f"  ! {problem}")
+
+def parse_args(argv=None):
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the sync scripts against a local stand-in GitHub server.")
+    parser.add_argument("--asset-size", type=parse_size, default=parse_size("2M"),
+                        help="Payload bytes per synthetic release zip, e.g. 512K or 8M (default: 2M).")
+    parser.add_argument("--members", type=int, default=32,
+                        help="Files per synthetic release zip (default: 32).")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds of latency added to every response (default: 0).")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Probability that an asset download fails with a 503 or a dropped connection (default: 0).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for injected failures (default: 0).")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Rounds to run; each metric reports the median (default: 3).")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Baseline results file (default: scripts/benchmarks/baseline.json).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed slowdown or RSS growth over the baseline as a fraction (default: {DEFAULT_TOLERANCE}).")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write this run's results as the new baseline instead of comparing.")
+    parser.add_argument("--output", default=None, help="Also write this run's results to a JSON file.")
+    parser.add_argument("--keep-logs", default=None, metavar="LOG",
+                        help="Keep the scripts' combined output in this file (default: discarded).")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if not 0 <= args.failure_rate < 1:
+        parser.error("--failure-rate must be in [0, 1)")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="night-bench-") as scratch, StandInServer(args) as server:
+        log_path = args.keep_logs or os.path.join(scratch, "scripts.log")
+        print(f"Stand-in GitHub at {server.url}; {args.repeat} round(s) of {len(SCENARIOS)} scenario(s) per script...")
+        rounds = [run_round(server, scratch, round_index, log_path) for round_index in range(args.repeat)]
+        injected = server.stats()["failures_injected"]
+
+    summary = summarise(rounds)
+    print_summary(summary)
+    if injected:
+        print(f"Injected {injected} download failure(s).")
+    settings = {"asset_size": args.asset_size, "members": args.members, "latency": args.latency,
+                "failure_rate": args.failure_rate}
+    document = {"settings": settings, "repeat": args.repeat, "python": sys.version.split()[0], "platform": sys.platform,
+                "results": summary}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    if any(entry["problems"] for entry in summary.values()):
+        print("Benchmark failed: some runs did not produce the expected files.")
+        return 1
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings:
+        print("Warning: baseline was recorded with different settings; comparison may not be meaningful.")
+    regressions = find_regressions(summary, baseline, args.tolerance)
+    if regressions:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print("No regressions against the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""A local HTTP server that imitates the parts of GitHub the sync scripts use.
+
+It serves the releases API (release by tag, the paginated release listing and the
+latest release) and the release asset downloads, with ETag and Range support so the
+conditional-request, resume and Range-member code paths behave as they do against
+GitHub. Latency and failures can be injected to exercise the retry logic.
+
+Point the scripts at it with NIGHT_GITHUB_API_URL=<server.url>. Run as a script it
+registers synthetic SDL and crunch releases, prints {"url", "layout"} as one JSON line
+and serves until stdin closes; GET /_stats returns the transfer counters.
+"""
+import argparse
+import hashlib
+import http.server
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zipfile
+from urllib.parse import quote, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RELEASES_PER_PAGE = 100
+# Versions the synthetic releases (and the benchmark's stub .csproj files) use.
+LIBRARY_VERSIONS = {
+    "sdl3-core": "3.2.16",
+    "sdl2_mixer": "3.0.0",
+    "sdl3_ttf": "3.2.2",
+    "sdl3_image": "3.2.4",
+}
+TOOL_VERSION = "v0.12.0"
+TOOL_ASSETS = ("crunch-linux.zip", "crunch-macos.zip", "crunch-windows.zip")
+
+def build_zip(root, members, payload_size, seed, library_member=None):
+    """Builds a deterministic synthetic release zip.
+
+    library_member (a path inside root) receives payload_size incompressible bytes and the
+    remaining members are small headers, as in the real SDL archives. Without
+    library_member the payload is split evenly across all members.
+    """
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        filler_count = max(0, members - 1) if library_member else members
+        filler_size = 2048 if library_member else max(1, payload_size // max(1, members))
+        for index in range(filler_count):
+            zf.writestr(f"{root}/include/file{index:04d}.h", rng.randbytes(filler_size))
+        if library_member:
+            zf.writestr(f"{root}/{library_member}", rng.randbytes(payload_size))
+    return buffer.getvalue()
+
+class StandInGitHub:
+    """Releases and assets served from memory by a background ThreadingHTTPServer.
+
+    add_release(owner, repo, tag, {asset_name: bytes}) registers a release; the newest
+    registered release of a repository is its "latest". latency (seconds) is added to
+    every response; failure_rate is the probability that an asset download fails, half the
+    time with a 503 and half the time by dropping the connection midway through the body.
+    Setting rate_limit makes API responses carry X-RateLimit-* headers counting down from
+    it; api_log records (path, status) for every API response.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._releases = {} # (owner, repo) -> [release, ...] newest first
+        self._assets = {} # download path -> (bytes, etag)
+        self.bytes_sent = 0
+        self.requests = 0
+        self.failures_injected = 0
+        self.rate_limit = None # Remaining API requests to report, or None for no X-RateLimit-* headers
+        self.rate_limit_reset = 0.0
+        self.api_log = []
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_release(self, owner, repo, tag, assets, draft=False):
+        """Registers a release with {asset_name: zip bytes}."""
+        release_assets = []
+        for name, data in assets.items():
+            path = f"/{owner}/{repo}/releases/download/{quote(tag)}/{quote(name)}"
+            digest = hashlib.sha256(data).hexdigest()
+            self._assets[path] = (data, f'"{digest[:16]}"')
+            release_assets.append({
+                "name": name,
+                "size": len(data),
+                "digest": f"sha256:{digest}",
+                "browser_download_url": path, # Made absolute once the server is running
+            })
+        release = {"tag_name": tag, "name": tag, "draft": draft, "prerelease": False, "assets": release_assets}
+        self._releases.setdefault((owner, repo), []).insert(0, release)
+        return release
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"stand_in": self})
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        for releases in self._releases.values():
+            for release in releases:
+                for asset in release["assets"]:
+                    if asset["browser_download_url"].startswith("/"):
+                        asset["browser_download_url"] = self.url + asset["browser_download_url"]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {"bytes_sent": self.bytes_sent, "requests": self.requests, "failures_injected": self.failures_injected}
+
+    def _count(self, sent):
+        with self._lock:
+            self.bytes_sent += sent
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                self.failures_injected += 1
+                return self._rng.choice(("503", "drop"))
+            return None
+
+    def release_json(self, owner, repo, tag=None, latest=False):
+        # Like GitHub, the by-tag and latest endpoints do not see draft releases; the listing does.
+        releases = [release for release in self._releases.get((owner, repo), []) if not release["draft"]]
+        if latest:
+            return releases[0] if releases else None
+        return next((release for release in releases if release["tag_name"] == tag), None)
+
+    def releases_page(self, owner, repo, page, per_page):
+        releases = self._releases.get((owner, repo), [])
+        start = (page - 1) * per_page
+        return releases[start:start + per_page], start + per_page < len(releases)
+
+def populate_releases(stand_in, asset_size, members, draft_libraries=()):
+    """Registers the SDL and crunch releases the sync scripts expect.
+
+    Releases for the libraries in draft_libraries are registered as drafts, which only
+    the paginated listing shows.
+
+    Returns the layout the benchmark needs to build a workspace and check the results:
+    {"csproj": {relative path: version}, "libraries": [relative path, ...], "tool": {...}}.
+    """
+    import sync_sdl3
+    import update_tools
+
+    layout = {"csproj": {}, "libraries": [], "tool": {"name": update_tools.TOOL_NAME, "version": TOOL_VERSION,
+                                                      "platforms": list(update_tools.PLATFORM_IDENTIFIERS)}}
+    seed = 0
+    for lib_key, lib_config in sync_sdl3.LIBRARIES_CONFIG.items():
+        version = LIBRARY_VERSIONS[lib_key]
+        layout["csproj"][lib_config["csproj_path"]] = version
+        assets = {}
+        for platform_key in sync_sdl3.PLATFORM_TAGS:
+            asset_name = sync_sdl3.get_expected_asset_name(lib_key, lib_config, platform_key, version)
+            lib_filename = lib_config["lib_files"][platform_key]
+            assets[asset_name] = build_zip(asset_name[:-len(".zip")], members, asset_size, seed, f"lib/{lib_filename}")
+            layout["libraries"].append(
+                sync_sdl3.get_installed_library_path(sync_sdl3.PREBUILT_SUBDIR, platform_key, lib_config))
+            seed += 1
+        stand_in.add_release(sync_sdl3.OWNER, sync_sdl3.REPO, lib_config["tag_prefix"] + version, assets,
+                             draft=lib_key in draft_libraries)
+
+    tool_assets = {}
+    for asset_name in TOOL_ASSETS:
+        tool_assets[asset_name] = build_zip(asset_name[:-len(".zip")], members, asset_size, seed)
+        seed += 1
+    owner, repo = update_tools.DEFAULT_TOOLS[update_tools.TOOL_NAME]["repo"].split("/")
+    stand_in.add_release(owner, repo, TOOL_VERSION, tool_assets)
+    return layout
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stand_in = None # Set per server by StandInGitHub.start()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.stand_in.latency:
+            time.sleep(self.stand_in.latency)
+        parsed = urlsplit(self.path)
+        path = parsed.path
+        if path == "/_stats":
+            self._send(200, json.dumps(self.stand_in.stats()).encode("utf-8"), {"Content-Type": "application/json"})
+            return
+        if path in self.stand_in._assets:
+            self._serve_asset(path)
+            return
+        with self.stand_in._lock: # API calls are counted but never failed
+            self.stand_in.requests += 1
+            if self.stand_in.rate_limit:
+                self.stand_in.rate_limit -= 1
+
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)/releases/tags/(.+)", path)
+        if match:
+            owner, repo, tag = match.group(1), match.group(2), unquote(match.group(3))
+            self._send_json(self.stand_in.release_json(owner, repo, tag))
+            return
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)/releases/latest", path)
+        if match:
+            self._send_json(self.stand_in.release_json(match.group(1), match.group(2), latest=True))
+            return
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)/releases", path)
+        if match:
+            query = dict(part.split("=", 1) for part in parsed.query.split("&") if "=" in part)
+            page = int(query.get("page", 1))
+            per_page = int(query.get("per_page", RELEASES_PER_PAGE))
+            releases, more = self.stand_in.releases_page(match.group(1), match.group(2), page, per_page)
+            link = None
+            if more:
+                link = f'<{self.stand_in.url}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+            self._send_json(releases, {"Link": link} if link else None)
+            return
+        self._send_json(None)
+
+    def _send_json(self, data, headers=None):
+        if data is None:
+            body = b'{"message": "Not Found"}'
+            status = 404
+        else:
+            body = json.dumps(data).encode("utf-8")
+            status = 200
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        headers = {"ETag": etag, **(headers or {})}
+        if self.stand_in.rate_limit is not None:
+            headers["X-RateLimit-Remaining"] = str(self.stand_in.rate_limit)
+            headers["X-RateLimit-Reset"] = str(int(self.stand_in.rate_limit_reset))
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        else:
+            headers["Content-Type"] = "application/json"
+        self.stand_in.api_log.append((urlsplit(self.path).path, status))
+        self._send(status, body, headers)
+
+    def _serve_asset(self, path):
+        data, etag = self.stand_in._assets[path]
+        failure = self.stand_in._should_fail()
+        if failure == "503":
+            self._send(503, b"", {"Retry-After": "0"})
+            return
+
+        start, end = 0, len(data) - 1
+        status = 200
+        headers = {"ETag": etag, "Accept-Ranges": "bytes", "Content-Type": "application/zip"}
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range") or "")
+        if_range = self.headers.get("If-Range")
+        if match and (if_range is None or if_range == etag):
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), end) if last else end
+            else:
+                start = max(0, len(data) - int(last))
+            if start >= len(data):
+                self._send(416, b"", {"Content-Range": f"bytes */{len(data)}"})
+                return
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+
+        body = data[start:end + 1]
+        if failure == "drop":
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            partial = body[:len(body) // 2]
+            self.wfile.write(partial)
+            self.stand_in._count(len(partial))
+            self.close_connection = True
+            return
+        self._send(status, body, headers)
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        self.stand_in._count(len(body))
+
+def parse_args(argv=None):
+    """Parses command line arguments."""
+    from download_cache import parse_size
+
+    parser = argparse.ArgumentParser(description="Serve synthetic SDL and crunch releases like GitHub does.")
+    parser.add_argument("--asset-size", type=parse_size, default=parse_size("2M"),
+                        help="Payload bytes per synthetic release zip, e.g. 512K or 8M (default: 2M).")
+    parser.add_argument("--members", type=int, default=32, help="Files per synthetic release zip (default: 32).")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds of latency added to every response (default: 0).")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Probability that an asset download fails (default: 0).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for injected failures (default: 0).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    stand_in = StandInGitHub(latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+    layout = populate_releases(stand_in, args.asset_size, args.members)
+    with stand_in:
+        print(json.dumps({"url": stand_in.url, "layout": layout}), flush=True)
+        sys.stdin.read() # Serve until the parent closes our stdin.
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Offline bundles of release metadata and assets, and a mirror source that serves them.
+
+A bundle is a tar archive (or a directory with the same layout) holding:
+
+    bundle.json             index of everything below, keyed by the original URL
+    metadata/<key>.json     GitHub API responses
+    assets/<key>/<name>     release asset files
+
+Export a bundle once per version change with --export-bundle, then point hermetic runs at
+it with --mirror (a bundle file, an unpacked bundle directory, or a file:// URL of either)
+to satisfy every metadata lookup and download without network access.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from release_metadata import DEFAULT_TIMEOUT, fetch_page
+
+BUNDLE_FORMAT = 1
+INDEX_NAME = "bundle.json"
+TAR_WRITE_MODES = {".tar": "w", ".tar.gz": "w:gz", ".tgz": "w:gz", ".tar.xz": "w:xz", ".tar.bz2": "w:bz2"}
+
+def _url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def _source_path(source):
+    """Turns a file:// URL into a local path; plain paths are returned unchanged."""
+    if source.startswith("file://"):
+        return url2pathname(urlparse(source).path)
+    return source
+
+def _empty_index():
+    return {"format": BUNDLE_FORMAT, "metadata": {}, "assets": {}}
+
+def _unpack_bundle(bundle_path, dest_dir):
+    with tarfile.open(bundle_path, "r:*") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(dest_dir, filter="data")
+        else:
+            tar.extractall(dest_dir)
+
+def _load_index(root):
+    with open(os.path.join(root, INDEX_NAME), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported bundle format {index.get('format')!r} in {root}")
+    return index
+
+class BundleWriter:
+    """Records metadata lookups and assets during a run and writes them out as a bundle.
+
+    Pass it wherever a metadata cache is accepted: lookups are delegated to
+    metadata_source (a MetadataCache, or None for plain requests) and recorded.
+    An existing bundle at path is merged in, so several scripts can export into one bundle.
+    """
+
+    def __init__(self, path, metadata_source=None):
+        self.path = path
+        self.metadata_source = metadata_source
+        self._staging = tempfile.TemporaryDirectory(prefix="night-bundle-")
+        self.root = self._staging.name
+        self._lock = threading.Lock()
+        self._index = _empty_index()
+        if os.path.exists(path):
+            self._merge_existing(path)
+
+    def _merge_existing(self, path):
+        if os.path.isdir(path):
+            shutil.copytree(path, self.root, dirs_exist_ok=True)
+        else:
+            _unpack_bundle(path, self.root)
+        self._index = _load_index(self.root)
+
+    def get_page(self, url, timeout=DEFAULT_TIMEOUT):
+        """Fetches (data, next_page_url) for a GitHub API URL and records it in the bundle."""
+        data, next_url = fetch_page(url, self.metadata_source, timeout)
+        rel_path = f"metadata/{_url_key(url)}.json"
+        os.makedirs(os.path.join(self.root, "metadata"), exist_ok=True)
+        with open(os.path.join(self.root, rel_path), "w", encoding="utf-8") as f:
+            json.dump({"data": data, "next_url": next_url}, f)
+        with self._lock:
+            self._index["metadata"][url] = rel_path
+        return data, next_url
+
+    def get_json(self, url, timeout=DEFAULT_TIMEOUT):
+        return self.get_page(url, timeout)[0]
+
+    def _asset_dest(self, url, asset_name):
+        rel_path = f"assets/{_url_key(url)}/{asset_name}"
+        dest_path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        return rel_path, dest_path
+
+    def add_asset(self, url, asset_name, source):
+        """Copies a downloaded asset, given as a path or a seekable binary file object, into the bundle."""
+        rel_path, dest_path = self._asset_dest(url, asset_name)
+        if isinstance(source, str):
+            shutil.copyfile(source, dest_path)
+        else:
+            source.seek(0)
+            with open(dest_path, "wb") as dst:
+                shutil.copyfileobj(source, dst)
+            source.seek(0)
+        with self._lock:
+            self._index["assets"][url] = rel_path
+
+    def add_asset_data(self, url, asset_name, data):
+        """Stores an asset that was read into memory (such as a checksum file) under its source URL."""
+        rel_path, dest_path = self._asset_dest(url, asset_name)
+        with open(dest_path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self._index["assets"][url] = rel_path
+
+    def close(self):
+        """Writes the bundle to path: a tar archive for tar-like names, otherwise a directory."""
+        with open(os.path.join(self.root, INDEX_NAME), "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=4, sort_keys=True)
+
+        mode = next((mode for suffix, mode in TAR_WRITE_MODES.items() if self.path.endswith(suffix)), None)
+        if mode:
+            tmp_path = f"{self.path}.tmp"
+            with tarfile.open(tmp_path, mode) as tar:
+                for name in sorted(os.listdir(self.root)):
+                    tar.add(os.path.join(self.root, name), arcname=name)
+            os.replace(tmp_path, self.path)
+        else:
+            shutil.copytree(self.root, self.path, dirs_exist_ok=True)
+        self._staging.cleanup()
+        print(f"Bundle written to {self.path} ({len(self._index['metadata'])} metadata, "
+              f"{len(self._index['assets'])} asset(s)).")
+
+class Mirror:
+    """Serves metadata and assets from a bundle instead of the network.
+
+    Accepts a bundle archive, an unpacked bundle directory, or a file:// URL of either.
+    Lookups for URLs the bundle does not contain return None.
+    """
+
+    def __init__(self, source):
+        path = _source_path(source)
+        self._extracted = None
+        if os.path.isdir(path):
+            self.root = path
+        else:
+            self._extracted = tempfile.TemporaryDirectory(prefix="night-mirror-")
+            self.root = self._extracted.name
+            _unpack_bundle(path, self.root)
+        self._index = _load_index(self.root)
+
+    def get_page(self, url, timeout=None):
+        """Returns (data, next_page_url) for a recorded API URL, or (None, None)."""
+        rel_path = self._index["metadata"].get(url)
+        if rel_path is None:
+            return None, None
+        with open(os.path.join(self.root, rel_path), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        return entry["data"], entry.get("next_url")
+
+    def get_json(self, url, timeout=None):
+        return self.get_page(url)[0]
+
+    def asset_path(self, url):
+        """Returns the local path of a recorded asset, or None."""
+        rel_path = self._index["assets"].get(url)
+        return os.path.join(self.root, rel_path) if rel_path else None
+
+    def close(self):
+        if self._extracted is not None:
+            self._extracted.cleanup()
+
+def add_bundle_arguments(parser):
+    """Adds the shared offline bundle options to an argparse parser."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--mirror", metavar="SOURCE", default=None,
+        help="Serve release metadata and assets from a bundle file, bundle directory or file:// URL; no network access."
+    )
+    group.add_argument(
+        "--export-bundle", metavar="PATH", default=None,
+        help="Record every resolved asset and its metadata into a bundle (.tar/.tar.gz or a directory); "
+             "an existing bundle at PATH is merged."
+    )
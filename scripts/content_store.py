@@ -0,0 +1,212 @@
+"""Content-addressed store that installs files by reflink or hardlink instead of copying.
+
+Each file is kept once under the per-user cache directory, named by its SHA-256:
+
+    <cache>/objects/<sha256[:2]>/<sha256>
+
+Installing a file into a worktree clones it from the store: a reflink where the
+filesystem supports copy-on-write clones, otherwise a hardlink, otherwise a plain copy.
+With several worktrees checked out the same library then occupies disk once, and
+reinstalling a file that is already linked to its object is a metadata-only check.
+Objects are made read-only so a hardlinked install cannot be edited in place.
+"""
+import hashlib
+import os
+import shutil
+import stat
+import sys
+import threading
+
+from download_cache import default_cache_dir, parse_size
+
+COPY_BUFFER_SIZE = 1024 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024 # 1 GiB
+INSTALL_MODES = ("auto", "reflink", "hardlink", "copy")
+
+if sys.platform.startswith("linux"):
+    import fcntl
+    FICLONE = 0x40049409 # _IOW(0x94, 9, int) from linux/fs.h
+elif sys.platform == "darwin":
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    _libc.clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+
+def _reflink(src_path, dest_path):
+    """Creates dest_path as a copy-on-write clone of src_path, raising OSError where unsupported."""
+    if sys.platform.startswith("linux"):
+        with open(src_path, "rb") as src, open(dest_path, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                dst.close()
+                os.remove(dest_path)
+                raise
+        shutil.copymode(src_path, dest_path)
+    elif sys.platform == "darwin":
+        if _libc.clonefile(os.fsencode(src_path), os.fsencode(dest_path), 0) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), dest_path)
+    else:
+        raise OSError(f"Reflinks are not supported on {sys.platform}")
+
+def _make_writable(path):
+    # Windows refuses to replace or delete read-only files.
+    if os.name == "nt" and os.path.exists(path):
+        os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+
+class ContentStore:
+    """Files stored once by SHA-256 and installed by reflink, hardlink or copy."""
+
+    def __init__(self, cache_dir=None, mode="auto"):
+        if mode not in INSTALL_MODES:
+            raise ValueError(f"Unknown install mode: {mode!r}")
+        self.root = os.path.join(cache_dir or default_cache_dir(), "objects")
+        self.mode = mode
+        self._lock = threading.Lock()
+
+    def object_path(self, digest):
+        """Returns where the object with the given SHA-256 lives in the store."""
+        return os.path.join(self.root, digest[:2], digest)
+
+    def contains(self, digest):
+        return bool(digest) and os.path.isfile(self.object_path(digest))
+
+    def add_stream(self, src, mode=None):
+        """Stores the contents of a binary file object, hashing it as it is written; returns its SHA-256.
+
+        mode supplies the permission bits (only the execute bits are kept, since objects are
+        read-only). Adding content that is already stored leaves the existing object in place.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".incoming.{os.getpid()}.{threading.get_ident()}")
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as dst:
+                for block in iter(lambda: src.read(COPY_BUFFER_SIZE), b""):
+                    digest.update(block)
+                    dst.write(block)
+            sha256 = digest.hexdigest()
+            object_path = self.object_path(sha256)
+            if os.path.exists(object_path):
+                return sha256
+            os.chmod(tmp_path, 0o444 | ((mode or 0) & 0o111))
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+            return sha256
+        finally:
+            if os.path.exists(tmp_path):
+                _make_writable(tmp_path)
+                os.remove(tmp_path)
+
+    def add_file(self, path):
+        """Stores a file's contents, returning its SHA-256."""
+        with open(path, "rb") as src:
+            return self.add_stream(src, os.stat(path).st_mode)
+
+    def is_installed(self, digest, dest_path):
+        """True if dest_path is a hardlink to the object for digest, which is checked from metadata alone."""
+        try:
+            return os.path.samefile(self.object_path(digest), dest_path)
+        except OSError:
+            return False
+
+    def install(self, digest, dest_path):
+        """Installs the object for digest at dest_path, returning how: "unchanged", "reflink", "hardlink" or "copy".
+
+        The new file is created under a temporary name and renamed over dest_path, so a
+        failed install never leaves a truncated file behind.
+        """
+        object_path = self.object_path(digest)
+        if self.is_installed(digest, dest_path):
+            return "unchanged"
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        tmp_path = f"{dest_path}.tmp"
+        if os.path.lexists(tmp_path):
+            _make_writable(tmp_path)
+            os.remove(tmp_path)
+        try:
+            method = self._clone(object_path, tmp_path)
+            _make_writable(dest_path)
+            os.replace(tmp_path, dest_path)
+        finally:
+            if os.path.lexists(tmp_path):
+                _make_writable(tmp_path)
+                os.remove(tmp_path)
+        try:
+            os.utime(object_path) # Recency for evict(); harmless on the installed hardlink too.
+        except OSError:
+            pass
+        return method
+
+    def _clone(self, object_path, tmp_path):
+        if self.mode in ("auto", "reflink"):
+            try:
+                _reflink(object_path, tmp_path)
+                os.chmod(tmp_path, os.stat(tmp_path).st_mode | stat.S_IWUSR) # A clone is private; keep it editable.
+                return "reflink"
+            except OSError:
+                if self.mode == "reflink":
+                    raise
+        if self.mode in ("auto", "hardlink"):
+            try:
+                os.link(object_path, tmp_path)
+                return "hardlink"
+            except OSError:
+                if self.mode == "hardlink":
+                    raise
+        shutil.copyfile(object_path, tmp_path)
+        shutil.copymode(object_path, tmp_path)
+        os.chmod(tmp_path, os.stat(tmp_path).st_mode | stat.S_IWUSR)
+        return "copy"
+
+    def evict(self, max_bytes):
+        """Removes least recently used objects no worktree hardlinks to until the rest fit in max_bytes.
+
+        Objects that are still hardlinked elsewhere are skipped: deleting them frees no space.
+        """
+        with self._lock:
+            entries = [] # Tuples of (mtime, size, path)
+            total_bytes = 0
+            for dirpath, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    if filename.startswith("."):
+                        continue # Objects still being added
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if st.st_nlink > 1:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total_bytes += st.st_size
+
+            for _, size, path in sorted(entries):
+                if total_bytes <= max_bytes:
+                    break
+                try:
+                    _make_writable(path)
+                    os.remove(path)
+                except OSError:
+                    continue
+                total_bytes -= size
+
+def add_store_arguments(parser):
+    """Adds the shared content store options to an argparse parser."""
+    parser.add_argument(
+        "--install-mode", choices=INSTALL_MODES, default="auto",
+        help="How files are installed from the content-addressed store: 'auto' tries a reflink, then a "
+             "hardlink, then a copy (default: auto). --no-cache bypasses the store and writes plain files."
+    )
+    parser.add_argument(
+        "--store-max-bytes", type=parse_size, default=DEFAULT_MAX_BYTES,
+        help="Evict least recently used objects no worktree links to once the content store exceeds this size, "
+             "e.g. 512M or 2G (default: 1G)."
+    )
+
+def store_from_args(args):
+    """Builds a ContentStore from parsed options, or None when caching is disabled."""
+    if args.no_cache:
+        return None
+    return ContentStore(args.cache_dir, args.install_mode)
@@ -0,0 +1,335 @@
+"""A single-pass C# lexer and declaration scanner for update_api_doc.py.
+
+tokenize() walks the source once, dropping whitespace, comments and preprocessor
+directives and keeping string and character literals as single tokens, so braces or
+parentheses inside them never confuse the scanner. Only the first branch of an
+#if/#elif/#else group is kept, so alternate branches cannot unbalance the braces.
+parse_declarations() then reads that token stream once, tracking a stack of namespace,
+type and block scopes. Every regular expression here either matches at a fixed position
+or consumes its input without backtracking, and the modifiers that decide whether a "("
+opens a method's parameters are tallied as each statement grows rather than rescanned,
+so a file is handled in linear time.
+"""
+import re
+
+# One alternative per token kind; each succeeds wherever it starts (unterminated strings
+# and comments run to the end of the line or file) so no input is ever rescanned.
+_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*(?:.*?\*/|.*))
+  | (?P<directive>\#[^\n]*)
+  | (?P<string>@"(?:[^"]|"")*"?|"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)
+  | (?P<ident>@?[^\W\d]\w*)
+  | (?P<number>\d[\w.]*)
+  | (?P<punct>=>|.)
+""", re.VERBOSE | re.DOTALL)
+_DIRECTIVE_RE = re.compile(r"\#\s*(\w*)")
+_CONDITIONAL_LINE_RE = re.compile(r"^[ \t]*\#[ \t]*(if|elif|else|endif)\b[^\n]*", re.MULTILINE)
+
+TYPE_KEYWORDS = ("class", "struct", "interface", "enum", "record")
+# Members with these keywords look like methods but are not part of the documented API.
+_NON_METHOD_KEYWORDS = {"operator", "delegate", "event", "extern"}
+# Initializers and expression bodies: a "(" after these is a call, not a parameter list.
+_NOT_A_METHOD = _NON_METHOD_KEYWORDS | {"=", "=>"}
+_STATEMENT_MARKERS = _NOT_A_METHOD | {"public", "static"}
+_OPEN = {"(": ")", "[": "]", "{": "}"}
+
+def _skip_raw_string(text, pos):
+    """Returns the end of a raw string literal whose run of opening quotes starts at pos."""
+    quotes_end = pos
+    while quotes_end < len(text) and text[quotes_end] == '"':
+        quotes_end += 1
+    closing = text.find(text[pos:quotes_end], quotes_end)
+    return len(text) if closing == -1 else closing + quotes_end - pos
+
+def _skip_interpolated_string(text, pos):
+    """Returns the end of an interpolated string starting at pos (its $ or @ prefix).
+
+    Holes ({...}) are skipped with their own brace depth, and strings nested in them
+    are skipped recursively, so quotes inside a hole do not end the outer literal.
+    """
+    end = len(text)
+    verbatim = False
+    while pos < end and text[pos] in "$@":
+        verbatim = verbatim or text[pos] == "@"
+        pos += 1
+    if text.startswith('"""', pos):
+        return _skip_raw_string(text, pos)
+    pos += 1 # The opening quote
+    depth = 0
+    while pos < end:
+        char = text[pos]
+        if depth:
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+            elif char == "$" or (char == "@" and text.startswith('@$', pos)):
+                pos = _skip_interpolated_string(text, pos)
+                continue
+            elif char in "\"'@":
+                pos = _TOKEN_RE.match(text, pos).end()
+                continue
+            pos += 1
+        elif char == '"':
+            if verbatim and text.startswith('""', pos):
+                pos += 2
+                continue
+            return pos + 1
+        elif char == "\\" and not verbatim:
+            pos += 2
+        elif char == "\n" and not verbatim:
+            return pos # Unterminated; stop at the end of the line.
+        elif char == "{" and not text.startswith("{{", pos):
+            depth = 1
+            pos += 1
+        elif char in "{}":
+            pos += 2 # An escaped {{ or }}
+        else:
+            pos += 1
+    return end
+
+def _skip_inactive_branch(text, pos):
+    """Returns the position just past the #endif closing the conditional group that pos is inside."""
+    depth = 0
+    for match in _CONDITIONAL_LINE_RE.finditer(text, pos):
+        keyword = match.group(1)
+        if keyword == "if":
+            depth += 1
+        elif keyword == "endif":
+            if depth == 0:
+                return match.end()
+            depth -= 1
+    return len(text)
+
+def tokenize(text):
+    """Yields (kind, value, space_before) tokens for C# source text.
+
+    kind is "ident", "string", "number" or "punct"; space_before tells whether
+    whitespace or a comment separated the token from the previous one.
+    """
+    pos = 0
+    end = len(text)
+    space_before = False
+    while pos < end:
+        char = text[pos]
+        if char == "$" or (char == "@" and text.startswith('@$', pos)):
+            start, pos = pos, _skip_interpolated_string(text, pos)
+            yield "string", text[start:pos], space_before
+            space_before = False
+            continue
+        if char == '"' and text.startswith('"""', pos):
+            start, pos = pos, _skip_raw_string(text, pos)
+            yield "string", text[start:pos], space_before
+            space_before = False
+            continue
+        match = _TOKEN_RE.match(text, pos)
+        kind = match.lastgroup
+        pos = match.end()
+        if kind in ("space", "comment"):
+            space_before = True
+        elif kind == "directive":
+            space_before = True
+            # Keep the first branch of a conditional group; skip the #elif/#else branches.
+            if _DIRECTIVE_RE.match(match.group()).group(1) in ("elif", "else"):
+                pos = _skip_inactive_branch(text, pos)
+        else:
+            yield kind, match.group(), space_before
+            space_before = False
+
+def _join_tokens(tokens):
+    """Rebuilds source text from tokens, collapsing any whitespace or comments to one space."""
+    return "".join((" " if index and space_before else "") + value
+                   for index, (_, value, space_before) in enumerate(tokens))
+
+def _declared_type(statement):
+    """Returns (keyword, name, modifiers) if statement declares a type, else None."""
+    for index, (kind, value, _) in enumerate(statement):
+        if kind == "punct" and value == "(":
+            return None
+        if kind == "ident" and value in TYPE_KEYWORDS:
+            names = [token[1] for token in statement[index + 1:] if token[0] == "ident"]
+            # "record struct" and "record class" name the type after both keywords.
+            if names and value == "record" and names[0] in ("struct", "class"):
+                names = names[1:]
+            if not names:
+                return None
+            modifiers = {token[1] for token in statement[:index] if token[0] == "ident"}
+            return value, names[0], modifiers
+    return None
+
+def _method_name(statement, markers):
+    """Returns a public static method's name (with any type parameters) if statement ends one, else None.
+
+    markers is the set of _STATEMENT_MARKERS values statement contains, kept up to date as
+    tokens are appended, so a statement that cannot declare a method is rejected without
+    rescanning it; only the tokens naming the method are examined.
+    """
+    if "public" not in markers or "static" not in markers or not markers.isdisjoint(_NOT_A_METHOD):
+        return None
+    index = len(statement) - 1
+    type_parameters = ""
+    if index >= 0 and statement[index][1] == ">":
+        depth = 0
+        for start in range(index, -1, -1):
+            depth += {">": 1, "<": -1}.get(statement[start][1], 0)
+            if depth == 0:
+                break
+        type_parameters = _join_tokens(statement[start:index + 1]).replace(" ", "").replace(",", ", ")
+        index = start - 1
+    # A method needs a return type ahead of its name; static constructors have none.
+    if index < 1 or statement[index][0] != "ident" or statement[index - 1][1] in ("public", "static"):
+        return None
+    return statement[index][1] + type_parameters
+
+def _format_parameters(tokens):
+    """Formats a parameter list's tokens as "type name, ..." without attributes or default values."""
+    parameters = []
+    current = []
+    depth = 0
+    angle = 0
+    defaulted = False
+    for token in tokens:
+        value = token[1] if token[0] == "punct" else None
+        if value in _OPEN:
+            depth += 1
+        elif value in (")", "]", "}"):
+            depth -= 1
+        elif value == "<" and not defaulted:
+            angle += 1
+        elif value == ">" and angle:
+            angle -= 1
+        elif value == "," and depth == 0 and angle == 0:
+            parameters.append(current)
+            current = []
+            defaulted = False
+            continue
+        elif value == "=" and depth == 0 and angle == 0:
+            defaulted = True
+        if not defaulted:
+            current.append(token)
+    parameters.append(current)
+
+    formatted = []
+    for parameter in parameters:
+        # Drop leading attributes such as [NotNull].
+        while parameter and parameter[0][1] == "[":
+            closing = next((index for index, token in enumerate(parameter) if token[1] == "]"), len(parameter) - 1)
+            parameter = parameter[closing + 1:]
+        if parameter:
+            formatted.append(_join_tokens(parameter))
+    return ", ".join(formatted)
+
+def parse_declarations(text):
+    """Scans C# source text for its public API in one pass over its tokens.
+
+    Returns {"functions", "types", "enums"}: functions maps each public static class, in
+    source order, to {method_name: [signatures]} for its public static methods (classes
+    without any are left out); types lists the other public classes, structs and
+    records; enums the public enums. Names are sorted and unique.
+    """
+    functions = {}
+    types = set()
+    enums = set()
+    scopes = [None] # None: namespace level; a dict for a type body; "block" for anything else.
+    statement = []
+    markers = set() # The _STATEMENT_MARKERS values in statement
+    nesting = 0 # Open parentheses and brackets within the current statement
+    attribute_depth = 0
+    tokens = tokenize(text)
+
+    def open_scope(statement):
+        declared = _declared_type(statement)
+        if declared is None:
+            is_namespace = any(token[1] == "namespace" for token in statement)
+            return None if is_namespace else "block"
+        keyword, name, modifiers = declared
+        return {"keyword": keyword, "name": name, "public": "public" in modifiers, "static": "static" in modifiers}
+
+    def record_type(scope):
+        if not scope["public"]:
+            return
+        if scope["keyword"] == "enum":
+            enums.add(scope["name"])
+        elif scope["keyword"] in ("class", "struct", "record") and not scope["static"]:
+            types.add(scope["name"])
+
+    for token in tokens:
+        kind, value, _ = token
+        scope = scopes[-1]
+        is_punct = kind == "punct"
+        if scope == "block":
+            # Method bodies, accessors and initializers only matter for their braces.
+            if is_punct and value == "{":
+                scopes.append("block")
+            elif is_punct and value == "}":
+                scopes.pop()
+                statement = []
+                markers = set()
+            continue
+        if attribute_depth:
+            if is_punct and value == "[":
+                attribute_depth += 1
+            elif is_punct and value == "]":
+                attribute_depth -= 1
+            continue
+        if is_punct and value == "[" and not statement:
+            attribute_depth = 1
+            continue
+
+        if is_punct and value == "(" and nesting == 0 and isinstance(scope, dict):
+            method_name = _method_name(statement, markers)
+            if method_name is not None:
+                parameters = []
+                depth = 1
+                for parameter_token in tokens:
+                    if parameter_token[0] == "punct":
+                        if parameter_token[1] == "(":
+                            depth += 1
+                        elif parameter_token[1] == ")":
+                            depth -= 1
+                            if depth == 0:
+                                break
+                    parameters.append(parameter_token)
+                if scope["public"] and scope["static"] and scope["keyword"] == "class":
+                    signature = f"{method_name}({_format_parameters(parameters)})"
+                    methods = functions.setdefault(scope["name"], {})
+                    methods.setdefault(method_name.split("<", 1)[0], set()).add(signature)
+                # Anything up to the body or ';' belongs to this method, not to a new declaration.
+                statement = [("punct", "(", False), ("punct", ")", False)]
+                markers = set()
+                continue
+
+        if is_punct and value in ("(", "["):
+            nesting += 1
+        elif is_punct and value in (")", "]"):
+            nesting = max(0, nesting - 1)
+        elif is_punct and nesting == 0 and value in (";", "{", "}"):
+            if value == "{":
+                new_scope = open_scope(statement)
+                if isinstance(new_scope, dict):
+                    record_type(new_scope)
+                scopes.append(new_scope)
+            elif value == "}":
+                if len(scopes) > 1:
+                    scopes.pop()
+            else:
+                declared = _declared_type(statement)
+                if declared is not None and declared[0] == "record":
+                    record_type({"keyword": "record", "name": declared[1], "public": "public" in declared[2],
+                                 "static": False})
+            statement = []
+            markers = set()
+            continue
+        if value in _STATEMENT_MARKERS:
+            markers.add(value)
+        statement.append(token)
+
+    return {
+        "functions": {
+            class_name: {method_name: sorted(signatures) for method_name, signatures in methods.items()}
+            for class_name, methods in functions.items()
+        },
+        "types": sorted(types),
+        "enums": sorted(enums),
+    }
@@ -0,0 +1,240 @@
+"""One entry point for every downloaded dependency: the SDL3 native libraries and the tools.
+
+`deps sync` turns the SDL3 library matrix (sync_sdl3) and the tools manifest
+(update_tools) into a single job graph and runs it on one pool of --jobs workers that
+shares the download cache, metadata cache and content store. Release lookups are the
+roots of the graph; as soon as one resolves, that library's or tool's asset downloads
+are scheduled, so a fresh checkout becomes buildable in one parallel pass instead of two
+serial ones. The run ends with one consolidated report, optionally written as JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import sync_sdl3
+import update_tools
+from bundle import BundleWriter, Mirror, add_bundle_arguments
+from content_store import DEFAULT_MAX_BYTES, add_store_arguments, store_from_args
+from download_cache import add_cache_arguments, cache_from_args
+from downloader import DEFAULT_SPILL_THRESHOLD, add_download_arguments
+from release_metadata import ReleaseListing, add_metadata_arguments, get_release_by_tag, metadata_cache_from_args
+from tracing import add_trace_arguments, span, trace_from_args
+
+DEFAULT_JOBS = 4
+TOOLS_SUBDIR = "tools"
+
+class JobGraph:
+    """Runs jobs on one bounded pool, scheduling follow-up jobs as soon as their parent finishes.
+
+    add(fn, on_done) queues fn to run on a worker. When it finishes, on_done(value, error)
+    runs on the scheduling thread, so it can update shared state without locks, and may
+    return further (fn, on_done) pairs to schedule.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.completed = 0
+        self._queued = []
+
+    def add(self, fn, on_done=None):
+        self._queued.append((fn, on_done))
+
+    def run(self):
+        """Runs every queued job and its follow-ups, returning once the graph is drained."""
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            running = {}
+            while self._queued or running:
+                for fn, on_done in self._queued:
+                    running[executor.submit(fn)] = on_done
+                self._queued = []
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_done = running.pop(future)
+                    self.completed += 1
+                    error = future.exception()
+                    follow_ups = on_done(None if error else future.result(), error) if on_done else None
+                    self._queued.extend(follow_ups or [])
+
+def sync_dependencies(repo_root, platforms=None, tool_names=None, jobs=DEFAULT_JOBS, cache=None, store=None,
+                      metadata_cache=None, mirror=None, bundle_writer=None, use_range=True,
+                      spill_threshold=DEFAULT_SPILL_THRESHOLD, store_max_bytes=DEFAULT_MAX_BYTES):
+    """Syncs the SDL3 libraries and the tools under repo_root in one job graph.
+
+    Takes the same objects as sync_sdl3.sync_libraries() and update_tools.update_tools();
+    callers keep ownership of them. Returns a JSON-serialisable report:
+    {"ok", "seconds", "bytes", "jobs", "libraries", "tools"}, where libraries is the
+    sync_sdl3.finish_libraries() result and tools the update_tools.finish_tools() result.
+    """
+    started = time.perf_counter()
+    library_plan = sync_sdl3.plan_libraries(repo_root, platforms, jobs, store, exporting=bundle_writer is not None)
+    tool_plan = update_tools.plan_tools(os.path.join(repo_root, TOOLS_SUBDIR), tool_names)
+    library_completed = []
+    tool_completed = []
+    graph = JobGraph(jobs)
+    # Tags the direct endpoint misses share one pass over the release listing.
+    listing = ReleaseListing(sync_sdl3.OWNER, sync_sdl3.REPO, metadata_cache)
+
+    def asset_job(lib_job):
+        def process():
+            return sync_sdl3.process_asset(library_plan["prebuilt_dir"], *lib_job, cache=cache, use_range=use_range,
+                                           mirror=mirror, bundle_writer=bundle_writer, store=store,
+                                           spill_threshold=spill_threshold)
+
+        def on_done(outcome, error):
+            if error is not None:
+                lib_key, platform_key, _, lib_version, asset_name = lib_job[:5]
+                outcome = sync_sdl3.asset_outcome(lib_key, platform_key, lib_version, "failed", f"Exception: {error}",
+                                                  asset_name)
+            library_completed.append((lib_job, outcome))
+        return process, on_done
+
+    def resolve_job(lib_key, tag):
+        def resolve():
+            with span(f"resolve {tag}", "metadata"):
+                return (get_release_by_tag(sync_sdl3.OWNER, sync_sdl3.REPO, tag, metadata_cache)
+                        or listing.find(tag))
+
+        def on_done(release, error):
+            if error is not None:
+                print(f"Error resolving release {tag}: {error}")
+            return [asset_job(lib_job) for lib_job in
+                    sync_sdl3.library_asset_jobs(library_plan, lib_key, release, mirror, bundle_writer, error)]
+        return resolve, on_done
+
+    def tool_job(job):
+        def process():
+            return update_tools.process_tool_asset(tool_plan, job, cache, mirror, bundle_writer, spill_threshold)
+
+        def on_done(outcome, error):
+            if error is not None:
+                outcome = {"asset": job[2]["name"], "platform": job[1], "ok": False, "reason": f"Exception: {error}",
+                           "bytes": 0, "seconds": 0.0, "files": None, "written": 0, "unchanged": 0, "removed": 0}
+            tool_completed.append((job, outcome))
+        return process, on_done
+
+    def check_job(name):
+        def check():
+            return update_tools.check_tool(tool_plan, name, metadata_cache)
+
+        def on_done(latest, error):
+            if error is not None:
+                print(f"Error checking {name}: {error}")
+            return [tool_job(job) for job in update_tools.tool_asset_jobs(tool_plan, name, latest, bundle_writer)]
+        return check, on_done
+
+    for lib_key, pending in library_plan["pending"].items():
+        graph.add(*resolve_job(lib_key, pending["tag"]))
+    for name in tool_plan["tools"]:
+        graph.add(*check_job(name))
+
+    print(f"\nRunning the dependency graph with {jobs} worker(s)...")
+    with span("dependency graph", "main"):
+        graph.run() # Job errors are recorded in their outcomes by the on_done callbacks.
+
+    # Finish in a stable order so the lock file, manifest and report do not depend on completion order.
+    library_completed.sort(key=lambda pair: (list(sync_sdl3.LIBRARIES_CONFIG).index(pair[0][0]),
+                                             list(sync_sdl3.PLATFORM_TAGS).index(pair[0][1])))
+    tool_order = list(tool_plan["tools"])
+    tool_completed.sort(key=lambda pair: (tool_order.index(pair[0][0]), pair[0][1]))
+    libraries = sync_sdl3.finish_libraries(library_plan, library_completed, store, store_max_bytes)
+    tools = update_tools.finish_tools(tool_plan, tool_completed)
+    return {
+        "ok": libraries["ok"] and tools["ok"],
+        "seconds": time.perf_counter() - started,
+        "bytes": libraries["bytes"] + tools["bytes"],
+        "jobs": graph.completed,
+        "libraries": libraries,
+        "tools": tools,
+    }
+
+def print_report(report):
+    """Prints the consolidated summary of a sync_dependencies() report."""
+    sync_sdl3.print_summary(report["libraries"])
+    print("\n--- Tools ---")
+    for tool in report["tools"]["tools"]:
+        version = tool["version"] or "unknown"
+        print(f"  {tool['tool']}: {tool['status']} ({version}), {tool['bytes']} byte(s)")
+        for outcome in tool["assets"]:
+            if not outcome["ok"]:
+                print(f"    - {outcome['asset']} ({outcome['platform']}): {outcome['reason']}")
+    print("-------------")
+    status = "OK" if report["ok"] else "FAILED"
+    print(f"Dependencies {status}: {report['jobs']} job(s), {report['bytes']} byte(s) downloaded in {report['seconds']:.2f}s.")
+
+def parse_args(argv=None):
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Manage the repo's downloaded dependencies.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync = commands.add_parser("sync", help="Sync the SDL3 native libraries and the tools in one parallel pass.")
+    sync.add_argument(
+        "--root", default=sync_sdl3.DEFAULT_REPO_ROOT,
+        help="Repository root holding lib/ and tools/ (default: this script's checkout)."
+    )
+    sync.add_argument(
+        "--jobs", "-j", type=int, default=DEFAULT_JOBS,
+        help=f"Number of release lookups and asset downloads to run concurrently (default: {DEFAULT_JOBS})."
+    )
+    sync.add_argument(
+        "--platform", action="append", choices=[*sync_sdl3.PLATFORM_TAGS.keys(), "all"], dest="platforms",
+        help="Platform to sync native libraries for; repeat for several, or use 'all' for release packaging "
+             "(default: the host platform)."
+    )
+    sync.add_argument(
+        "--tool", action="append", dest="tools", metavar="NAME",
+        help="Only update this tool; repeat for several (default: every tool in the manifest)."
+    )
+    sync.add_argument(
+        "--no-range", action="store_true",
+        help="Download whole release zips instead of fetching only the library member with HTTP Range requests."
+    )
+    sync.add_argument("--report", metavar="OUT.json", default=None, help="Also write the consolidated report as JSON.")
+    add_cache_arguments(sync)
+    add_download_arguments(sync)
+    add_store_arguments(sync)
+    add_metadata_arguments(sync)
+    add_bundle_arguments(sync)
+    add_trace_arguments(sync)
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    args.platforms = sync_sdl3.select_platforms(parser, args.platforms)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = cache_from_args(args)
+    store = store_from_args(args)
+    metadata_cache = metadata_cache_from_args(args)
+    mirror = None
+    bundle_writer = None
+    if args.mirror:
+        print(f"Using offline bundle {args.mirror}; no network access.")
+        mirror = Mirror(args.mirror)
+        metadata_cache = mirror
+    elif args.export_bundle:
+        bundle_writer = BundleWriter(args.export_bundle, metadata_cache)
+        metadata_cache = bundle_writer
+    try:
+        with trace_from_args(args, "deps sync"):
+            report = sync_dependencies(args.root, args.platforms, args.tools, args.jobs, cache, store, metadata_cache,
+                                       mirror, bundle_writer, use_range=not args.no_range,
+                                       spill_threshold=args.spill_threshold, store_max_bytes=args.store_max_bytes)
+            if bundle_writer is not None and report["ok"]:
+                with span("write bundle", "bundle"):
+                    bundle_writer.close()
+        print_report(report)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+            print(f"Report written to {args.report}")
+    finally:
+        if mirror is not None:
+            mirror.close()
+    return 0 if report["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""File digest helpers shared by the repo scripts."""
+import hashlib
+import mmap
+import os
+import posixpath
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_BUFFER_SIZE = 1024 * 1024
+# Files at least this large are hashed through a memory map instead of buffered reads.
+MMAP_THRESHOLD = 256 * 1024
+DEFAULT_HASH_JOBS = min(8, os.cpu_count() or 1)
+
+# Release-wide checksum files, matched case-insensitively; "<asset>.sha256" is also checked.
+CHECKSUM_FILE_NAMES = ("sha256sums", "sha256sums.txt", "checksums.txt", "checksums.sha256")
+_SHA256_RE = re.compile(r"[0-9a-fA-F]{64}")
+_BSD_CHECKSUM_RE = re.compile(r"SHA256 \((.+)\) = ([0-9a-fA-F]{64})")
+
+class ChecksumMismatch(Exception):
+    """A file's SHA-256 digest does not match the expected one."""
+
+    def __init__(self, name, expected, actual):
+        super().__init__(f"SHA-256 mismatch for {name}: expected {expected}, got {actual}")
+        self.expected = expected
+        self.actual = actual
+
+def sha256_file(path):
+    """Returns the hex SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def sha256_fileobj(f):
+    """Returns the hex SHA-256 digest of a binary file object's contents from its current position."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+def crc32_file(path):
+    """Returns a file's CRC-32 as an unsigned int, the checksum zip archives record per member."""
+    crc = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+def _sha256_or_none(path):
+    try:
+        return sha256_file(path)
+    except OSError:
+        return None
+
+def hash_files(paths, jobs=DEFAULT_HASH_JOBS):
+    """Hashes files concurrently, returning {path: hex digest or None if unreadable}.
+
+    hashlib releases the GIL while digesting large buffers, so threads hash in parallel.
+    """
+    paths = list(dict.fromkeys(paths))
+    if len(paths) <= 1 or jobs <= 1:
+        return {path: _sha256_or_none(path) for path in paths}
+    with ThreadPoolExecutor(max_workers=min(jobs, len(paths))) as executor:
+        return dict(zip(paths, executor.map(_sha256_or_none, paths)))
+
+def asset_sha256(asset):
+    """Returns the SHA-256 GitHub publishes in a release asset's "digest" field, or None."""
+    algorithm, _, value = (asset.get("digest") or "").partition(":")
+    if algorithm == "sha256" and _SHA256_RE.fullmatch(value):
+        return value.lower()
+    return None
+
+def find_checksum_asset(assets, asset_name):
+    """Returns the release asset holding a checksum for asset_name, or None."""
+    by_name = {asset.get("name", "").lower(): asset for asset in assets}
+    for name in (f"{asset_name}.sha256".lower(), f"{asset_name}.sha256sum".lower(), *CHECKSUM_FILE_NAMES):
+        if name in by_name:
+            return by_name[name]
+    return None
+
+def parse_checksum_file(text, asset_name):
+    """Returns the SHA-256 for asset_name from a checksum file, or None.
+
+    Understands sha256sum output ("<hex>  <name>", "<hex> *<name>"), BSD-style
+    "SHA256 (<name>) = <hex>" lines, and per-asset files holding a bare digest.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+    for line in lines:
+        bsd = _BSD_CHECKSUM_RE.fullmatch(line)
+        if bsd:
+            name, digest = bsd.groups()
+        else:
+            digest, _, name = line.partition(" ")
+            name = name.strip().lstrip("*")
+        if _SHA256_RE.fullmatch(digest) and posixpath.basename(name) == asset_name:
+            return digest.lower()
+    if len(lines) == 1 and _SHA256_RE.fullmatch(lines[0]):
+        return lines[0].lower()
+    return None
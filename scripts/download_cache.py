@@ -0,0 +1,219 @@
+"""Persistent, size-bounded download cache shared by the repo scripts.
+
+Release assets are stored under a per-user cache directory, keyed by asset name plus
+version, so repeated syncs (and branch switches back and forth) reuse the zips instead
+of downloading them again. Entries are evicted least-recently-used first once the cache
+grows past its byte limit.
+"""
+import contextlib
+import hashlib
+import os
+import sys
+import threading
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+CACHE_DIR_ENV = "NIGHT_CACHE_DIR"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024 # 1 GiB
+
+_SIZE_SUFFIXES = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+def default_cache_dir():
+    """Returns the per-user cache directory used by the repo scripts."""
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return override
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(home, "AppData", "Local")
+    elif sys.platform == "darwin":
+        base = os.path.join(home, "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+    return os.path.join(base, "night")
+
+def parse_size(value):
+    """Parses a byte count such as '1073741824', '512M' or '2G'."""
+    text = str(value).strip().upper().removesuffix("B").removesuffix("I")
+    suffix = text[-1:] if text[-1:] in _SIZE_SUFFIXES else ""
+    number = text[:-1] if suffix else text
+    try:
+        return int(float(number) * _SIZE_SUFFIXES[suffix])
+    except ValueError:
+        raise ValueError(f"Invalid size: {value!r}") from None
+
+@contextlib.contextmanager
+def _entry_lock(lock_path, blocking=True):
+    """Holds an exclusive advisory lock on lock_path, across threads and processes.
+
+    Yields True once the lock is held. Without blocking, yields False instead of waiting
+    when another worker holds it. Locking is best effort: on filesystems without lock
+    support the body still runs, as if the lock were held. The OS drops the lock if the
+    holder dies, so there are no stale locks to clean up.
+    """
+    with open(lock_path, "a+b") as lock_file:
+        locked = False
+        try:
+            if os.name == "nt":
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            locked = True
+        except BlockingIOError:
+            yield False
+            return
+        except OSError:
+            if not blocking and os.name == "nt":
+                yield False # msvcrt reports a held lock as a plain OSError.
+                return
+        try:
+            yield True
+        finally:
+            if locked:
+                if os.name == "nt":
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def _partial_entry_path(path):
+    """Returns the entry a resumable download's .part or .part.json file belongs to, else None."""
+    for suffix in (".tmp.part", ".tmp.part.json"):
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return None
+
+class DownloadCache:
+    """A directory of downloaded assets with LRU eviction bounded by max_bytes."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = os.path.join(cache_dir or default_cache_dir(), "downloads")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def entry_path(self, asset_name, version):
+        """Returns where the asset for (asset_name, version) lives in the cache."""
+        key = hashlib.sha256(f"{asset_name}\0{version}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], key, asset_name)
+
+    def get(self, asset_name, version):
+        """Returns the cached path for an asset, or None on a miss."""
+        path = self.entry_path(asset_name, version)
+        try:
+            os.utime(path) # Bump recency; mtime is the LRU clock since atime is often disabled.
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, asset_name, version, download):
+        """Returns (path, hit) for an asset, calling download(dest_path) on a miss.
+
+        The download goes to a temporary name and is renamed into place once complete,
+        so readers never see a partial entry. A per-entry lock makes concurrent workers
+        and processes wait for one download instead of racing, and keeps the temporary
+        name stable so a resumable downloader can continue an interrupted .part file.
+        """
+        cached_path = self.get(asset_name, version)
+        if cached_path:
+            return cached_path, True
+
+        path = self.entry_path(asset_name, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _entry_lock(f"{path}.lock"):
+            cached_path = self.get(asset_name, version)
+            if cached_path:
+                return cached_path, True # Another worker finished it while we waited.
+
+            tmp_path = f"{path}.tmp"
+            try:
+                download(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self.evict(keep=path)
+        return path, False
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in max_bytes.
+
+        Partial downloads left by interrupted runs are counted and evicted like entries,
+        but only while nobody holds their entry lock: a worker that is still downloading
+        keeps its .part files.
+        """
+        with self._lock:
+            entries = [] # Tuples of (mtime, size, path)
+            total_bytes = 0
+            for dirpath, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    # Lock files are tiny and must outlive eviction; .tmp files are being renamed into place.
+                    if filename.endswith((".lock", ".tmp")):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    if self._in_flight(path):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total_bytes += stat.st_size
+
+            if total_bytes <= self.max_bytes:
+                return
+
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                if self._remove(path):
+                    total_bytes -= size
+
+    @staticmethod
+    def _in_flight(path):
+        """Tells whether path is a partial download whose entry lock another worker holds."""
+        entry = _partial_entry_path(path)
+        if entry is None:
+            return False
+        try:
+            with _entry_lock(f"{entry}.lock", blocking=False) as locked:
+                return not locked
+        except OSError:
+            return False # The entry's directory went away; the scan skips the vanished file.
+
+    @staticmethod
+    def _remove(path):
+        """Deletes an entry or an abandoned partial download, returning whether it was removed."""
+        entry = _partial_entry_path(path)
+        with _entry_lock(f"{entry}.lock", blocking=False) if entry else contextlib.nullcontext(True) as locked:
+            if not locked:
+                return False # A worker resumed this download since the scan.
+            try:
+                os.remove(path)
+            except OSError:
+                return False
+        return True
+
+def add_cache_arguments(parser):
+    """Adds the shared download cache options to an argparse parser."""
+    parser.add_argument(
+        "--cache-dir", default=None,
+        help=f"Download cache directory (default: ${CACHE_DIR_ENV} or the per-user cache dir)."
+    )
+    parser.add_argument(
+        "--cache-max-bytes", type=parse_size, default=DEFAULT_MAX_BYTES,
+        help="Evict least recently used downloads once the cache exceeds this size, e.g. 512M or 2G (default: 1G)."
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the download and release metadata caches."
+    )
+
+def cache_from_args(args):
+    """Builds a DownloadCache from parsed cache options, or None when caching is disabled."""
+    if args.no_cache:
+        return None
+    return DownloadCache(args.cache_dir, args.cache_max_bytes)
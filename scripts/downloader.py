@@ -0,0 +1,298 @@
+"""Resumable, retrying HTTP downloads shared by the repo scripts.
+
+Bytes are written to "<dest>.part" and only renamed to dest once complete. If the
+connection drops, the download resumes from the end of the .part file with an HTTP
+Range request (guarded by If-Range, so a changed asset restarts from scratch), after a
+jittered exponential backoff. Chunk sizes adapt to the link speed so fast connections
+are not held back by many tiny Python-level writes.
+
+The SHA-256 of the body is computed as chunks arrive, so verifying a download against an
+expected digest needs no second read of the file; a mismatch deletes the download before
+anything can extract it.
+
+download_to_buffer keeps an asset in memory (spilling to a temporary file only above a
+size threshold) so callers can extract straight from the buffer without writing the
+archive to disk at all.
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import requests
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from digests import HASH_BUFFER_SIZE, ChecksumMismatch, asset_sha256, find_checksum_asset, parse_checksum_file
+from download_cache import parse_size
+from http_transport import DOWNLOAD_TIMEOUT, get_session
+from tracing import span
+
+DEFAULT_TIMEOUT = DOWNLOAD_TIMEOUT
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Downloads up to this size stay in memory; larger ones spill to a temporary file.
+DEFAULT_SPILL_THRESHOLD = 64 * 1024 * 1024
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# A chunk that arrives faster than this doubles the next read; slower than SLOW halves it.
+FAST_CHUNK_SECONDS = 0.05
+SLOW_CHUNK_SECONDS = 0.5
+
+class TransientDownloadError(Exception):
+    """A download failed in a way that is worth retrying."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def backoff_delay(attempt, retry_after=None):
+    """Returns the delay before retry number attempt (0-based), using full jitter."""
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def parse_retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def _load_validator(meta_path, url):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return meta.get("validator") if meta.get("url") == url else None
+
+def _save_validator(meta_path, url, response):
+    validator = _strong_validator(response)
+    if validator:
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "validator": validator}, f)
+    elif os.path.exists(meta_path):
+        os.remove(meta_path)
+
+def _copy_response(response, f, digest):
+    """Streams a response body into f and digest with adaptive chunk sizes; returns the bytes written."""
+    chunk_size = MIN_CHUNK_SIZE
+    written = 0
+    while True:
+        started = time.monotonic()
+        chunk = response.raw.read(chunk_size, decode_content=True)
+        if not chunk:
+            break
+        f.write(chunk)
+        digest.update(chunk)
+        written += len(chunk)
+        elapsed = time.monotonic() - started
+        if elapsed < FAST_CHUNK_SECONDS and chunk_size < MAX_CHUNK_SIZE:
+            chunk_size *= 2
+        elif elapsed > SLOW_CHUNK_SECONDS and chunk_size > MIN_CHUNK_SIZE:
+            chunk_size //= 2
+    return written
+
+def _hash_prefix(f, digest):
+    """Feeds the bytes already in f into digest before a resumed download appends to it."""
+    f.seek(0)
+    for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+        digest.update(block)
+
+class _RangeNotSatisfiable(TransientDownloadError):
+    """The partial download no longer fits the remote asset."""
+
+    def __init__(self):
+        super().__init__("Requested range not satisfiable; restarting", retry_after=0)
+
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                     requests.exceptions.ChunkedEncodingError, ProtocolError, ReadTimeoutError,
+                     TransientDownloadError)
+
+def _open_response(session, url, offset, validator, timeout):
+    """Starts one download attempt, resuming from offset when there is one; returns the checked response."""
+    # Ask for the raw bytes so Range offsets line up with what was already received.
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+
+    response = session.get(url, headers=headers, stream=True, timeout=timeout)
+    try:
+        if response.status_code == 416 and offset:
+            raise _RangeNotSatisfiable()
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise TransientDownloadError(f"HTTP {response.status_code}", parse_retry_after(response))
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return response
+
+def _strong_validator(response):
+    validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+    # Weak ETags cannot be used with If-Range
+    return validator if validator and not validator.startswith("W/") else None
+
+def _receive(response, f, offset):
+    """Appends a response body to f (after offset bytes already there), returning the SHA-256 of the whole."""
+    expected_length = response.headers.get("Content-Length")
+    digest = hashlib.sha256()
+    if offset:
+        _hash_prefix(f, digest)
+    f.seek(offset)
+    f.truncate()
+    written = _copy_response(response, f, digest)
+    if expected_length is not None and written < int(expected_length):
+        raise TransientDownloadError(f"Connection closed after {written} of {expected_length} bytes")
+    return digest.hexdigest()
+
+def wait_before_retry(error, attempt, max_attempts, label):
+    if attempt + 1 >= max_attempts:
+        raise error
+    delay = backoff_delay(attempt, getattr(error, "retry_after", None))
+    print(f"  Download of {label} interrupted ({error}); "
+          f"retrying in {delay:.1f}s (attempt {attempt + 2}/{max_attempts})...")
+    time.sleep(delay)
+
+def _attempt_download(session, url, part_path, meta_path, timeout):
+    """Makes one download attempt, returning the SHA-256 of the complete .part file."""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    validator = _load_validator(meta_path, url) if offset else None
+    if offset and not validator:
+        offset = 0 # Nothing to prove the partial file belongs to this asset; start over.
+
+    try:
+        response = _open_response(session, url, offset, validator, timeout)
+    except _RangeNotSatisfiable:
+        os.remove(part_path)
+        raise
+    with response:
+        if response.status_code != 206:
+            offset = 0 # Server sent the whole asset (Range ignored or If-Range failed).
+            _save_validator(meta_path, url, response)
+        with open(part_path, "r+b" if offset else "w+b") as f:
+            return _receive(response, f, offset)
+
+def download_file(url, dest_path, session=None, timeout=DEFAULT_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                  expected_sha256=None):
+    """Downloads url to dest_path, resuming a previous .part file and retrying transient errors.
+
+    Returns the hex SHA-256 of the downloaded file. With expected_sha256 a mismatching
+    download is deleted and ChecksumMismatch raised, so dest_path only ever holds verified
+    bytes. Raises the last error once max_attempts is exhausted; the .part file is kept so
+    a later call can pick up where this one stopped.
+    """
+    session = session or get_session()
+    part_path = f"{dest_path}.part"
+    meta_path = f"{dest_path}.part.json"
+    with span("download", "download", url=url) as trace_args:
+        for attempt in range(max_attempts):
+            try:
+                actual_sha256 = _attempt_download(session, url, part_path, meta_path, timeout)
+                break
+            except RETRYABLE_ERRORS as e:
+                wait_before_retry(e, attempt, max_attempts, os.path.basename(dest_path))
+        trace_args.update(bytes=os.path.getsize(part_path), attempts=attempt + 1)
+
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    if expected_sha256 and actual_sha256 != expected_sha256.lower():
+        os.remove(part_path) # Never resume from bytes known to be wrong.
+        raise ChecksumMismatch(os.path.basename(dest_path), expected_sha256, actual_sha256)
+    os.replace(part_path, dest_path)
+    return actual_sha256
+
+def download_to_buffer(url, spill_threshold=DEFAULT_SPILL_THRESHOLD, session=None, timeout=DEFAULT_TIMEOUT,
+                       max_attempts=MAX_ATTEMPTS, expected_sha256=None):
+    """Downloads url into memory, spilling to an anonymous temporary file only past spill_threshold bytes.
+
+    Returns (buffer, sha256): a rewound SpooledTemporaryFile the caller must close, and the
+    digest hashed while streaming. Interrupted downloads resume from what is already
+    buffered. A mismatch with expected_sha256 discards the buffer and raises ChecksumMismatch.
+    """
+    session = session or get_session()
+    label = url.rsplit("/", 1)[-1]
+    buffer = tempfile.SpooledTemporaryFile(max_size=spill_threshold, prefix="night-download-")
+    validator = None
+    try:
+        with span("download", "download", url=url, in_memory=True) as trace_args:
+            for attempt in range(max_attempts):
+                offset = buffer.tell() if validator else 0
+                try:
+                    with _open_response(session, url, offset, validator, timeout) as response:
+                        if response.status_code != 206:
+                            offset = 0
+                            validator = _strong_validator(response)
+                        actual_sha256 = _receive(response, buffer, offset)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if isinstance(e, _RangeNotSatisfiable):
+                        validator = None
+                    wait_before_retry(e, attempt, max_attempts, label)
+            trace_args.update(bytes=buffer.tell(), attempts=attempt + 1)
+
+        if expected_sha256 and actual_sha256 != expected_sha256.lower():
+            raise ChecksumMismatch(label, expected_sha256, actual_sha256)
+    except BaseException:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer, actual_sha256
+
+_checksum_texts = {} # Checksum file URL -> text, so a release-wide SHA256SUMS is fetched once per run
+_checksum_texts_lock = threading.Lock()
+
+def _fetch_checksum_text(url, mirror=None, bundle_writer=None, timeout=DEFAULT_TIMEOUT):
+    with _checksum_texts_lock:
+        if url in _checksum_texts:
+            return _checksum_texts[url]
+    if mirror is not None:
+        path = mirror.asset_path(url)
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        response = get_session().get(url, timeout=timeout)
+        response.raise_for_status()
+        text = response.text
+        if bundle_writer is not None:
+            bundle_writer.add_asset_data(url, url.rsplit("/", 1)[-1], text.encode("utf-8"))
+    with _checksum_texts_lock:
+        _checksum_texts[url] = text
+    return text
+
+def find_expected_sha256(assets, asset_name, mirror=None, bundle_writer=None):
+    """Returns the published SHA-256 of a release asset, or None if the release has none.
+
+    Prefers the digest GitHub reports for the asset itself; otherwise looks for a checksum
+    file in the same release ("<asset>.sha256", SHA256SUMS, checksums.txt, ...). Checksum
+    files are served from the mirror when one is given and recorded by bundle_writer.
+    """
+    for asset in assets:
+        if asset.get("name") == asset_name and asset_sha256(asset):
+            return asset_sha256(asset)
+    checksum_asset = find_checksum_asset(assets, asset_name)
+    if checksum_asset is None or not checksum_asset.get("browser_download_url"):
+        return None
+    try:
+        text = _fetch_checksum_text(checksum_asset["browser_download_url"], mirror, bundle_writer)
+    except (OSError, requests.exceptions.RequestException) as e:
+        print(f"  Warning: could not read checksum file {checksum_asset.get('name')}: {e}")
+        return None
+    return parse_checksum_file(text, asset_name) if text is not None else None
+
+def add_download_arguments(parser):
+    """Adds the shared download options to an argparse parser."""
+    parser.add_argument(
+        "--spill-threshold", type=parse_size, default=DEFAULT_SPILL_THRESHOLD,
+        help="Keep uncached downloads in memory up to this size before spilling to a temporary file, "
+             "e.g. 16M or 1G (default: 64M)."
+    )
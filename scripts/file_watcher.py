@@ -0,0 +1,203 @@
+"""Filesystem watchers used by the repo scripts' --watch modes.
+
+open_watcher() returns an inotify watcher on Linux and falls back to polling elsewhere,
+or when inotify is unavailable (e.g. the per-user watch limit is exhausted). Both report
+the paths of changed files with a given suffix under a directory tree, recursively;
+directories created later are picked up as well. inotify is reached through ctypes so
+the scripts keep to the standard library.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+DEFAULT_POLL_INTERVAL = 0.5 # Seconds between scans for the polling watcher
+SKIPPED_DIRS = {"bin", "obj"}
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+
+def _skip_dir(name):
+    return name.startswith(".") or name in SKIPPED_DIRS
+
+def _walk_dirs(root):
+    """Yields root and every directory below it that is not hidden or build output."""
+    yield root
+    try:
+        with os.scandir(root) as entries:
+            subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False) and not _skip_dir(entry.name)]
+    except OSError:
+        return
+    for subdir in subdirs:
+        yield from _walk_dirs(subdir)
+
+def snapshot(root, suffix):
+    """Returns {path: (size, mtime_ns)} for every file ending in suffix under root."""
+    files = {}
+    for directory in _walk_dirs(root):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(suffix) and entry.is_file():
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            continue
+    return files
+
+class PollingWatcher:
+    """Detects changes by rescanning the tree every poll_interval seconds."""
+
+    kind = "polling"
+
+    def __init__(self, root, suffix, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.root = root
+        self.suffix = suffix
+        self.poll_interval = poll_interval
+        self._files = snapshot(root, suffix)
+
+    def changes(self, timeout=None):
+        """Waits up to timeout seconds (forever if None) and returns the set of changed paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            files = snapshot(self.root, self.suffix)
+            changed = {path for path in files.keys() | self._files.keys() if files.get(path) != self._files.get(path)}
+            self._files = files
+            if changed:
+                return changed
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class InotifyWatcher:
+    """Detects changes with Linux inotify, watching every directory in the tree."""
+
+    kind = "inotify"
+
+    def __init__(self, root, suffix):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.root = root
+        self.suffix = suffix
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_init1: {os.strerror(ctypes.get_errno())}")
+        self._dirs = {} # wd -> directory path
+        try:
+            self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_add_watch {directory}: {os.strerror(error)}")
+        self._dirs[wd] = directory
+
+    def _watch_tree(self, root):
+        """Watches root and its subdirectories, returning the files already inside them."""
+        found = set()
+        for directory in _walk_dirs(root):
+            self._watch(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    found.update(entry.path for entry in entries if entry.name.endswith(self.suffix) and entry.is_file())
+            except OSError:
+                continue
+        return found
+
+    def _read_events(self):
+        changed = set()
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; report everything so the caller rescans.
+                changed.update(snapshot(self.root, self.suffix))
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._dirs[wd]
+                continue
+            path = os.path.join(directory, name) if name else directory
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not _skip_dir(name):
+                    # Files may land in a new directory before its watch exists.
+                    changed.update(self._watch_tree(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changed.add(path)
+            elif name.endswith(self.suffix):
+                changed.add(path)
+        return changed
+
+    def changes(self, timeout=None):
+        """Waits up to timeout seconds (forever if None) and returns the set of changed paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return set()
+            changed = self._read_events()
+            if changed:
+                return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_watcher(root, suffix, poll_interval=DEFAULT_POLL_INTERVAL, polling=False):
+    """Returns an InotifyWatcher for root where possible, else a PollingWatcher."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, suffix)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); polling every {poll_interval}s instead.")
+    return PollingWatcher(root, suffix, poll_interval)
@@ -0,0 +1,100 @@
+"""Shared pooled HTTP transport for the repo scripts.
+
+Every GitHub API call and asset download goes through one requests.Session, so worker
+threads reuse keep-alive connections instead of paying a TCP and TLS handshake per
+request. The session applies the repo's default timeouts, identifies the scripts with a
+User-Agent, and sends GITHUB_TOKEN (or GH_TOKEN) to the GitHub API, which raises the
+rate limit from 60 to 5,000 requests an hour. The token is only ever sent to the API
+host; requests drops it on redirects to asset storage.
+
+The API base URL can be pointed at a local stand-in server with $NIGHT_GITHUB_API_URL
+or set_api_base_url(), which is how tests and benchmarks run without GitHub.
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_BASE_URL = "https://api.github.com"
+API_BASE_URL_ENV = "NIGHT_GITHUB_API_URL"
+TOKEN_ENV_VARS = ("GITHUB_TOKEN", "GH_TOKEN")
+USER_AGENT = "night-scripts"
+
+API_TIMEOUT = (10, 30) # (connect, read) seconds
+DOWNLOAD_TIMEOUT = (10, 60)
+# Connections kept alive per host; sized above the scripts' --jobs defaults so concurrent
+# workers never have to open throwaway connections.
+POOL_MAXSIZE = 32
+
+_api_base_url = None
+_session = None
+_session_lock = threading.Lock()
+
+def api_base_url():
+    """Returns the GitHub API base URL, without a trailing slash."""
+    return (_api_base_url or os.environ.get(API_BASE_URL_ENV) or DEFAULT_API_BASE_URL).rstrip("/")
+
+def set_api_base_url(url):
+    """Overrides the GitHub API base URL for this process; None restores the default."""
+    global _api_base_url
+    _api_base_url = url
+
+def api_url(path):
+    """Builds a GitHub API URL from a path such as 'repos/owner/repo/releases'."""
+    return f"{api_base_url()}/{path.lstrip('/')}"
+
+def github_token():
+    """Returns the GitHub token from the environment, or None."""
+    for name in TOKEN_ENV_VARS:
+        token = os.environ.get(name)
+        if token:
+            return token
+    return None
+
+class _GitHubTokenAuth(requests.auth.AuthBase):
+    """Adds the environment's GitHub token to requests for the API host only."""
+
+    def __call__(self, request):
+        token = github_token()
+        if token and urlsplit(request.url).netloc == urlsplit(api_base_url()).netloc:
+            request.headers["Authorization"] = f"Bearer {token}"
+        return request
+
+class _TransportSession(requests.Session):
+    """A Session that falls back to the download timeout when a caller does not pass one."""
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = DOWNLOAD_TIMEOUT
+        return super().request(method, url, **kwargs)
+
+def _build_session():
+    session = _TransportSession()
+    # Retries are handled by downloader's resumable backoff, not urllib3.
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    session.auth = _GitHubTokenAuth()
+    return session
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use.
+
+    The session only issues independent GETs, which is safe to share between worker threads.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+def close_session():
+    """Closes the shared session and its pooled connections; the next get_session() starts afresh."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,267 @@
+"""Cached, conditional GitHub API lookups for release metadata.
+
+Responses are kept on disk next to the download cache together with their ETag and
+Last-Modified validators. Later lookups revalidate with If-None-Match/If-Modified-Since,
+so an unchanged release costs a 304 (which GitHub does not count against the rate limit),
+and within --max-age seconds of the last fetch no request is made at all. A 404 is
+remembered for --max-age as well, so a tag that is missing is not looked up again.
+
+Every request also feeds the X-RateLimit-* headers into a shared tracker that pauses
+callers until the window resets once the remaining budget runs low.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+
+from download_cache import default_cache_dir
+from http_transport import API_TIMEOUT, api_url, get_session
+from tracing import span
+
+DEFAULT_TIMEOUT = API_TIMEOUT
+GITHUB_ACCEPT = "application/vnd.github+json"
+RELEASES_PER_PAGE = 100
+RATE_LIMIT_RESERVE = 5 # Requests to keep in hand before pausing for the window to reset
+MAX_RATE_LIMIT_WAIT = 15 * 60
+
+_DURATION_SUFFIXES = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_duration(value):
+    """Parses a duration in seconds such as '90', '15m', '2h' or '1d'."""
+    text = str(value).strip().lower()
+    unit = _DURATION_SUFFIXES.get(text[-1:])
+    try:
+        return float(text[:-1]) * unit if unit else float(text)
+    except ValueError:
+        raise ValueError(f"Invalid duration: {value!r}") from None
+
+class RateLimitTracker:
+    """Tracks GitHub's X-RateLimit-* headers and pauses callers before the budget runs out."""
+
+    def __init__(self, reserve=RATE_LIMIT_RESERVE):
+        self.reserve = reserve
+        self.remaining = None
+        self.reset_at = None
+        self._lock = threading.Lock()
+
+    def update(self, response):
+        """Records the rate limit state reported by a response."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_at = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset_at is None:
+            return
+        with self._lock:
+            self.remaining = int(remaining)
+            self.reset_at = float(reset_at)
+
+    def wait(self):
+        """Blocks until a request can be made without exhausting the rate limit."""
+        with self._lock:
+            if self.remaining is None or self.remaining > self.reserve:
+                if self.remaining is not None:
+                    self.remaining -= 1 # Reserve a slot for the request about to be made
+                return
+            delay = self.reset_at - time.time() + 1
+            if delay <= 0:
+                self.remaining = None
+                return
+            delay = min(delay, MAX_RATE_LIMIT_WAIT)
+            print(f"GitHub rate limit nearly exhausted ({self.remaining} left); waiting {delay:.0f}s for reset...")
+            # Sleep while holding the lock so other workers queue up behind the reset too.
+            time.sleep(delay)
+            self.remaining = None
+
+rate_limit = RateLimitTracker()
+
+def _github_get(url, headers, timeout):
+    """Issues a GET against the GitHub API, honouring and updating the shared rate limit."""
+    with span("GET", "metadata", url=url) as trace_args:
+        rate_limit.wait()
+        response = get_session().get(url, headers=headers, timeout=timeout)
+        rate_limit.update(response)
+        trace_args["status"] = response.status_code
+    return response
+
+def _next_page_url(response):
+    return response.links.get("next", {}).get("url")
+
+def _cached_not_found(url):
+    """Returns the HTTPError a fresh 404 for url raises, rebuilt from the metadata cache."""
+    response = requests.Response()
+    response.status_code = 404
+    response.url = url
+    return requests.exceptions.HTTPError(f"404 Client Error: Not Found for url: {url} (cached)", response=response)
+
+class MetadataCache:
+    """On-disk cache of GitHub API JSON responses, revalidated with conditional requests."""
+
+    def __init__(self, cache_dir=None, max_age=0):
+        self.root = os.path.join(cache_dir or default_cache_dir(), "metadata")
+        self.max_age = max_age
+
+    def _entry_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{key}.json")
+
+    def _load(self, url):
+        try:
+            with open(self._entry_path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def _store(self, url, entry):
+        path = self._entry_path(url)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def get_json(self, url, timeout=DEFAULT_TIMEOUT):
+        """Returns the JSON body for url, from cache when fresh or still valid upstream."""
+        return self.get_page(url, timeout)[0]
+
+    def get_page(self, url, timeout=DEFAULT_TIMEOUT):
+        """Returns (data, next_page_url) for url, from cache when fresh or still valid upstream."""
+        entry = self._load(url)
+        if entry and self.max_age > 0 and time.time() - entry.get("fetched_at", 0) < self.max_age:
+            if entry.get("status") == 404:
+                raise _cached_not_found(url)
+            return entry["data"], entry.get("next_url")
+        if entry and entry.get("status") == 404:
+            entry = None # A stale miss has no validators to revalidate with.
+
+        headers = {"Accept": GITHUB_ACCEPT}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = _github_get(url, headers, timeout)
+        if response.status_code == 304 and entry:
+            entry["fetched_at"] = time.time()
+            self._store(url, entry)
+            return entry["data"], entry.get("next_url")
+        if response.status_code == 404:
+            self._store(url, {"url": url, "status": 404, "fetched_at": time.time()})
+        response.raise_for_status()
+
+        data = response.json()
+        next_url = _next_page_url(response)
+        self._store(url, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "next_url": next_url,
+            "fetched_at": time.time(),
+            "data": data,
+        })
+        return data, next_url
+
+def fetch_page(url, metadata_cache=None, timeout=DEFAULT_TIMEOUT):
+    """Fetches a GitHub API URL as (json, next_page_url), through metadata_cache when given."""
+    if metadata_cache is not None:
+        return metadata_cache.get_page(url, timeout=timeout)
+    response = _github_get(url, {"Accept": GITHUB_ACCEPT}, timeout)
+    response.raise_for_status()
+    return response.json(), _next_page_url(response)
+
+def fetch_json(url, metadata_cache=None, timeout=DEFAULT_TIMEOUT):
+    """Fetches a GitHub API URL as JSON, going through metadata_cache when one is given."""
+    return fetch_page(url, metadata_cache, timeout)[0]
+
+def get_release_by_tag(owner, repo, tag, metadata_cache=None):
+    """Fetches a single release by tag name, or returns None if no published release has it."""
+    url = api_url(f"repos/{owner}/{repo}/releases/tags/{quote(tag, safe='')}")
+    try:
+        return fetch_json(url, metadata_cache)
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None
+        raise
+
+def iter_releases(owner, repo, metadata_cache=None):
+    """Yields releases newest first, fetching further pages only as they are consumed."""
+    url = api_url(f"repos/{owner}/{repo}/releases?per_page={RELEASES_PER_PAGE}")
+    while url:
+        page, url = fetch_page(url, metadata_cache)
+        yield from page or []
+
+class ReleaseListing:
+    """A repository's release listing shared by every fallback lookup in a run.
+
+    Pages are fetched only as far as a lookup needs and at most once, so lookups for
+    several tags the direct endpoint cannot see share a single pass over the listing.
+    """
+
+    def __init__(self, owner, repo, metadata_cache=None):
+        self._releases = iter_releases(owner, repo, metadata_cache)
+        self._by_tag = {}
+        self._lock = threading.Lock()
+
+    def find(self, tag):
+        """Returns the newest listed release with tag, or None if the listing has none."""
+        with self._lock:
+            if tag in self._by_tag:
+                return self._by_tag[tag]
+            for release in self._releases:
+                listed_tag = release.get("tag_name")
+                self._by_tag.setdefault(listed_tag, release)
+                if listed_tag == tag:
+                    return release
+        return None
+
+def find_listed_release(owner, repo, tag, metadata_cache=None):
+    """Searches the paginated release listing for a tag the direct endpoint cannot see, such as a draft."""
+    return ReleaseListing(owner, repo, metadata_cache).find(tag)
+
+def resolve_release_tags(owner, repo, tags, metadata_cache=None, jobs=4):
+    """Resolves release tags to release data, returning {tag: release or None}.
+
+    Each tag is looked up directly and in parallel. Tags the direct endpoint cannot see
+    (such as draft releases) fall back to a paginated listing that stops as soon as every
+    remaining tag has been found.
+    """
+    tags = list(dict.fromkeys(tags))
+    if not tags:
+        return {}
+    with span("resolve release tags", "metadata", repo=f"{owner}/{repo}", tags=tags):
+        return _resolve_release_tags(owner, repo, tags, metadata_cache, jobs)
+
+def _resolve_release_tags(owner, repo, tags, metadata_cache, jobs):
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(tags)))) as executor:
+        releases = dict(zip(tags, executor.map(lambda tag: get_release_by_tag(owner, repo, tag, metadata_cache), tags)))
+
+    missing = {tag for tag, release in releases.items() if release is None}
+    if missing:
+        print(f"Direct lookup did not find {len(missing)} tag(s); searching release listing...")
+        for release in iter_releases(owner, repo, metadata_cache):
+            tag = release.get("tag_name")
+            if tag in missing:
+                releases[tag] = release
+                missing.discard(tag)
+                if not missing:
+                    break
+    return releases
+
+def add_metadata_arguments(parser):
+    """Adds the shared release metadata cache options to an argparse parser."""
+    parser.add_argument(
+        "--max-age", type=parse_duration, default=0,
+        help="Reuse cached release metadata without contacting GitHub if it is younger than this, "
+             "e.g. 600, 15m or 1h (default: 0, always revalidate)."
+    )
+
+def metadata_cache_from_args(args):
+    """Builds a MetadataCache from parsed options, or None when caching is disabled."""
+    if args.no_cache:
+        return None
+    return MetadataCache(args.cache_dir, args.max_age)
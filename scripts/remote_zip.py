@@ -0,0 +1,250 @@
+"""Reads individual members of a remote zip archive using HTTP Range requests.
+
+Only the end-of-central-directory record, the central directory and the byte range of
+the requested member are transferred, instead of the whole archive. Servers that ignore
+Range (answering 200 instead of 206) raise RangeNotSupported so callers can fall back
+to a full download. Retryable statuses, dropped connections and short bodies raise the
+downloader's transient errors (RETRYABLE_ERRORS), so callers can back off and retry.
+"""
+import re
+import struct
+import zipfile
+import zlib
+
+from downloader import RETRYABLE_STATUS_CODES, TransientDownloadError, parse_retry_after
+from http_transport import DOWNLOAD_TIMEOUT, get_session
+
+DEFAULT_TIMEOUT = DOWNLOAD_TIMEOUT
+CHUNK_SIZE = 256 * 1024
+# The EOCD record is 22 bytes plus a comment of at most 64 KiB.
+EOCD_SEARCH_SIZE = 22 + 0xFFFF
+# Local headers usually repeat the central extra field, but they may differ; read a little extra.
+LOCAL_HEADER_SLACK = 1024
+
+_EOCD = struct.Struct("<4s4H2LH")
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_EOCD = struct.Struct("<4sQ2H2L4Q")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+class RemoteZipError(Exception):
+    """The remote archive could not be read."""
+
+class RangeNotSupported(RemoteZipError):
+    """The server does not honour HTTP Range requests."""
+
+class RemoteZip:
+    """A read-only view of a zip archive served over HTTP.
+
+    infolist() returns zipfile.ZipInfo objects parsed from the remote central directory,
+    so callers can select members the same way they would with zipfile.ZipFile.
+    """
+
+    def __init__(self, url, session=None, timeout=DEFAULT_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or get_session()
+        self.size = None
+        self.bytes_transferred = 0
+        self._infolist = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass # The session is shared; its pooled connections outlive this archive.
+
+    def _open_range(self, range_spec):
+        """Issues a ranged GET and returns the streaming response and its first byte offset."""
+        # Ask for the raw bytes so the range offsets line up with the archive's layout.
+        headers = {"Range": f"bytes={range_spec}", "Accept-Encoding": "identity"}
+        response = self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout)
+        if response.status_code != 206:
+            response.close()
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                raise TransientDownloadError(f"HTTP {response.status_code}", parse_retry_after(response))
+            if response.status_code in (200, 416):
+                raise RangeNotSupported(f"Server did not honour Range request for {self.url} (HTTP {response.status_code})")
+            response.raise_for_status()
+            raise RemoteZipError(f"Unexpected HTTP {response.status_code} for {self.url}")
+
+        match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+        if not match:
+            response.close()
+            raise RangeNotSupported(f"Missing or invalid Content-Range header from {self.url}")
+        if match.group(3) != "*":
+            self.size = int(match.group(3))
+        # Follow redirects only once; later ranges go straight to the final location.
+        self.url = response.url
+        return response, int(match.group(1))
+
+    def _read_range(self, range_spec):
+        response, start = self._open_range(range_spec)
+        with response:
+            data = response.content
+        self.bytes_transferred += len(data)
+        expected_length = response.headers.get("Content-Length")
+        if expected_length is not None and len(data) < int(expected_length):
+            raise TransientDownloadError(f"Connection closed after {len(data)} of {expected_length} bytes")
+        return data, start
+
+    def infolist(self):
+        """Returns the archive members as zipfile.ZipInfo objects."""
+        if self._infolist is None:
+            self._infolist = self._read_central_directory()
+        return self._infolist
+
+    def _read_central_directory(self):
+        tail, tail_start = self._read_range(f"-{EOCD_SEARCH_SIZE}")
+        eocd_pos = tail.rfind(b"PK\x05\x06")
+        if eocd_pos < 0 or eocd_pos + _EOCD.size > len(tail):
+            raise RemoteZipError(f"End of central directory not found in {self.url}")
+        _, _, _, _, entry_count, cd_size, cd_offset, _ = _EOCD.unpack_from(tail, eocd_pos)
+
+        if cd_offset == 0xFFFFFFFF or cd_size == 0xFFFFFFFF or entry_count == 0xFFFF:
+            cd_size, cd_offset = self._read_zip64_eocd(tail, tail_start, eocd_pos)
+
+        if cd_offset >= tail_start:
+            central_directory = tail[cd_offset - tail_start:cd_offset - tail_start + cd_size]
+        else:
+            central_directory, _ = self._read_range(f"{cd_offset}-{cd_offset + cd_size - 1}")
+        return list(_parse_central_directory(central_directory))
+
+    def _read_zip64_eocd(self, tail, tail_start, eocd_pos):
+        locator_pos = eocd_pos - _ZIP64_LOCATOR.size
+        if locator_pos < 0 or tail[locator_pos:locator_pos + 4] != b"PK\x06\x07":
+            raise RemoteZipError(f"ZIP64 end of central directory locator not found in {self.url}")
+        _, _, zip64_eocd_offset, _ = _ZIP64_LOCATOR.unpack_from(tail, locator_pos)
+        if zip64_eocd_offset >= tail_start:
+            record = tail[zip64_eocd_offset - tail_start:]
+        else:
+            record, _ = self._read_range(f"{zip64_eocd_offset}-{zip64_eocd_offset + _ZIP64_EOCD.size - 1}")
+        if record[:4] != b"PK\x06\x06":
+            raise RemoteZipError(f"Invalid ZIP64 end of central directory record in {self.url}")
+        fields = _ZIP64_EOCD.unpack_from(record)
+        return fields[8], fields[9]
+
+    def extract_to(self, info, dest_file):
+        """Streams the decompressed contents of a member into a writable binary file object.
+
+        A transient error can leave dest_file partly written; callers retrying must rewind it.
+        """
+        if info.flag_bits & 0x1:
+            raise RemoteZipError(f"{info.filename} is encrypted")
+        if info.compress_type == zipfile.ZIP_STORED:
+            decompressor = None
+        elif info.compress_type == zipfile.ZIP_DEFLATED:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        else:
+            raise RemoteZipError(f"Unsupported compression method {info.compress_type} for {info.filename}")
+
+        # Fetch the local header and the member data in one request, guessing the header size
+        # from the central directory entry.
+        requested_size = (_LOCAL_HEADER.size + len(info.orig_filename.encode("utf-8")) + len(info.extra)
+                          + LOCAL_HEADER_SLACK + info.compress_size)
+        response, _ = self._open_range(f"{info.header_offset}-{info.header_offset + requested_size - 1}")
+        try:
+            reader = _ResponseReader(response, self)
+            header = reader.read(_LOCAL_HEADER.size)
+            if len(header) < _LOCAL_HEADER.size or header[:4] != b"PK\x03\x04":
+                raise RemoteZipError(f"Invalid local file header for {info.filename}")
+            fields = _LOCAL_HEADER.unpack(header)
+            header_size = _LOCAL_HEADER.size + fields[9] + fields[10]
+
+            if header_size + info.compress_size > requested_size:
+                # The local extra field is larger than guessed; fetch the exact data range instead.
+                response.close()
+                data_start = info.header_offset + header_size
+                response, _ = self._open_range(f"{data_start}-{data_start + info.compress_size - 1}")
+                reader = _ResponseReader(response, self)
+            else:
+                reader.read(header_size - _LOCAL_HEADER.size)
+
+            remaining = info.compress_size
+            crc = 0
+            while remaining:
+                chunk = reader.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise TransientDownloadError(f"Truncated data for {info.filename}")
+                remaining -= len(chunk)
+                data = decompressor.decompress(chunk) if decompressor else chunk
+                crc = zlib.crc32(data, crc)
+                dest_file.write(data)
+            if decompressor:
+                data = decompressor.flush()
+                crc = zlib.crc32(data, crc)
+                dest_file.write(data)
+        finally:
+            response.close()
+
+        if crc != info.CRC:
+            raise RemoteZipError(f"CRC mismatch for {info.filename}")
+
+class _ResponseReader:
+    """Buffers a streaming response so exact byte counts can be read from it."""
+
+    def __init__(self, response, remote):
+        self._chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+        self._buffer = b""
+        self._remote = remote
+
+    def read(self, size):
+        """Returns size bytes, or fewer only at the end of the response."""
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._remote.bytes_transferred += len(chunk)
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def _parse_central_directory(data):
+    pos = 0
+    while pos + _CENTRAL_HEADER.size <= len(data) and data[pos:pos + 4] == b"PK\x01\x02":
+        (_, create_version, extract_version, flag_bits, compress_type, mod_time, mod_date,
+         crc, compress_size, file_size, name_len, extra_len, comment_len, _, internal_attr,
+         external_attr, header_offset) = _CENTRAL_HEADER.unpack_from(data, pos)
+        pos += _CENTRAL_HEADER.size
+        raw_name = data[pos:pos + name_len]
+        extra = data[pos + name_len:pos + name_len + extra_len]
+        pos += name_len + extra_len + comment_len
+
+        filename = raw_name.decode("utf-8" if flag_bits & 0x800 else "cp437")
+        info = zipfile.ZipInfo(filename)
+        info.orig_filename = filename
+        info.create_version = create_version
+        info.extract_version = extract_version
+        info.flag_bits = flag_bits
+        info.compress_type = compress_type
+        info.date_time = ((mod_date >> 9) + 1980, (mod_date >> 5) & 0xF, mod_date & 0x1F,
+                          mod_time >> 11, (mod_time >> 5) & 0x3F, (mod_time & 0x1F) * 2)
+        info.CRC = crc
+        info.internal_attr = internal_attr
+        info.external_attr = external_attr
+        info.extra = extra
+        info.file_size, info.compress_size, info.header_offset = _apply_zip64_extra(
+            extra, file_size, compress_size, header_offset)
+        yield info
+
+def _apply_zip64_extra(extra, file_size, compress_size, header_offset):
+    """Replaces 0xFFFFFFFF placeholders with the values from a ZIP64 extended information field."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<2H", extra, pos)
+        if header_id == 0x0001:
+            values = iter(struct.unpack_from(f"<{size // 8}Q", extra, pos + 4))
+            if file_size == 0xFFFFFFFF:
+                file_size = next(values)
+            if compress_size == 0xFFFFFFFF:
+                compress_size = next(values)
+            if header_offset == 0xFFFFFFFF:
+                header_offset = next(values)
+            break
+        pos += 4 + size
+    return file_size, compress_size, header_offset
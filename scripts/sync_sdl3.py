@@ -1,14 +1,38 @@
+import argparse
+import contextlib
+import json
 import requests
 import zipfile
 import os
+import posixpath
 import shutil
+import sys
 import tempfile
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from bundle import BundleWriter, Mirror, add_bundle_arguments
+from content_store import DEFAULT_MAX_BYTES, add_store_arguments, store_from_args
+from digests import ChecksumMismatch, hash_files, sha256_file, sha256_fileobj
+from download_cache import add_cache_arguments, cache_from_args
+from downloader import (DEFAULT_SPILL_THRESHOLD, MAX_ATTEMPTS, RETRYABLE_ERRORS, add_download_arguments,
+                        download_file as download_with_resume, download_to_buffer, find_expected_sha256,
+                        wait_before_retry)
+from release_metadata import add_metadata_arguments, metadata_cache_from_args, resolve_release_tags
+from remote_zip import RangeNotSupported, RemoteZip
+from tracing import add_trace_arguments, span, trace_from_args
 
 OWNER = "nightconcept"
 REPO = "build-sdl"
-PREBUILT_DIR = os.path.join(os.path.dirname(__file__), "..", "lib", "SDL3-Prebuilt")
-VERSION_FILE = os.path.join(PREBUILT_DIR, "version.txt")
+# Paths below are relative to the repository root passed to sync_libraries(); only the
+# command line falls back to the checkout this script lives in.
+DEFAULT_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREBUILT_SUBDIR = os.path.join("lib", "SDL3-Prebuilt")
+VERSION_FILE_NAME = "version.txt"
+LOCK_FILE_NAME = "lock.json"
+DEFAULT_JOBS = 4
+COPY_BUFFER_SIZE = 1024 * 1024
 
 LIBRARIES_CONFIG = {
     "sdl3-core": {
@@ -20,7 +44,7 @@ LIBRARIES_CONFIG = {
             "linux": "libSDL3.so.0",
         },
         "extract_subfolder": None,
-        "csproj_path": os.path.join(os.path.dirname(__file__), "..", "lib", "SDL3-CS", "SDL3-CS.Native", "SDL3-CS.Native.csproj")
+        "csproj_path": os.path.join("lib", "SDL3-CS", "SDL3-CS.Native", "SDL3-CS.Native.csproj")
     },
     "sdl2_mixer": {
         "tag_prefix": "sdl3_mixer-release-",
@@ -35,7 +59,7 @@ LIBRARIES_CONFIG = {
             "linux": "libSDL3_mixer.so.0",
         },
         "extract_subfolder": None,
-        "csproj_path": os.path.join(os.path.dirname(__file__), "..", "lib", "SDL3-CS", "SDL3-CS.Native.Mixer", "SDL3-CS.Native.Mixer.csproj")
+        "csproj_path": os.path.join("lib", "SDL3-CS", "SDL3-CS.Native.Mixer", "SDL3-CS.Native.Mixer.csproj")
     },
     "sdl3_ttf": {
         "tag_prefix": "sdl3_ttf-release-",
@@ -46,7 +70,7 @@ LIBRARIES_CONFIG = {
             "linux": "libSDL3_ttf.so.0",
         },
         "extract_subfolder": None,
-        "csproj_path": os.path.join(os.path.dirname(__file__), "..", "lib", "SDL3-CS", "SDL3-CS.Native.TTF", "SDL3-CS.Native.TTF.csproj")
+        "csproj_path": os.path.join("lib", "SDL3-CS", "SDL3-CS.Native.TTF", "SDL3-CS.Native.TTF.csproj")
     },
     "sdl3_image": {
         "tag_prefix": "sdl3_image-release-",
@@ -57,7 +81,7 @@ LIBRARIES_CONFIG = {
             "linux": "libSDL3_image.so.0",
         },
         "extract_subfolder": None,
-        "csproj_path": os.path.join(os.path.dirname(__file__), "..", "lib", "SDL3-CS", "SDL3-CS.Native.Image", "SDL3-CS.Native.Image.csproj")
+        "csproj_path": os.path.join("lib", "SDL3-CS", "SDL3-CS.Native.Image", "SDL3-CS.Native.Image.csproj")
     },
 }
 
@@ -67,17 +91,20 @@ PLATFORM_TAGS = {
     "linux": "linux-x86_64",
 }
 
-# Ensure PREBUILT_DIR subdirectories exist
-for platform in PLATFORM_TAGS.keys():
-    os.makedirs(os.path.join(PREBUILT_DIR, platform), exist_ok=True)
+HOST_PLATFORMS = {
+    "win32": "windows",
+    "darwin": "macos",
+    "linux": "linux",
+}
+
+def get_host_platform():
+    """Returns the PLATFORM_TAGS key for the running host, or None if it is not a supported platform."""
+    return HOST_PLATFORMS.get(sys.platform)
 
-def get_all_releases():
-    """Fetches all release information from GitHub."""
-    api_url = f"https://api.github.com/repos/{OWNER}/{REPO}/releases"
-    print(f"Fetching all releases from {api_url}...")
-    response = requests.get(api_url)
-    response.raise_for_status()
-    return response.json()
+def resolve_releases(tags, metadata_cache=None, jobs=DEFAULT_JOBS):
+    """Looks up the given release tags on GitHub in parallel, returning {tag: release or None}."""
+    print(f"Resolving {len(tags)} release tag(s) from {OWNER}/{REPO}...")
+    return resolve_release_tags(OWNER, REPO, tags, metadata_cache, jobs)
 
 def get_version_from_csproj(csproj_path):
     """Extracts and formats the version from a .csproj file."""
@@ -105,18 +132,6 @@ def get_version_from_csproj(csproj_path):
         print(f"Error: .csproj file not found at {csproj_path}.")
         return None
 
-def get_specific_release_by_version_tag(releases, tag_prefix, target_version_str):
-    """Finds a specific release matching a given tag prefix and version string."""
-    expected_tag_name = tag_prefix + target_version_str
-    print(f"Searching for release with exact tag: {expected_tag_name}")
-    for release in releases:
-        if release.get("tag_name", "") == expected_tag_name:
-            release["parsed_version"] = target_version_str  # Store the clean version string
-            print(f"Found specific release: {release['tag_name']}")
-            return release
-    print(f"Release with tag '{expected_tag_name}' not found.")
-    return None
-
 def find_asset_url(release_data, expected_asset_name):
     """Finds the download URL for a specific asset in the release data."""
     for asset in release_data.get("assets", []):
@@ -126,252 +141,787 @@ def find_asset_url(release_data, expected_asset_name):
     print(f"Warning: Asset '{expected_asset_name}' not found in release {release_data.get('tag_name')}")
     return None
 
-def download_file(url, dest_path):
-    """Downloads a file from a URL to a destination path."""
-    print(f"Downloading {os.path.basename(dest_path)}...")
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    with open(dest_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-    # Reduced verbosity: print("Download complete.")
-
-def extract_zip(zip_path, extract_to_path):
-    """Extracts a zip file to a specified directory."""
-    # Reduced verbosity: print(f"Extracting {zip_path} to {extract_to_path}...")
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(extract_to_path)
-    # Reduced verbosity: print("Extraction complete.")
-
-def copy_library_file(extract_path, lib_name, platform, lib_config):
-    """Copies the specific library file from the extracted path to the prebuilt directory."""
-    lib_filename = lib_config["lib_files"][platform]
+def download_file(url, dest_path, expected_sha256=None):
+    """Downloads a file from a URL to a destination path, resuming and retrying on transient errors.
+
+    Returns the file's SHA-256, hashed while streaming; raises ChecksumMismatch (leaving
+    nothing at dest_path) if it differs from expected_sha256.
+    """
+    print(f"Downloading {os.path.basename(url)}...")
+    return download_with_resume(url, dest_path, expected_sha256=expected_sha256)
+
+class LibraryNotInArchive(Exception):
+    """The release archive does not contain the expected library file."""
+
+def index_zip_members(infolist):
+    """Indexes a zip's central directory by member basename, returning {basename: [ZipInfo, ...]}."""
+    members_by_name = {}
+    for info in infolist:
+        if not info.is_dir():
+            members_by_name.setdefault(posixpath.basename(info.filename), []).append(info)
+    return members_by_name
+
+def find_library_member(members_by_name, lib_filename, extract_subfolder=None):
+    """Picks the archive member holding lib_filename, or None if the archive has none.
+
+    When several members share the name, prefer ones under extract_subfolder, then the
+    shallowest path, then ones sitting in a lib/ or bin/ directory.
+    """
+    candidates = members_by_name.get(lib_filename)
+    if not candidates:
+        return None
+    subfolder_prefix = extract_subfolder.strip("/") + "/" if extract_subfolder else None
 
-    # Determine source path, considering a potential subfolder in the zip
-    src_file_path = extract_path # Default if logic below doesn't find a better path
-    if lib_config.get("extract_subfolder"):
-        # This logic might need adjustment if the subfolder name is dynamic (e.g., versioned)
-        # For now, assumes a fixed subfolder name if provided.
-        # Example: if zip extracts to "sdl3-core-3.0.0/", then extract_subfolder could be "sdl3-core-3.0.0"
-        # However, the current LIBRARIES_CONFIG has it as None.
-
-        # Simplified: try root, then try common patterns like 'lib', 'bin'
-        possible_src_paths = [
-            os.path.join(extract_path, lib_config["extract_subfolder"], lib_filename),
-            os.path.join(extract_path, lib_config["extract_subfolder"], "lib", lib_filename),
-            os.path.join(extract_path, lib_config["extract_subfolder"], "bin", lib_filename),
-        ]
-        # Also check if the subfolder itself is the direct parent of the lib_filename
-        possible_src_paths.insert(0, os.path.join(extract_path, lib_filename)) # Check root of extract_path first
-
-        found_src_file = None
-        for p_path in possible_src_paths:
-            if os.path.exists(p_path):
-                found_src_file = p_path
-                break
-
-        if not found_src_file:
-            print(f"Warning: Library file {lib_filename} not found in standard subfolder paths for {lib_name} on {platform} with extract_subfolder '{lib_config.get('extract_subfolder')}'. Searching recursively in {extract_path}...")
-            for root, _, files in os.walk(extract_path):
-                if lib_filename in files:
-                    found_src_file = os.path.join(root, lib_filename)
-                    print(f"Found {lib_filename} at {found_src_file}")
-                    break
-            if not found_src_file:
-                print(f"Error: Library file {lib_filename} not found in {extract_path} for {lib_name} on {platform}.")
-                return False
-        src_file_path = found_src_file
-
-    else: # No extract_subfolder specified, assume lib is at root of extracted files or in a single dir.
-        src_file_path_direct = os.path.join(extract_path, lib_filename)
-        if os.path.exists(src_file_path_direct):
-            src_file_path = src_file_path_direct
-        else:
-            extracted_items = os.listdir(extract_path)
-            if len(extracted_items) == 1 and os.path.isdir(os.path.join(extract_path, extracted_items[0])):
-                # Zip extracted into a single top-level directory
-                base_extracted_dir = os.path.join(extract_path, extracted_items[0])
-
-                # Check for lib directly in this subdir
-                src_file_path_subdir_direct = os.path.join(base_extracted_dir, lib_filename)
-                if os.path.exists(src_file_path_subdir_direct):
-                    src_file_path = src_file_path_subdir_direct
-                else:
-                    # Try common subdirs like lib/ or bin/ within that single extracted directory
-                    common_subdirs_to_check = ["lib", "bin"]
-                    found_in_common_subdir = False
-                    for common_s_dir in common_subdirs_to_check:
-                        path_in_common_subdir = os.path.join(base_extracted_dir, common_s_dir, lib_filename)
-                        if os.path.exists(path_in_common_subdir):
-                            src_file_path = path_in_common_subdir
-                            found_in_common_subdir = True
-                            break
-                    if not found_in_common_subdir:
-                        # Fallback: search recursively within the single extracted directory
-                        print(f"Warning: Library file {lib_filename} not found in standard paths within {base_extracted_dir}. Searching recursively...")
-                        found_recursively = False
-                        for root, _, files in os.walk(base_extracted_dir):
-                            if lib_filename in files:
-                                src_file_path = os.path.join(root, lib_filename)
-                                print(f"Found {lib_filename} at {src_file_path}")
-                                found_recursively = True
-                                break
-                        if not found_recursively:
-                            print(f"Error: Library file {lib_filename} not found in {extract_path} or its single subdirectory '{base_extracted_dir}' for {lib_name} on {platform}.")
-                            return False
-            else: # Multiple items at root of extraction, or not a directory
-                # Fallback: search recursively from the root of extract_path
-                print(f"Warning: Library file {lib_filename} not found directly in {extract_path} and not a single subdirectory structure. Searching recursively in {extract_path}...")
-                found_recursively_at_root = False
-                for root, _, files in os.walk(extract_path):
-                    if lib_filename in files:
-                        src_file_path = os.path.join(root, lib_filename)
-                        print(f"Found {lib_filename} at {src_file_path}")
-                        found_recursively_at_root = True
-                        break
-                if not found_recursively_at_root:
-                    print(f"Error: Library file {lib_filename} not found directly in {extract_path} for {lib_name} on {platform}.")
-                    return False
-
-
-    dest_dir = os.path.join(PREBUILT_DIR, platform)
+    def rank(info):
+        parts = info.filename.split("/")
+        parent = parts[-2] if len(parts) > 1 else ""
+        outside_subfolder = not (subfolder_prefix and info.filename.startswith(subfolder_prefix))
+        return (outside_subfolder, len(parts), parent not in ("", "lib", "bin"), info.filename)
+
+    return min(candidates, key=rank)
+
+def write_library_file(prebuilt_dir, src, platform, lib_filename, mode=None, store=None):
+    """Streams a library from a binary file object into the prebuilt directory for a platform.
+
+    With a content store the library is added to the store and linked into place from
+    there; otherwise it is written to a temporary name and renamed into place. Either way
+    a failed copy never leaves a truncated library behind.
+    """
+    dest_dir = os.path.join(prebuilt_dir, platform)
     dest_file_path = os.path.join(dest_dir, lib_filename)
+    with span("install", "install", file=f"{platform}/{lib_filename}") as trace_args:
+        if store is not None:
+            trace_args["method"] = store.install(store.add_stream(src, mode), dest_file_path)
+            return
+        os.makedirs(dest_dir, exist_ok=True)
+        tmp_file_path = f"{dest_file_path}.tmp"
+        try:
+            with open(tmp_file_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            if mode:
+                os.chmod(tmp_file_path, mode & 0o777)
+            os.replace(tmp_file_path, dest_file_path)
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+def install_library_file(prebuilt_dir, zip_source, lib_name, platform, lib_config, store=None):
+    """Streams the library file for a platform out of a release zip into the prebuilt directory.
+
+    zip_source is a path or a seekable binary file object, such as an in-memory download.
+    Only the zip's central directory is read to locate the member; nothing else in the
+    archive is unpacked.
+    """
+    lib_filename = lib_config["lib_files"][platform]
+
+    with span("extract", "install", member=lib_filename), zipfile.ZipFile(zip_source, "r") as zip_ref:
+        member = find_library_member(index_zip_members(zip_ref.infolist()), lib_filename, lib_config.get("extract_subfolder"))
+        if member is None:
+            archive_name = os.path.basename(zip_source) if isinstance(zip_source, str) else "the release archive"
+            print(f"Error: Library file {lib_filename} not found in {archive_name} for {lib_name} on {platform}.")
+            return False
+        with zip_ref.open(member) as src:
+            write_library_file(prebuilt_dir, src, platform, lib_filename, member.external_attr >> 16, store)
 
-    os.makedirs(dest_dir, exist_ok=True)
-    shutil.copy2(src_file_path, dest_file_path)
-    print(f"  Successfully copied {lib_filename} for {lib_name} ({platform})")
+    print(f"  Successfully installed {lib_filename} for {lib_name} ({platform})")
     return True
 
-def update_version_file(library_versions):
-    """Updates the version.txt file with all successfully fetched library versions."""
+def stream_library_member(asset_url, lib_filename, extract_subfolder, dest_file, max_attempts=MAX_ATTEMPTS):
+    """Downloads only the library member of a remote release zip into a writable binary file object.
+
+    Uses HTTP Range requests for the zip's central directory and the member's bytes,
+    retrying transient errors with backoff (dest_file is rewound for each attempt).
+    Returns (unix_mode, bytes_transferred); unix_mode is the member's permission bits (0
+    if the archive records none). Raises RangeNotSupported if the server ignores Range,
+    LibraryNotInArchive if the archive has no such member, and the last transient error
+    once max_attempts is exhausted.
+    """
+    print(f"Fetching {lib_filename} from {os.path.basename(asset_url)}...")
+    with span("fetch member", "download", url=asset_url, member=lib_filename) as trace_args, RemoteZip(asset_url) as remote_zip:
+        try:
+            for attempt in range(max_attempts):
+                try:
+                    member = find_library_member(index_zip_members(remote_zip.infolist()), lib_filename, extract_subfolder)
+                    if member is None:
+                        raise LibraryNotInArchive(f"Library file {lib_filename} not found in {os.path.basename(asset_url)}")
+                    dest_file.seek(0)
+                    dest_file.truncate()
+                    remote_zip.extract_to(member, dest_file)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    wait_before_retry(e, attempt, max_attempts, lib_filename)
+            trace_args["attempts"] = attempt + 1
+        finally:
+            trace_args["bytes"] = remote_zip.bytes_transferred
+    return member.external_attr >> 16, remote_zip.bytes_transferred
+
+def fetch_library_member(asset_url, lib_filename, extract_subfolder, dest_path):
+    """Downloads only the library member of a remote release zip into dest_path, returning the bytes transferred."""
+    with open(dest_path, "wb") as f:
+        unix_mode, transferred = stream_library_member(asset_url, lib_filename, extract_subfolder, f)
+    if unix_mode:
+        os.chmod(dest_path, unix_mode & 0o777)
+    return transferred
+
+def install_library_from_path(prebuilt_dir, lib_path, lib_name, platform, lib_filename, store=None):
+    """Installs an already-extracted library file into the prebuilt directory."""
+    with open(lib_path, "rb") as src:
+        write_library_file(prebuilt_dir, src, platform, lib_filename, os.stat(lib_path).st_mode, store)
+    print(f"  Successfully installed {lib_filename} for {lib_name} ({platform})")
+
+def read_version_file(prebuilt_dir):
+    """Reads version.txt into {lib_key: version}."""
+    versions = {}
+    try:
+        with open(os.path.join(prebuilt_dir, VERSION_FILE_NAME), "r") as f:
+            for line in f:
+                lib_key, sep, version_str = line.strip().partition("=")
+                if sep:
+                    versions[lib_key] = version_str
+    except FileNotFoundError:
+        pass
+    return versions
+
+def update_version_file(prebuilt_dir, library_versions):
+    """Updates the version.txt file with all successfully fetched library versions.
+
+    Libraries not part of this run keep their existing line.
+    """
     if library_versions:
-        print(f"\nUpdating {VERSION_FILE} with library versions...")
-        with open(VERSION_FILE, "w") as f:
-            for lib_key, version_str in sorted(library_versions.items()):
+        version_file = os.path.join(prebuilt_dir, VERSION_FILE_NAME)
+        print(f"\nUpdating {version_file} with library versions...")
+        merged_versions = read_version_file(prebuilt_dir)
+        merged_versions.update(library_versions)
+        os.makedirs(prebuilt_dir, exist_ok=True)
+        with open(version_file, "w") as f:
+            for lib_key, version_str in sorted(merged_versions.items()):
                 f.write(f"{lib_key}={version_str}\n")
         print("Version file updated.")
     else:
         print("\nSkipping version file update as no library versions were determined.")
 
-def main():
-    library_versions = {} # To store successfully fetched versions
-    total_expected_files = 0
-    successfully_copied_files = 0
-    failed_downloads_or_copies = [] # Stores tuples of (lib_key, platform_key, reason)
-
+def load_lock_file(prebuilt_dir):
+    """Loads the lock file describing the installed libraries: {lib_key: {platform: entry}}."""
+    lock_file = os.path.join(prebuilt_dir, LOCK_FILE_NAME)
+    if not os.path.exists(lock_file):
+        return {}
     try:
-        all_releases = get_all_releases()
-        if not all_releases:
-            print("No releases found. Exiting.")
-            return
-
-        for lib_key, lib_config in LIBRARIES_CONFIG.items():
-            print(f"\nProcessing library: {lib_key}...")
-
-            csproj_path = lib_config.get("csproj_path")
-            if not csproj_path:
-                print(f"  Error: csproj_path not defined for {lib_key}. Skipping.")
-                for platform_key in PLATFORM_TAGS.keys():
-                    total_expected_files += 1
-                    failed_downloads_or_copies.append((lib_key, platform_key, "csproj_path not defined"))
-                continue
-
-            target_version_str = get_version_from_csproj(csproj_path)
-            if not target_version_str:
-                print(f"  Could not determine version for {lib_key} from {csproj_path}. Skipping all platforms for this library.")
-                for platform_key in PLATFORM_TAGS.keys():
-                    total_expected_files += 1
-                    failed_downloads_or_copies.append((lib_key, platform_key, f"Version not found in {os.path.basename(csproj_path)}"))
-                continue
-
-            print(f"  Target version from {os.path.basename(csproj_path)}: {target_version_str}")
-            specific_lib_release = get_specific_release_by_version_tag(all_releases, lib_config["tag_prefix"], target_version_str)
-
-            if not specific_lib_release:
-                print(f"  Could not find release for {lib_key} version {target_version_str}. Skipping all platforms for this library.")
-                for platform_key in PLATFORM_TAGS.keys():
-                    total_expected_files += 1
-                    failed_downloads_or_copies.append((lib_key, platform_key, f"Release for version {target_version_str} not found"))
-                continue
-
-            lib_version = specific_lib_release["parsed_version"] # Should be target_version_str
-            # Store version if release was found, even if some assets fail later
-            library_versions[lib_key] = lib_version
-
-            for platform_key, platform_tag_value in PLATFORM_TAGS.items():
-                total_expected_files += 1
-                asset_to_log_base = f"{lib_key} v{lib_version} ({platform_key})"
-
-                current_platform_tag = platform_tag_value
-
-                # Determine asset_lib_name for constructing the filename
-                asset_lib_name_config_value = lib_config["asset_lib_name"]
-                actual_asset_lib_name_for_file = ""
-
-                if isinstance(asset_lib_name_config_value, dict):
-                    actual_asset_lib_name_for_file = asset_lib_name_config_value.get(platform_key)
-                    if not actual_asset_lib_name_for_file:
-                        print(f"    Error: Platform-specific asset_lib_name for '{platform_key}' not found in config for '{lib_key}'. Skipping.")
-                        failed_downloads_or_copies.append((lib_key, platform_key, f"asset_lib_name for {platform_key} missing"))
-                        continue
-                else:
-                    actual_asset_lib_name_for_file = asset_lib_name_config_value
-
-                if lib_key == "sdl3_image" and platform_key == "macos":
-                    # SDL3_image on macOS has a special asset name for arm64
-                    expected_asset_name = f"SDL3_image-{lib_version}-macos-arm64.zip"
-                else:
-                    expected_asset_name = f"{actual_asset_lib_name_for_file}-{lib_version}-{current_platform_tag}.zip"
-
-                print(f"  Looking for asset: {expected_asset_name}")
-                asset_url = find_asset_url(specific_lib_release, expected_asset_name)
-
-                if not asset_url:
-                    print(f"    Asset not found. Skipping.")
-                    failed_downloads_or_copies.append((lib_key, platform_key, "Asset not found in release"))
-                    continue
+        with open(lock_file, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+def save_lock_file(prebuilt_dir, lock_data):
+    """Writes the lock file with stable key ordering so unchanged entries produce no diff."""
+    with open(os.path.join(prebuilt_dir, LOCK_FILE_NAME), "w") as f:
+        json.dump(lock_data, f, indent=4, sort_keys=True)
+        f.write("\n")
+
+def get_installed_library_path(prebuilt_dir, platform_key, lib_config):
+    """Returns where the library for a platform is installed in the prebuilt directory."""
+    return os.path.join(prebuilt_dir, platform_key, lib_config["lib_files"][platform_key])
+
+def build_lock_entry(prebuilt_dir, platform_key, lib_config, lib_version, asset_url, asset_sha256=None,
+                     asset_sha256_verified=True):
+    """Describes an installed library for the lock file: version, source asset, size and SHA-256.
+
+    asset_sha256, the digest of the whole release zip, is recorded when known so later
+    full downloads of the same asset can be verified even if the release publishes none.
+    A digest carried over from an earlier sync without hashing the zip again is marked
+    with "asset_sha256_verified": false.
+    """
+    installed_path = get_installed_library_path(prebuilt_dir, platform_key, lib_config)
+    entry = {
+        "version": lib_version,
+        "file": lib_config["lib_files"][platform_key],
+        "url": asset_url,
+        "size": os.path.getsize(installed_path),
+        "sha256": sha256_file(installed_path),
+    }
+    if asset_sha256:
+        entry["asset_sha256"] = asset_sha256
+        if not asset_sha256_verified:
+            entry["asset_sha256_verified"] = False
+    return entry
+
+def find_lock_drift(prebuilt_dir, lock_data, entries, jobs=DEFAULT_JOBS, store=None):
+    """Compares installed libraries against their lock entries, hashing them concurrently.
+
+    entries is an iterable of (lib_key, platform_key) pairs. Returns {(lib_key, platform_key): reason}
+    for every pair that is unrecorded, missing on disk, or whose size or digest differs.
+    Files hardlinked to their locked object in store are accepted without being read.
+    """
+    drift = {}
+    to_hash = {} # (lib_key, platform_key) -> installed path, for entries whose size still matches
+    for lib_key, platform_key in entries:
+        entry = lock_data.get(lib_key, {}).get(platform_key)
+        if not entry:
+            drift[(lib_key, platform_key)] = "Not recorded in lock file"
+            continue
+        installed_path = get_installed_library_path(prebuilt_dir, platform_key, LIBRARIES_CONFIG[lib_key])
+        try:
+            size = os.path.getsize(installed_path)
+        except OSError:
+            drift[(lib_key, platform_key)] = f"Missing {entry.get('file')}"
+            continue
+        if size != entry.get("size"):
+            drift[(lib_key, platform_key)] = f"Size {size} does not match locked size {entry.get('size')}"
+            continue
+        if store is not None and store.is_installed(entry.get("sha256"), installed_path):
+            continue
+        to_hash[(lib_key, platform_key)] = installed_path
+
+    with span("hash installed libraries", "verify", files=len(to_hash)):
+        digests = hash_files(to_hash.values(), jobs)
+    for key, installed_path in to_hash.items():
+        if digests[installed_path] != lock_data[key[0]][key[1]].get("sha256"):
+            drift[key] = "SHA-256 does not match lock file"
+    return drift
+
+def adopt_into_store(prebuilt_dir, store, lock_data, entries):
+    """Moves verified installed libraries that the store has not seen yet into it.
+
+    Each is replaced by a link to its new object, so other worktrees syncing the same
+    version share it instead of keeping their own copy. Runs once per library content.
+    """
+    for lib_key, platform_key in entries:
+        digest = lock_data[lib_key][platform_key].get("sha256")
+        if store.contains(digest):
+            continue
+        installed_path = get_installed_library_path(prebuilt_dir, platform_key, LIBRARIES_CONFIG[lib_key])
+        if store.add_file(installed_path) == digest:
+            store.install(digest, installed_path)
+
+def restore_from_store(prebuilt_dir, store, lock_data, drift, target_versions):
+    """Reinstalls drifted libraries whose locked version is current and whose content is in the store.
+
+    Needs no network access and, with hardlinks or reflinks, no data copying. Returns the
+    set of (lib_key, platform_key) pairs that were restored.
+    """
+    restored = set()
+    for lib_key, platform_key in drift:
+        entry = lock_data.get(lib_key, {}).get(platform_key)
+        if not entry or entry.get("version") != target_versions.get(lib_key) or not store.contains(entry.get("sha256")):
+            continue
+        installed_path = get_installed_library_path(prebuilt_dir, platform_key, LIBRARIES_CONFIG[lib_key])
+        method = store.install(entry["sha256"], installed_path)
+        print(f"  Restored {entry.get('file')} for {lib_key} ({platform_key}) from the local store ({method}).")
+        restored.add((lib_key, platform_key))
+    return restored
+
+def verify_libraries(repo_root, platforms=None, jobs=DEFAULT_JOBS):
+    """Checks the installed native libraries for the given platforms against the lock file.
+
+    Makes no network requests and prints nothing. Returns {"ok", "checked", "drift"}, where
+    drift lists {"library", "platform", "reason"} for every library that does not match.
+    """
+    prebuilt_dir = os.path.join(repo_root, PREBUILT_SUBDIR)
+    platforms = platforms or list(PLATFORM_TAGS)
+    entries = [(lib_key, platform_key) for lib_key in LIBRARIES_CONFIG for platform_key in platforms]
+    drift = find_lock_drift(prebuilt_dir, load_lock_file(prebuilt_dir), entries, jobs)
+    return {
+        "ok": not drift,
+        "checked": len(entries),
+        "drift": [{"library": lib_key, "platform": platform_key, "reason": reason}
+                  for (lib_key, platform_key), reason in sorted(drift.items())],
+    }
+
+def get_expected_asset_name(lib_key, lib_config, platform_key, lib_version):
+    """Builds the release asset filename for a library on a given platform, or None if not configured."""
+    asset_lib_name_config_value = lib_config["asset_lib_name"]
+    if isinstance(asset_lib_name_config_value, dict):
+        actual_asset_lib_name_for_file = asset_lib_name_config_value.get(platform_key)
+        if not actual_asset_lib_name_for_file:
+            return None
+    else:
+        actual_asset_lib_name_for_file = asset_lib_name_config_value
+
+    if lib_key == "sdl3_image" and platform_key == "macos":
+        # SDL3_image on macOS has a special asset name for arm64
+        return f"SDL3_image-{lib_version}-macos-arm64.zip"
+    return f"{actual_asset_lib_name_for_file}-{lib_version}-{PLATFORM_TAGS[platform_key]}.zip"
+
+def asset_outcome(lib_key, platform_key, version, status, reason=None, asset=None, **details):
+    """Builds the JSON-serialisable record sync_libraries() reports for one library on one platform.
+
+    status is "installed", "restored", "up-to-date" or "failed"; details carries bytes
+    downloaded, seconds spent and the asset's SHA-256 when the whole zip was hashed.
+    """
+    outcome = {"library": lib_key, "platform": platform_key, "version": version, "status": status,
+               "reason": reason, "asset": asset, "bytes": 0, "seconds": 0.0, "asset_sha256": None}
+    outcome.update(details)
+    return outcome
+
+def process_asset(prebuilt_dir, lib_key, platform_key, lib_config, lib_version, asset_name, asset_url, expected_sha256=None,
+                  expected_member_sha256=None, cache=None, use_range=True, mirror=None, bundle_writer=None, store=None,
+                  spill_threshold=DEFAULT_SPILL_THRESHOLD):
+    """Downloads, extracts and installs a single library asset.
+
+    Runs on a worker thread. With use_range only the library member is fetched from the
+    remote zip (its CRC-32 is checked against the central directory, and its SHA-256
+    against expected_member_sha256 when one is given), falling back to
+    downloading the whole zip if the server ignores Range or the ranged requests still
+    fail after their retries. A whole zip is hashed while it streams in and rejected
+    before extraction if it does not match expected_sha256.
+    Results are taken from the download cache when one is given; cached zips were
+    verified when they were stored. Without a cache nothing but the library itself is
+    written to disk: downloads are buffered in memory up to spill_threshold bytes and
+    only spill to a temporary file beyond that. With a mirror the zip comes from the
+    offline bundle instead, and with a bundle_writer the full zip is recorded into the
+    bundle being exported. With a content store the library is installed by linking it
+    from the store.
+    Returns an asset_outcome() record: "installed" or "failed" with its reason, the bytes
+    downloaded, the seconds taken and the zip's digest if the whole zip was hashed.
+    """
+    asset_to_log_base = f"{lib_key} v{lib_version} ({platform_key})"
+    lib_filename = lib_config["lib_files"][platform_key]
+    started = time.perf_counter()
+    transferred = 0
+
+    def outcome(reason=None, asset_sha256=None):
+        return asset_outcome(lib_key, platform_key, lib_version, "failed" if reason else "installed", reason, asset_name,
+                             bytes=transferred, seconds=time.perf_counter() - started, asset_sha256=asset_sha256)
+
+    with span(f"{lib_key} ({platform_key})", "asset", asset=asset_name, version=lib_version):
+        try:
+            if mirror is not None:
+                zip_path = mirror.asset_path(asset_url)
+                if zip_path is None:
+                    print(f"    {asset_name} is not in the offline bundle.")
+                    return outcome("Asset not in offline bundle")
+                actual_sha256 = None
+                if expected_sha256:
+                    actual_sha256 = sha256_file(zip_path)
+                    if actual_sha256 != expected_sha256:
+                        raise ChecksumMismatch(asset_name, expected_sha256, actual_sha256)
+                if install_library_file(prebuilt_dir, zip_path, lib_key, platform_key, lib_config, store):
+                    return outcome(asset_sha256=actual_sha256)
+                return outcome("Library file not found in asset")
+
+            if use_range and bundle_writer is None:
+                extract_subfolder = lib_config.get("extract_subfolder")
+
+                def check_member(actual_sha256):
+                    if expected_member_sha256 and actual_sha256 != expected_member_sha256:
+                        raise ChecksumMismatch(lib_filename, expected_member_sha256, actual_sha256)
 
                 try:
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        zip_filename = expected_asset_name
-                        zip_path = os.path.join(tmpdir, zip_filename)
-
-                        download_file(asset_url, zip_path)
-
-                        extract_target_path = os.path.join(tmpdir, f"extracted_{lib_key}_{platform_key}_{lib_version}")
-                        os.makedirs(extract_target_path, exist_ok=True)
-                        extract_zip(zip_path, extract_target_path)
-
-                        if copy_library_file(extract_target_path, lib_key, platform_key, lib_config):
-                            successfully_copied_files +=1
-                        else:
-                            # Error already printed in copy_library_file
-                            failed_downloads_or_copies.append((lib_key, platform_key, "Copy failed"))
-                except Exception as e_inner:
-                    print(f"    Error processing {asset_to_log_base}: {e_inner}")
-                    failed_downloads_or_copies.append((lib_key, platform_key, f"Exception: {e_inner}"))
-
-        update_version_file(library_versions)
-
+                    if cache is not None:
+                        def fetch_member(dest):
+                            nonlocal transferred
+                            transferred = fetch_library_member(asset_url, lib_filename, extract_subfolder, dest)
+                            check_member(sha256_file(dest))
+                        # Cache the extracted member under its asset so it never collides with the zip itself.
+                        lib_path, cache_hit = cache.fetch(lib_filename, f"{lib_version}/{asset_name}", fetch_member)
+                        if cache_hit:
+                            print(f"Using cached {lib_filename} from {asset_name}")
+                        install_library_from_path(prebuilt_dir, lib_path, lib_key, platform_key, lib_filename, store)
+                    else:
+                        with tempfile.SpooledTemporaryFile(max_size=spill_threshold) as buffer:
+                            unix_mode, transferred = stream_library_member(asset_url, lib_filename, extract_subfolder, buffer)
+                            if expected_member_sha256:
+                                buffer.seek(0)
+                                check_member(sha256_fileobj(buffer))
+                            buffer.seek(0)
+                            write_library_file(prebuilt_dir, buffer, platform_key, lib_filename, unix_mode, store)
+                        print(f"  Successfully installed {lib_filename} for {lib_key} ({platform_key})")
+                    # Only the member was fetched, so the zip's digest stays unverified.
+                    return outcome()
+                except RangeNotSupported as e:
+                    print(f"  {e}; downloading the full {asset_name} instead.")
+                except RETRYABLE_ERRORS as e:
+                    print(f"  Range requests for {asset_name} kept failing ({e}); downloading the full zip instead.")
+                except LibraryNotInArchive as e:
+                    print(f"Error: {e} for {lib_key} on {platform_key}.")
+                    return outcome("Library file not found in asset")
+
+            asset_sha256 = None # Set only when this run hashes the whole zip
+            with contextlib.ExitStack() as stack:
+                if cache is not None:
+                    def download_into_cache(dest):
+                        nonlocal asset_sha256, transferred
+                        asset_sha256 = download_file(asset_url, dest, expected_sha256)
+                        transferred = os.path.getsize(dest)
+                    zip_path, cache_hit = cache.fetch(asset_name, lib_version, download_into_cache)
+                    if cache_hit:
+                        print(f"Using cached {asset_name}")
+                    zip_file = stack.enter_context(open(zip_path, "rb"))
+                else:
+                    # Without a cache the zip only needs to live long enough to extract from.
+                    print(f"Downloading {asset_name}...")
+                    zip_file, asset_sha256 = download_to_buffer(asset_url, spill_threshold, expected_sha256=expected_sha256)
+                    stack.enter_context(zip_file)
+                    transferred = zip_file.seek(0, os.SEEK_END)
+                    zip_file.seek(0)
+
+                if bundle_writer is not None:
+                    bundle_writer.add_asset(asset_url, asset_name, zip_file)
+
+                if install_library_file(prebuilt_dir, zip_file, lib_key, platform_key, lib_config, store):
+                    return outcome(asset_sha256=asset_sha256)
+                # Error already printed in install_library_file
+                return outcome("Library file not found in asset")
+        except ChecksumMismatch as e:
+            print(f"    Error: {e}; nothing was installed from {asset_name}.")
+            return outcome("Checksum mismatch")
+        except Exception as e_inner:
+            print(f"    Error processing {asset_to_log_base}: {e_inner}")
+            return outcome(f"Exception: {e_inner}")
+
+def parse_args(argv=None):
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Sync prebuilt SDL3 native libraries into lib/SDL3-Prebuilt.")
+    parser.add_argument(
+        "--root", default=DEFAULT_REPO_ROOT,
+        help="Repository root holding lib/SDL3-CS and lib/SDL3-Prebuilt (default: this script's checkout)."
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=DEFAULT_JOBS,
+        help=f"Number of assets to download and install concurrently (default: {DEFAULT_JOBS})."
+    )
+    parser.add_argument(
+        "--no-range", action="store_true",
+        help="Download whole release zips instead of fetching only the library member with HTTP Range requests."
+    )
+    parser.add_argument(
+        "--verify", action="store_true",
+        help="Only check the installed libraries against the lock file and exit non-zero on drift; no network access."
+    )
+    parser.add_argument(
+        "--platform", action="append", choices=[*PLATFORM_TAGS.keys(), "all"], dest="platforms",
+        help="Platform to sync or verify; repeat for several, or use 'all' for release packaging "
+             "(default: the host platform)."
+    )
+    add_cache_arguments(parser)
+    add_download_arguments(parser)
+    add_store_arguments(parser)
+    add_metadata_arguments(parser)
+    add_bundle_arguments(parser)
+    add_trace_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    args.platforms = select_platforms(parser, args.platforms)
+    return args
+
+def select_platforms(parser, platforms):
+    """Resolves --platform values to PLATFORM_TAGS keys: the host platform by default, every platform for 'all'."""
+    if not platforms:
+        host_platform = get_host_platform()
+        if host_platform is None:
+            parser.error(f"Unsupported host platform '{sys.platform}'; pass --platform explicitly.")
+        return [host_platform]
+    if "all" in platforms:
+        return list(PLATFORM_TAGS.keys())
+    # Keep PLATFORM_TAGS order so output and the summary are stable.
+    return [platform_key for platform_key in PLATFORM_TAGS.keys() if platform_key in platforms]
+
+def plan_libraries(repo_root, platforms=None, jobs=DEFAULT_JOBS, store=None, exporting=False):
+    """Works out, without network access, which libraries need fetching.
+
+    Reads the target versions from the SDL3-CS .csproj files and diffs them against the
+    lock file and the installed libraries (restoring drifted ones from the store when it
+    has them). exporting treats every entry as stale, since a bundle needs every asset.
+    Returns the plan the other sync phases share: "pending" maps each library still to
+    be fetched to its platforms and release tag, and "outcomes" already holds the
+    up-to-date, restored and failed entries.
+    """
+    prebuilt_dir = os.path.join(repo_root, PREBUILT_SUBDIR)
+    platforms = platforms or list(PLATFORM_TAGS)
+    plan = {
+        "started": time.perf_counter(),
+        "prebuilt_dir": prebuilt_dir,
+        "platforms": platforms,
+        "lock_data": {},
+        "target_versions": {},
+        "versions": {}, # To store successfully fetched versions
+        "pending": {}, # lib_key -> {"tag", "platforms"}
+        "outcomes": [], # One asset_outcome() per (library, platform)
+        "error": None,
+    }
+    outcomes = plan["outcomes"]
+
+    print(f"Syncing platform(s): {', '.join(platforms)}")
+    # Read every target version locally first so all release tags can resolve in one parallel batch.
+    target_versions = plan["target_versions"]
+    for lib_key, lib_config in LIBRARIES_CONFIG.items():
+        csproj_path = lib_config.get("csproj_path")
+        if not csproj_path:
+            print(f"  Error: csproj_path not defined for {lib_key}. Skipping.")
+            outcomes.extend(asset_outcome(lib_key, platform_key, None, "failed", "csproj_path not defined")
+                            for platform_key in platforms)
+            continue
+
+        csproj_path = os.path.join(repo_root, csproj_path)
+        with span("read csproj version", "plan", library=lib_key):
+            target_version_str = get_version_from_csproj(csproj_path)
+        if not target_version_str:
+            print(f"  Could not determine version for {lib_key} from {csproj_path}. Skipping all platforms for this library.")
+            reason = f"Version not found in {os.path.basename(csproj_path)}"
+            outcomes.extend(asset_outcome(lib_key, platform_key, None, "failed", reason) for platform_key in platforms)
+            continue
+
+        print(f"Target version for {lib_key} from {os.path.basename(csproj_path)}: {target_version_str}")
+        target_versions[lib_key] = target_version_str
+
+    if not target_versions:
+        print("No library versions could be determined. Exiting.")
+        return plan
+
+    # Plan the sync as a diff against the lock file: only entries whose version changed
+    # or whose installed file no longer matches its recorded digest are fetched.
+    lock_data = plan["lock_data"] = load_lock_file(prebuilt_dir)
+    restored = set()
+    if exporting:
+        drift = {(lib_key, platform_key): "Exporting bundle" for lib_key in target_versions for platform_key in platforms}
+    else:
+        entries = [(lib_key, platform_key) for lib_key in target_versions for platform_key in platforms]
+        drift = find_lock_drift(prebuilt_dir, lock_data, entries, jobs, store)
+        if store is not None:
+            with span("content store", "install"):
+                adopt_into_store(prebuilt_dir, store, lock_data, [key for key in entries if key not in drift])
+                restored = restore_from_store(prebuilt_dir, store, lock_data, drift, target_versions)
+                for key in restored:
+                    del drift[key]
+    for lib_key, target_version_str in target_versions.items():
+        stale_platforms = []
+        for platform_key in platforms:
+            if (lib_key, platform_key) in drift or lock_data[lib_key][platform_key].get("version") != target_version_str:
+                stale_platforms.append(platform_key)
+            else:
+                status = "restored" if (lib_key, platform_key) in restored else "up-to-date"
+                outcomes.append(asset_outcome(lib_key, platform_key, target_version_str, status))
+        if stale_platforms:
+            plan["pending"][lib_key] = {"tag": LIBRARIES_CONFIG[lib_key]["tag_prefix"] + target_version_str,
+                                        "platforms": stale_platforms}
+        else:
+            plan["versions"][lib_key] = target_version_str
+
+    if not plan["pending"]:
+        print("\nAll native libraries match the lock file. Nothing to fetch.")
+    return plan
+
+def library_asset_jobs(plan, lib_key, release, mirror=None, bundle_writer=None, error=None):
+    """Turns a pending library's resolved release (or None) into process_asset() jobs.
+
+    Returns a list of (lib_key, platform_key, lib_config, lib_version, asset_name,
+    asset_url, expected_sha256, expected_member_sha256) tuples, the last being the
+    locked library's SHA-256 when the lock already records this version; platforms that
+    cannot be fetched are recorded as failed in the plan instead. error is the exception that kept the release from being
+    resolved, if any; it becomes the failure reason instead of "not found".
+    """
+    lib_config = LIBRARIES_CONFIG[lib_key]
+    target_version_str = plan["target_versions"][lib_key]
+    platform_keys = plan["pending"][lib_key]["platforms"]
+    outcomes = plan["outcomes"]
+    print(f"\nProcessing library: {lib_key}...")
+    if release is None:
+        if error is not None:
+            print(f"  Could not look up the release for {lib_key} version {target_version_str} ({error}). "
+                  f"Skipping all platforms for this library.")
+            reason = f"Release lookup failed: {error}"
+        else:
+            print(f"Release with tag '{plan['pending'][lib_key]['tag']}' not found.")
+            print(f"  Could not find release for {lib_key} version {target_version_str}. Skipping all platforms for this library.")
+            reason = f"Release for version {target_version_str} not found"
+        outcomes.extend(asset_outcome(lib_key, platform_key, target_version_str, "failed", reason)
+                        for platform_key in platform_keys)
+        return []
+
+    print(f"Found specific release: {release['tag_name']}")
+    lib_version = target_version_str
+    # Store version if release was found, even if some assets fail later
+    plan["versions"][lib_key] = lib_version
+
+    jobs = []
+    for platform_key in platform_keys:
+        expected_asset_name = get_expected_asset_name(lib_key, lib_config, platform_key, lib_version)
+        if not expected_asset_name:
+            print(f"    Error: Platform-specific asset_lib_name for '{platform_key}' not found in config for '{lib_key}'. Skipping.")
+            outcomes.append(asset_outcome(lib_key, platform_key, lib_version, "failed",
+                                          f"asset_lib_name for {platform_key} missing"))
+            continue
+
+        print(f"  Looking for asset: {expected_asset_name}")
+        asset_url = find_asset_url(release, expected_asset_name)
+
+        if not asset_url:
+            print(f"    Asset not found. Skipping.")
+            outcomes.append(asset_outcome(lib_key, platform_key, lib_version, "failed", "Asset not found in release",
+                                          expected_asset_name))
+            continue
+
+        locked = plan["lock_data"].get(lib_key, {}).get(platform_key, {})
+        expected_sha256 = find_expected_sha256(release.get("assets", []), expected_asset_name, mirror, bundle_writer)
+        if not expected_sha256 and locked.get("url") == asset_url:
+            # Fall back to the digest recorded the last time this exact asset was downloaded.
+            expected_sha256 = locked.get("asset_sha256")
+        # Reinstalling the locked version must reproduce the library the lock recorded.
+        expected_member_sha256 = locked.get("sha256") if locked.get("version") == lib_version else None
+
+        jobs.append((lib_key, platform_key, lib_config, lib_version, expected_asset_name, asset_url, expected_sha256,
+                     expected_member_sha256))
+    return jobs
+
+def finish_libraries(plan, completed, store=None, store_max_bytes=DEFAULT_MAX_BYTES):
+    """Records finished process_asset() jobs in the lock and version files and returns the sync result.
+
+    completed is a list of (job, outcome) pairs. The result is JSON-serialisable:
+    {"ok", "error", "seconds", "bytes", "versions", "assets"}, where versions maps each
+    library to the version now recorded in version.txt and assets holds one
+    asset_outcome() per library and platform, in configuration order.
+    """
+    prebuilt_dir = plan["prebuilt_dir"]
+    lock_data = plan["lock_data"]
+    library_versions = plan["versions"]
+    try:
+        installed_count = 0
+        for job, outcome in completed:
+            lib_key, platform_key, lib_config, lib_version, _, asset_url = job[:6]
+            plan["outcomes"].append(outcome)
+            if outcome["status"] == "installed":
+                installed_count += 1
+                asset_sha256, verified = outcome["asset_sha256"], True
+                previous = lock_data.get(lib_key, {}).get(platform_key, {})
+                if asset_sha256 is None and previous.get("url") == asset_url:
+                    # The zip was not hashed this time; keep the earlier digest but flag it.
+                    asset_sha256, verified = previous.get("asset_sha256"), False
+                lock_data.setdefault(lib_key, {})[platform_key] = build_lock_entry(
+                    prebuilt_dir, platform_key, lib_config, lib_version, asset_url, asset_sha256, verified)
+        if installed_count:
+            with span("write lock file", "plan"):
+                save_lock_file(prebuilt_dir, lock_data)
+        if completed and store is not None:
+            with span("evict content store", "install"):
+                store.evict(store_max_bytes)
+
+        if plan["pending"]:
+            if len(plan["platforms"]) < len(PLATFORM_TAGS):
+                # A partial sync only moves a library's version once every platform in the lock agrees.
+                library_versions = {
+                    lib_key: version_str for lib_key, version_str in library_versions.items()
+                    if all(lock_data.get(lib_key, {}).get(platform_key, {}).get("version") == version_str
+                           for platform_key in PLATFORM_TAGS.keys())
+                }
+            update_version_file(prebuilt_dir, library_versions)
+    except Exception as e:
+        print(f"\nAn unexpected error occurred: {e}")
+        plan["error"] = f"Unexpected error: {e}"
+
+    library_order = {lib_key: index for index, lib_key in enumerate(LIBRARIES_CONFIG)}
+    platform_order = {platform_key: index for index, platform_key in enumerate(PLATFORM_TAGS)}
+    outcomes = sorted(plan["outcomes"], key=lambda outcome: (library_order.get(outcome["library"], len(library_order)),
+                                                             platform_order.get(outcome["platform"], len(platform_order))))
+    return {
+        "ok": plan["error"] is None and all(outcome["status"] != "failed" for outcome in outcomes),
+        "error": plan["error"],
+        "seconds": time.perf_counter() - plan["started"],
+        "bytes": sum(outcome["bytes"] for outcome in outcomes),
+        "versions": library_versions,
+        "assets": outcomes,
+    }
+
+def sync_libraries(repo_root, platforms=None, jobs=DEFAULT_JOBS, cache=None, store=None, metadata_cache=None,
+                   mirror=None, bundle_writer=None, use_range=True, spill_threshold=DEFAULT_SPILL_THRESHOLD,
+                   store_max_bytes=DEFAULT_MAX_BYTES):
+    """Brings the prebuilt libraries under repo_root up to the versions its SDL3-CS .csproj files pin.
+
+    repo_root is the checkout holding lib/SDL3-CS and lib/SDL3-Prebuilt; platforms defaults
+    to every platform. The caches, store, mirror and bundle_writer are the objects the
+    command line builds from its options; callers keep ownership and close them. Progress
+    is printed as the sync runs. Runs plan_libraries(), resolves the pending release tags,
+    runs the library_asset_jobs() on a pool of jobs workers and returns finish_libraries().
+    """
+    plan = plan_libraries(repo_root, platforms, jobs, store, exporting=bundle_writer is not None)
+    completed = []
+    try:
+        if plan["pending"]:
+            releases_by_tag = resolve_releases([pending["tag"] for pending in plan["pending"].values()], metadata_cache, jobs)
+            # Resolve every (library, platform) pair up front; only the resolved jobs hit the network.
+            pending_jobs = []
+            for lib_key, pending in plan["pending"].items():
+                pending_jobs.extend(library_asset_jobs(plan, lib_key, releases_by_tag.get(pending["tag"]), mirror, bundle_writer))
+            if pending_jobs:
+                print(f"\nDownloading {len(pending_jobs)} asset(s) with {min(jobs, len(pending_jobs))} worker(s)...")
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    futures = [
+                        executor.submit(process_asset, plan["prebuilt_dir"], *job, cache=cache, use_range=use_range,
+                                        mirror=mirror, bundle_writer=bundle_writer, store=store,
+                                        spill_threshold=spill_threshold)
+                        for job in pending_jobs
+                    ]
+                    # Collect in submission order so the summary does not depend on completion order.
+                    completed = [(job, future.result()) for job, future in zip(pending_jobs, futures)]
     except requests.exceptions.RequestException as e:
         print(f"\nNetwork error: {e}")
-    except zipfile.BadZipFile as e:
-        print(f"\nError: Downloaded file is not a valid zip file or is corrupted: {e}")
+        plan["error"] = f"Network error: {e}"
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
         import traceback
         traceback.print_exc()
+        plan["error"] = f"Unexpected error: {e}"
+    return finish_libraries(plan, completed, store, store_max_bytes)
+
+def print_summary(result):
+    """Prints the end-of-run summary for a sync_libraries() result."""
+    counts = {}
+    for outcome in result["assets"]:
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    print("\n--- Update Summary ---")
+    print(f"Total library files expected: {len(result['assets'])}")
+    print(f"Successfully copied:        {counts.get('installed', 0)}")
+    print(f"Already up to date:         {counts.get('up-to-date', 0) + counts.get('restored', 0)}")
+    print(f"Failed to retrieve/copy:  {counts.get('failed', 0)}")
+    failures = [outcome for outcome in result["assets"] if outcome["status"] == "failed"]
+    if failures:
+        print("\nDetails of failures/skipped files:")
+        for outcome in failures:
+            print(f"  - {outcome['library']} ({outcome['platform']}): {outcome['reason']}")
+    print(f"Downloaded {result['bytes']} byte(s) in {result['seconds']:.2f}s.")
+    print("----------------------")
+
+def print_verification(result):
+    """Prints a verify_libraries() result."""
+    print(f"Verified {result['checked'] - len(result['drift'])}/{result['checked']} native libraries against {LOCK_FILE_NAME}.")
+    for drifted in result["drift"]:
+        print(f"  - {drifted['library']} ({drifted['platform']}): {drifted['reason']}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    with trace_from_args(args, "sync_sdl3"):
+        return run(args)
+
+def run(args):
+    """Runs a sync (or --verify) for parsed command line options, returning the process exit code."""
+    if args.verify:
+        result = verify_libraries(args.root, args.platforms, args.jobs)
+        print_verification(result)
+        return 0 if result["ok"] else 1
+
+    cache = cache_from_args(args)
+    store = store_from_args(args)
+    metadata_cache = metadata_cache_from_args(args)
+    mirror = None
+    bundle_writer = None
+    if args.mirror:
+        print(f"Using offline bundle {args.mirror}; no network access.")
+        mirror = Mirror(args.mirror)
+        metadata_cache = mirror
+    elif args.export_bundle:
+        bundle_writer = BundleWriter(args.export_bundle, metadata_cache)
+        metadata_cache = bundle_writer
+    try:
+        result = sync_libraries(args.root, args.platforms, args.jobs, cache, store, metadata_cache, mirror, bundle_writer,
+                                use_range=not args.no_range, spill_threshold=args.spill_threshold,
+                                store_max_bytes=args.store_max_bytes)
+        if bundle_writer is not None and result["ok"]:
+            with span("write bundle", "bundle"):
+                bundle_writer.close()
+        print_summary(result)
     finally:
-        print("\n--- Update Summary ---")
-        print(f"Total library files expected: {total_expected_files}")
-        print(f"Successfully copied:        {successfully_copied_files}")
-        failures = total_expected_files - successfully_copied_files
-        print(f"Failed to retrieve/copy:  {failures}")
-        if failed_downloads_or_copies:
-            print("\nDetails of failures/skipped files:")
-            for lib, plat, reason in failed_downloads_or_copies:
-                print(f"  - {lib} ({plat}): {reason}")
-        print("----------------------")
+        if mirror is not None:
+            mirror.close()
+    return 0 if result["ok"] else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
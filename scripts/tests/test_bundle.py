@@ -0,0 +1,122 @@
+"""Export-then-mirror round trips of offline bundles for sync_sdl3 and update_tools."""
+import filecmp
+import os
+import sys
+import tempfile
+import pathlib
+import unittest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "benchmarks"))
+
+import http_transport # noqa: E402
+import sync_sdl3 # noqa: E402
+import update_tools # noqa: E402
+from stand_in_github import LIBRARY_VERSIONS, StandInGitHub, populate_releases # noqa: E402
+
+CSPROJ = '<Project><PropertyGroup Label="NuGet"><Version>{version}.0</Version></PropertyGroup></Project>'
+
+def _file_url(path):
+    return pathlib.Path(path).resolve().as_uri()
+
+class BundleRoundTripTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = StandInGitHub()
+        populate_releases(cls.stand_in, asset_size=16 * 1024, members=4)
+        cls.stand_in.start()
+        http_transport.close_session()
+        http_transport.set_api_base_url(cls.stand_in.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        http_transport.set_api_base_url(None)
+        http_transport.close_session()
+        cls.stand_in.stop()
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = self._tmpdir.name
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def make_repo(self, name):
+        repo_root = os.path.join(self.root, name)
+        for lib_key, lib_config in sync_sdl3.LIBRARIES_CONFIG.items():
+            path = os.path.join(repo_root, lib_config["csproj_path"])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(CSPROJ.format(version=LIBRARY_VERSIONS[lib_key]))
+        return repo_root
+
+    def assert_offline(self, run):
+        """Runs run() and checks it succeeded without a single request to the stand-in."""
+        before = self.stand_in.stats()["requests"]
+        self.assertEqual(0, run())
+        self.assertEqual(before, self.stand_in.stats()["requests"])
+
+    def sync_round_trip(self, bundle_path, mirror_source):
+        exported = self.make_repo("exported")
+        self.assertEqual(0, sync_sdl3.main(["--root", exported, "--platform", "all", "--no-cache",
+                                            "--export-bundle", bundle_path]))
+        self.assertTrue(os.path.exists(bundle_path))
+
+        mirrored = self.make_repo("mirrored")
+        self.assert_offline(lambda: sync_sdl3.main(["--root", mirrored, "--platform", "all", "--no-cache",
+                                                    "--mirror", mirror_source]))
+        self.assertTrue(sync_sdl3.verify_libraries(mirrored)["ok"])
+        prebuilt = sync_sdl3.PREBUILT_SUBDIR
+        for platform_key in sync_sdl3.PLATFORM_TAGS:
+            comparison = filecmp.dircmp(os.path.join(exported, prebuilt, platform_key),
+                                        os.path.join(mirrored, prebuilt, platform_key))
+            self.assertTrue(comparison.left_list)
+            self.assertEqual(comparison.left_list, comparison.right_list)
+            _, mismatch, errors = filecmp.cmpfiles(comparison.left, comparison.right, comparison.common_files,
+                                                   shallow=False)
+            self.assertEqual(([], []), (mismatch, errors))
+
+    def tools_round_trip(self, bundle_path, mirror_source):
+        exported = os.path.join(self.root, "exported-tools")
+        self.assertEqual(0, update_tools.main(["--tools-dir", exported, "--no-cache", "--export-bundle", bundle_path]))
+        self.assertTrue(os.path.exists(bundle_path))
+
+        mirrored = os.path.join(self.root, "mirrored-tools")
+        self.assert_offline(lambda: update_tools.main(["--tools-dir", mirrored, "--no-cache", "--mirror", mirror_source]))
+        comparison = filecmp.dircmp(exported, mirrored)
+        self.assertEqual(["crunch", "manifest.json"], sorted(comparison.left_list))
+        self.assertEqual(comparison.left_list, comparison.right_list)
+        self.assertTrue(filecmp.cmp(os.path.join(exported, "manifest.json"), os.path.join(mirrored, "manifest.json"),
+                                    shallow=False))
+        for platform_key in update_tools.PLATFORM_IDENTIFIERS:
+            platform_dir = os.path.join(update_tools.TOOL_NAME, platform_key)
+            self.assertEqual(sorted(os.listdir(os.path.join(exported, platform_dir))),
+                             sorted(os.listdir(os.path.join(mirrored, platform_dir))))
+
+    def test_sync_sdl3_round_trip_through_tar_gz(self):
+        bundle_path = os.path.join(self.root, "bundle.tar.gz")
+        self.sync_round_trip(bundle_path, bundle_path)
+
+    def test_sync_sdl3_round_trip_through_file_url(self):
+        bundle_path = os.path.join(self.root, "bundle")
+        self.sync_round_trip(bundle_path, _file_url(bundle_path))
+
+    def test_sync_sdl3_writes_no_bundle_when_an_asset_fails(self):
+        exported = self.make_repo("exported")
+        os.remove(os.path.join(exported, sync_sdl3.LIBRARIES_CONFIG["sdl3_ttf"]["csproj_path"]))
+        bundle_path = os.path.join(self.root, "bundle.tar.gz")
+        self.assertEqual(1, sync_sdl3.main(["--root", exported, "--platform", "linux", "--no-cache",
+                                            "--export-bundle", bundle_path]))
+        self.assertFalse(os.path.exists(bundle_path))
+
+    def test_update_tools_round_trip_through_tar_gz(self):
+        bundle_path = os.path.join(self.root, "bundle.tar.gz")
+        self.tools_round_trip(bundle_path, bundle_path)
+
+    def test_update_tools_round_trip_through_file_url(self):
+        bundle_path = os.path.join(self.root, "bundle.tar.gz")
+        self.tools_round_trip(bundle_path, _file_url(bundle_path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Tests for the content-addressed store used to install native libraries."""
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sync_sdl3 # noqa: E402
+from content_store import ContentStore # noqa: E402
+
+PAYLOAD = b"\x7fELF" + bytes(range(256)) * 64
+
+class ContentStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self._tmpdir.name, "cache")
+        self.worktree = os.path.join(self._tmpdir.name, "worktree")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_add_stream_names_objects_by_sha256(self):
+        store = ContentStore(self.cache_dir)
+        digest = store.add_stream(io.BytesIO(PAYLOAD), 0o755)
+        self.assertEqual(hashlib.sha256(PAYLOAD).hexdigest(), digest)
+        self.assertTrue(store.contains(digest))
+        if os.name != "nt":
+            self.assertEqual(0o555, os.stat(store.object_path(digest)).st_mode & 0o777)
+
+    def test_hardlink_install_is_unchanged_on_second_run(self):
+        store = ContentStore(self.cache_dir, "hardlink")
+        digest = store.add_stream(io.BytesIO(PAYLOAD))
+        dest = os.path.join(self.worktree, "linux", "libSDL3.so.0")
+        self.assertEqual("hardlink", store.install(digest, dest))
+        self.assertTrue(store.is_installed(digest, dest))
+        self.assertEqual("unchanged", store.install(digest, dest))
+        with open(dest, "rb") as f:
+            self.assertEqual(PAYLOAD, f.read())
+
+    def test_copy_install_replaces_existing_file(self):
+        store = ContentStore(self.cache_dir, "copy")
+        dest = os.path.join(self.worktree, "libSDL3.so.0")
+        os.makedirs(self.worktree)
+        with open(dest, "wb") as f:
+            f.write(b"old")
+        digest = store.add_stream(io.BytesIO(PAYLOAD))
+        self.assertEqual("copy", store.install(digest, dest))
+        self.assertFalse(store.is_installed(digest, dest))
+        with open(dest, "rb") as f:
+            self.assertEqual(PAYLOAD, f.read())
+        self.assertEqual(["libSDL3.so.0"], os.listdir(self.worktree))
+
+    def test_evict_keeps_objects_that_are_still_linked(self):
+        store = ContentStore(self.cache_dir, "hardlink")
+        linked = store.add_stream(io.BytesIO(PAYLOAD))
+        unlinked = store.add_stream(io.BytesIO(PAYLOAD[::-1]))
+        store.install(linked, os.path.join(self.worktree, "libSDL3.so.0"))
+        store.evict(0)
+        self.assertTrue(store.contains(linked))
+        self.assertFalse(store.contains(unlinked))
+
+    def test_store_size_limit_is_separate_from_the_download_cache(self):
+        args = sync_sdl3.parse_args(["--cache-max-bytes", "2G", "--store-max-bytes", "512M"])
+        self.assertEqual((2 * 1024 ** 3, 512 * 1024 ** 2), (args.cache_max_bytes, args.store_max_bytes))
+        self.assertEqual(1024 ** 3, sync_sdl3.parse_args([]).store_max_bytes)
+
+if __name__ == "__main__":
+    unittest.main()
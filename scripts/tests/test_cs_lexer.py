@@ -0,0 +1,113 @@
+"""Tests for the single-pass C# lexer behind update_api_doc.py."""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cs_lexer import parse_declarations, tokenize # noqa: E402
+
+SOURCE = '''
+// <copyright file="Audio.cs"> public static class Commented { } </copyright>
+namespace Night
+{
+  using System;
+
+  /// <summary>Plays sounds.</summary>
+  public static class Audio
+  {
+    private const string Brace = "}";
+    private static readonly char Open = '{';
+    public static readonly Source Silence = new(0);
+
+    public static bool IsEnabled { get; internal set; } = false;
+
+    public static int Volume => volume;
+
+    [Obsolete("Use Play(Source)")]
+    public static void Play(string path, float volume = 1.0f, bool loop = false)
+    {
+      Console.WriteLine($"Playing {path} at {Format("{0}", volume)}");
+      /* public static void NotAMethod() { */
+    }
+
+    public static Source? Load(
+        string path,
+        Dictionary<string, int> options)
+    {
+#if DEBUG
+      if (path == null) {
+#else
+      if (path == null) { {
+#endif
+        return null;
+      }
+      return @"C:\\sounds\\".Length > 0 ? new Source() : null;
+    }
+
+    public static (int Left, int Right) GetChannels(int index = 0) => (index, index);
+
+    public static T Get<T>() where T : class => default;
+
+    public static Source operator +(Source a, Source b) => a;
+
+    // public static void Stop()
+  }
+
+  public static class AudioExtensions
+  {
+    public static void Fade(this Source source, float seconds) { }
+  }
+
+  public class Source { public static void Ignored() { } }
+
+  public readonly struct Sample { }
+
+  internal class Hidden { }
+
+  public enum SourceType { Static, Stream }
+
+  public record Clip(string Name, int Length);
+}
+'''
+
+class LexerTests(unittest.TestCase):
+    def test_parses_classes_structs_enums_and_methods(self):
+        result = parse_declarations(SOURCE)
+        self.assertEqual(["Audio", "AudioExtensions"], list(result["functions"]))
+        self.assertEqual({
+            "Play": ["Play(string path, float volume, bool loop)"],
+            "Load": ["Load(string path, Dictionary<string, int> options)"],
+            "GetChannels": ["GetChannels(int index)"],
+            "Get": ["Get<T>()"],
+        }, result["functions"]["Audio"])
+        self.assertEqual({"Fade": ["Fade(this Source source, float seconds)"]}, result["functions"]["AudioExtensions"])
+        self.assertEqual(["Clip", "Sample", "Source"], result["types"])
+        self.assertEqual(["SourceType"], result["enums"])
+
+    def test_tokenize_keeps_literals_whole_and_drops_trivia(self):
+        tokens = list(tokenize('x = $"a {b["}"]} c" + @"d""e" + \'}\'; // done\n#region R\ny'))
+        self.assertEqual(["x", "=", '$"a {b["}"]} c"', "+", '@"d""e"', "+", "'}'", ";", "y"],
+                         [value for _, value, _ in tokens])
+        self.assertEqual(["ident", "punct", "string"], [kind for kind, _, _ in tokens[:3]])
+        self.assertTrue(tokens[-1][2])
+
+    def test_pathological_input_runs_in_linear_time(self):
+        line = "public static " + "a " * 50000 + "\n"
+        started = time.perf_counter()
+        result = parse_declarations("public static class Big {\n" + line * 4 + "/* unterminated " + '"' * 1000)
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual({}, result["functions"])
+
+    def test_many_calls_in_one_statement_run_in_linear_time(self):
+        initializer = " + ".join(["F(1)"] * 50000)
+        started = time.perf_counter()
+        result = parse_declarations("public static class Big {\n"
+                                    "    public static readonly int X = " + initializer + ";\n"
+                                    "    public static int Y() { return 0; }\n}\n")
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual(["Y"], list(result["functions"]["Big"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Tests for the combined `deps sync` job graph against the stand-in GitHub server."""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import requests
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "benchmarks"))
+
+import deps # noqa: E402
+import http_transport # noqa: E402
+import sync_sdl3 # noqa: E402
+from stand_in_github import LIBRARY_VERSIONS, StandInGitHub, populate_releases # noqa: E402
+
+CSPROJ = '<Project><PropertyGroup Label="NuGet"><Version>{version}.0</Version></PropertyGroup></Project>'
+
+def write_csproj_files(root):
+    for lib_key, lib_config in sync_sdl3.LIBRARIES_CONFIG.items():
+        path = os.path.join(root, lib_config["csproj_path"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CSPROJ.format(version=LIBRARY_VERSIONS[lib_key]))
+
+class DepsSyncTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = StandInGitHub()
+        populate_releases(cls.stand_in, asset_size=16 * 1024, members=4)
+        cls.stand_in.start()
+        http_transport.close_session()
+        http_transport.set_api_base_url(cls.stand_in.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        http_transport.set_api_base_url(None)
+        http_transport.close_session()
+        cls.stand_in.stop()
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = self._tmpdir.name
+        write_csproj_files(self.root)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_job_graph_runs_follow_ups(self):
+        graph = deps.JobGraph(2)
+        seen = []
+
+        def leaf(value):
+            return lambda: value, lambda result, error: seen.append(result)
+
+        def fail():
+            raise ValueError("boom")
+
+        graph.add(lambda: [1, 2], lambda values, error: [leaf(value * 10) for value in values])
+        graph.add(fail, lambda result, error: seen.append(str(error)))
+        graph.run()
+        self.assertEqual({"boom", 10, 20}, set(seen))
+        self.assertEqual(4, graph.completed)
+
+    def test_sync_dependencies_syncs_libraries_and_tools(self):
+        report = deps.sync_dependencies(self.root, jobs=4)
+        self.assertTrue(report["ok"], report)
+        self.assertEqual(12, len(report["libraries"]["assets"]))
+        self.assertEqual({"installed"}, {outcome["status"] for outcome in report["libraries"]["assets"]})
+        self.assertEqual(["updated"], [tool["status"] for tool in report["tools"]["tools"]])
+        self.assertEqual(report["libraries"]["bytes"] + report["tools"]["bytes"], report["bytes"])
+        # Four release lookups, twelve library assets, one tool check and three tool assets.
+        self.assertEqual(20, report["jobs"])
+        self.assertTrue(sync_sdl3.verify_libraries(self.root)["ok"])
+        with open(os.path.join(self.root, "tools", "manifest.json"), encoding="utf-8") as f:
+            self.assertEqual("v0.12.0", json.load(f)["crunch"]["version"])
+
+        report_path = os.path.join(self.root, "report.json")
+        self.assertEqual(0, deps.main(["sync", "--root", self.root, "--no-cache", "--report", report_path]))
+        with open(report_path, encoding="utf-8") as f:
+            again = json.load(f)
+        self.assertEqual({"up-to-date"}, {outcome["status"] for outcome in again["libraries"]["assets"]})
+        self.assertEqual(["up-to-date"], [tool["status"] for tool in again["tools"]["tools"]])
+        self.assertEqual(0, again["bytes"])
+
+    def test_release_lookup_errors_are_reported_per_asset(self):
+        class Unreachable:
+            def get_page(self, url, timeout=None):
+                raise requests.exceptions.ConnectionError("connection refused")
+
+        report = deps.sync_dependencies(self.root, platforms=["linux"], metadata_cache=Unreachable())
+        self.assertFalse(report["ok"])
+        self.assertEqual(4, len(report["libraries"]["assets"]))
+        self.assertEqual({"Release lookup failed: connection refused"},
+                         {outcome["reason"] for outcome in report["libraries"]["assets"]})
+        self.assertEqual(["failed"], [tool["status"] for tool in report["tools"]["tools"]])
+
+    def test_platform_defaults_to_the_host_like_sync_sdl3(self):
+        self.assertEqual(sync_sdl3.parse_args([]).platforms, deps.parse_args(["sync"]).platforms)
+        self.assertEqual(list(sync_sdl3.PLATFORM_TAGS), deps.parse_args(["sync", "--platform", "all"]).platforms)
+
+class DraftReleaseTests(unittest.TestCase):
+    """Syncs libraries whose releases are drafts, which only the release listing shows."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = StandInGitHub()
+        populate_releases(cls.stand_in, asset_size=16 * 1024, members=4, draft_libraries=sync_sdl3.LIBRARIES_CONFIG)
+        cls.stand_in.start()
+        http_transport.close_session()
+        http_transport.set_api_base_url(cls.stand_in.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        http_transport.set_api_base_url(None)
+        http_transport.close_session()
+        cls.stand_in.stop()
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = self._tmpdir.name
+        write_csproj_files(self.root)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_draft_releases_share_one_pass_over_the_listing(self):
+        report = deps.sync_dependencies(self.root, platforms=["linux"], jobs=4)
+        self.assertTrue(report["ok"], report)
+        self.assertEqual({"installed"}, {outcome["status"] for outcome in report["libraries"]["assets"]})
+        listing_path = f"/repos/{sync_sdl3.OWNER}/{sync_sdl3.REPO}/releases"
+        self.assertEqual([(listing_path, 200)], [entry for entry in self.stand_in.api_log if entry[0] == listing_path])
+
+if __name__ == "__main__":
+    unittest.main()
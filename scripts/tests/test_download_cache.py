@@ -0,0 +1,83 @@
+"""Tests for the download cache's LRU eviction and its handling of in-flight downloads."""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from download_cache import DownloadCache # noqa: E402
+
+def _writer(data):
+    def download(dest_path):
+        with open(dest_path, "wb") as f:
+            f.write(data)
+    return download
+
+class DownloadCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache = DownloadCache(self._tmpdir.name, max_bytes=250)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def add(self, name, mtime, size=100):
+        path, hit = self.cache.fetch(name, "1.0", _writer(b"x" * size))
+        self.assertFalse(hit)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_evicts_least_recently_used_entries_first(self):
+        self.add("a.zip", 1_000_000_000)
+        self.add("b.zip", 1_000_000_100)
+        # A hit bumps the entry's recency, so b is now the oldest.
+        self.assertIsNotNone(self.cache.get("a.zip", "1.0"))
+        self.cache.fetch("c.zip", "1.0", _writer(b"x" * 100))
+        self.assertIsNotNone(self.cache.get("a.zip", "1.0"))
+        self.assertIsNone(self.cache.get("b.zip", "1.0"))
+        self.assertIsNotNone(self.cache.get("c.zip", "1.0"))
+
+    def test_abandoned_partial_downloads_are_evicted(self):
+        entry = self.cache.entry_path("gone.zip", "1.0")
+        os.makedirs(os.path.dirname(entry))
+        with open(f"{entry}.tmp.part", "wb") as f:
+            f.write(b"x" * 200)
+        os.utime(f"{entry}.tmp.part", (1_000_000_000, 1_000_000_000))
+        self.cache.fetch("new.zip", "1.0", _writer(b"x" * 100))
+        self.assertFalse(os.path.exists(f"{entry}.tmp.part"))
+
+    def test_eviction_spares_a_concurrent_workers_partial_download(self):
+        self.add("old.zip", 1_000_000_000)
+        entry = self.cache.entry_path("slow.zip", "1.0")
+        started = threading.Event()
+        finish = threading.Event()
+
+        def slow_download(dest_path):
+            with open(f"{dest_path}.part", "wb") as f:
+                f.write(b"x" * 200)
+            os.utime(f"{dest_path}.part", (900_000_000, 900_000_000)) # Older than every entry
+            started.set()
+            finish.wait(10)
+            os.replace(f"{dest_path}.part", dest_path)
+
+        other_worker = DownloadCache(self._tmpdir.name, max_bytes=250)
+        worker = threading.Thread(target=other_worker.fetch, args=("slow.zip", "1.0", slow_download))
+        worker.start()
+        try:
+            self.assertTrue(started.wait(10))
+            # old.zip (100 bytes) and new.zip (200) overflow the cache; the older in-flight
+            # .part file must be neither counted nor removed, so old.zip goes instead.
+            self.cache.fetch("new.zip", "1.0", _writer(b"x" * 200))
+            self.assertTrue(os.path.exists(f"{entry}.tmp.part"))
+            self.assertIsNone(self.cache.get("old.zip", "1.0"))
+            self.assertIsNotNone(self.cache.get("new.zip", "1.0"))
+        finally:
+            finish.set()
+            worker.join()
+        with open(entry, "rb") as f:
+            self.assertEqual(b"x" * 200, f.read())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Tests for downloader's streaming SHA-256 verification against a local HTTP server."""
+import hashlib
+import http.server
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from digests import ChecksumMismatch, parse_checksum_file # noqa: E402
+from downloader import download_file, download_to_buffer # noqa: E402
+
+class _AssetHandler(http.server.BaseHTTPRequestHandler):
+    """Serves self.server.payload with an ETag; drops the connection after self.server.drop_after bytes once."""
+
+    def do_GET(self):
+        payload = self.server.payload
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range") or "")
+        if match and self.headers.get("If-Range") == '"v1"':
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(payload) - start))
+        self.end_headers()
+
+        body = payload[start:]
+        if self.server.drop_after is not None:
+            body, self.server.drop_after = body[:self.server.drop_after], None
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class _QuietServer(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass # Clients hanging up mid-body are part of these tests.
+
+class DownloadVerificationTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.payload = os.urandom(3 * 1024 * 1024)
+        cls.digest = hashlib.sha256(cls.payload).hexdigest()
+        cls.server = _QuietServer(("127.0.0.1", 0), _AssetHandler)
+        cls.server.payload = cls.payload
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/crunch-linux.zip"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.drop_after = None
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self._tmpdir.name, "crunch-linux.zip")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_returns_digest_of_streamed_body(self):
+        self.assertEqual(self.digest, download_file(self.url, self.dest, expected_sha256=self.digest.upper()))
+        with open(self.dest, "rb") as f:
+            self.assertEqual(self.payload, f.read())
+
+    def test_mismatch_leaves_nothing_behind(self):
+        with self.assertRaises(ChecksumMismatch):
+            download_file(self.url, self.dest, expected_sha256="0" * 64)
+        self.assertEqual([], os.listdir(self._tmpdir.name))
+
+    def test_resumed_download_is_hashed_in_full(self):
+        self.server.drop_after = len(self.payload) // 3
+        self.assertEqual(self.digest, download_file(self.url, self.dest, expected_sha256=self.digest))
+        self.assertEqual(["crunch-linux.zip"], os.listdir(self._tmpdir.name))
+
+    def test_buffer_download_resumes_in_memory(self):
+        self.server.drop_after = len(self.payload) // 2
+        buffer, digest = download_to_buffer(self.url, spill_threshold=len(self.payload) * 2, expected_sha256=self.digest)
+        with buffer:
+            self.assertEqual(self.digest, digest)
+            self.assertFalse(buffer._rolled)
+            self.assertEqual(self.payload, buffer.read())
+
+    def test_buffer_spills_past_threshold(self):
+        buffer, _ = download_to_buffer(self.url, spill_threshold=1024 * 1024)
+        with buffer:
+            self.assertTrue(buffer._rolled)
+            self.assertEqual(self.payload, buffer.read())
+
+class ChecksumFileTests(unittest.TestCase):
+    def test_parses_common_formats(self):
+        digest = "ab" * 32
+        other = "cd" * 32
+        self.assertEqual(digest, parse_checksum_file(f"{other}  other.zip\n{digest}  dist/crunch-linux.zip\n", "crunch-linux.zip"))
+        self.assertEqual(digest, parse_checksum_file(f"{digest} *crunch-linux.zip\n", "crunch-linux.zip"))
+        self.assertEqual(digest, parse_checksum_file(f"SHA256 (crunch-linux.zip) = {digest.upper()}\n", "crunch-linux.zip"))
+        self.assertEqual(digest, parse_checksum_file(f"{digest}\n", "crunch-linux.zip"))
+        self.assertIsNone(parse_checksum_file(f"{other}  other.zip\n", "crunch-linux.zip"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Tests for the inotify and polling file watchers."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from file_watcher import InotifyWatcher, PollingWatcher # noqa: E402
+
+class WatcherTests:
+    """Shared cases, mixed into a TestCase that provides make_watcher(root)."""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = self._tmpdir.name
+        self.existing = self.write("Timer/Timer.cs", "class Timer { }")
+        self.watcher = self.make_watcher(self.root)
+
+    def tearDown(self):
+        self.watcher.close()
+        self._tmpdir.cleanup()
+
+    def write(self, relpath, text, mtime=None):
+        path = os.path.join(self.root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def collect(self, expected):
+        changed = set()
+        for _ in range(20):
+            changed |= self.watcher.changes(0.2)
+            if expected <= changed:
+                break
+        return changed
+
+    def test_reports_modified_created_and_deleted_files(self):
+        self.assertEqual(set(), self.watcher.changes(0))
+        self.write("Timer/Timer.cs", "class Timer { int x; }", mtime=1_000_000_000)
+        added = self.write("Engine/Physics/Physics.cs", "class Physics { }")
+        self.write("Timer/notes.txt", "ignored")
+        os.makedirs(os.path.join(self.root, "obj"))
+        self.write("obj/Generated.cs", "class Generated { }")
+        changed = self.collect({self.existing, added})
+        self.assertEqual({self.existing, added}, changed)
+
+        os.remove(added)
+        self.assertEqual({added}, self.collect({added}))
+
+class PollingWatcherTests(WatcherTests, unittest.TestCase):
+    def make_watcher(self, root):
+        return PollingWatcher(root, ".cs", poll_interval=0.05)
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+class InotifyWatcherTests(WatcherTests, unittest.TestCase):
+    def make_watcher(self, root):
+        return InotifyWatcher(root, ".cs")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Tests for the shared HTTP transport against local stand-in servers."""
+import http.server
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import http_transport # noqa: E402
+from release_metadata import fetch_json # noqa: E402
+
+class _RecordingHandler(http.server.BaseHTTPRequestHandler):
+    """Answers every GET with a small JSON body and records (path, Authorization, client port)."""
+    protocol_version = "HTTP/1.1" # Keep-alive
+
+    def do_GET(self):
+        self.server.seen.append((self.path, self.headers.get("Authorization"), self.client_address[1]))
+        body = b'{"tag_name": "v1.0.0"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _start_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _RecordingHandler)
+    server.seen = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+class HttpTransportTests(unittest.TestCase):
+    def setUp(self):
+        self.api, self.api_url = _start_server()
+        self.assets, self.assets_url = _start_server()
+        http_transport.close_session()
+        http_transport.set_api_base_url(self.api_url)
+
+    def tearDown(self):
+        http_transport.set_api_base_url(None)
+        http_transport.close_session()
+        for server in (self.api, self.assets):
+            server.shutdown()
+            server.server_close()
+
+    def test_api_url_uses_pluggable_base(self):
+        self.assertEqual(f"{self.api_url}/repos/o/r/releases", http_transport.api_url("/repos/o/r/releases"))
+        data = fetch_json(http_transport.api_url("repos/o/r/releases/latest"))
+        self.assertEqual("v1.0.0", data["tag_name"])
+        self.assertEqual("/repos/o/r/releases/latest", self.api.seen[0][0])
+
+    def test_token_is_sent_to_the_api_host_only(self):
+        with mock.patch.dict(os.environ, {"GITHUB_TOKEN": "secret"}):
+            session = http_transport.get_session()
+            session.get(f"{self.api_url}/rate_limit").close()
+            session.get(f"{self.assets_url}/asset.zip").close()
+        self.assertEqual("Bearer secret", self.api.seen[0][1])
+        self.assertIsNone(self.assets.seen[0][1])
+
+    def test_connections_are_reused(self):
+        session = http_transport.get_session()
+        for _ in range(3):
+            session.get(f"{self.api_url}/rate_limit").close()
+        self.assertEqual(1, len({port for _, _, port in self.api.seen}))
+
+if __name__ == "__main__":
+    unittest.main()
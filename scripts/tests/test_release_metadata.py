@@ -0,0 +1,116 @@
+"""Tests for cached, conditional release metadata lookups against the stand-in GitHub server."""
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "benchmarks"))
+
+import http_transport # noqa: E402
+import release_metadata # noqa: E402
+from release_metadata import (MetadataCache, RateLimitTracker, ReleaseListing, get_release_by_tag, # noqa: E402
+                              resolve_release_tags)
+from stand_in_github import StandInGitHub # noqa: E402
+
+OWNER, REPO = "example", "widgets"
+RELEASE_COUNT = 150 # Two pages of RELEASES_PER_PAGE
+
+class ReleaseMetadataTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = StandInGitHub()
+        # Registered oldest first: the draft ends up last in the listing, on its second page.
+        cls.stand_in.add_release(OWNER, REPO, "v0.0.1-draft", {}, draft=True)
+        for index in range(RELEASE_COUNT):
+            cls.stand_in.add_release(OWNER, REPO, f"v1.{index}.0", {})
+        cls.stand_in.start()
+        http_transport.close_session()
+        http_transport.set_api_base_url(cls.stand_in.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        http_transport.set_api_base_url(None)
+        http_transport.close_session()
+        cls.stand_in.stop()
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.stand_in.api_log.clear()
+        self.stand_in.rate_limit = None
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def cache(self, max_age=0):
+        return MetadataCache(self._tmpdir.name, max_age)
+
+    def statuses(self):
+        return [status for _, status in self.stand_in.api_log]
+
+    def test_revalidates_with_etag_and_reuses_the_body_on_304(self):
+        cache = self.cache()
+        first = get_release_by_tag(OWNER, REPO, "v1.3.0", cache)
+        second = get_release_by_tag(OWNER, REPO, "v1.3.0", cache)
+        self.assertEqual("v1.3.0", first["tag_name"])
+        self.assertEqual(first, second)
+        self.assertEqual([200, 304], self.statuses())
+
+    def test_max_age_skips_requests_for_fresh_entries(self):
+        get_release_by_tag(OWNER, REPO, "v1.3.0", self.cache(max_age=3600))
+        self.assertEqual("v1.3.0", get_release_by_tag(OWNER, REPO, "v1.3.0", self.cache(max_age=3600))["tag_name"])
+        self.assertEqual([200], self.statuses())
+        # Without --max-age the cached entry is revalidated again.
+        get_release_by_tag(OWNER, REPO, "v1.3.0", self.cache())
+        self.assertEqual([200, 304], self.statuses())
+
+    def test_missing_tags_are_remembered_for_max_age(self):
+        self.assertIsNone(get_release_by_tag(OWNER, REPO, "v9.9.9", self.cache(max_age=3600)))
+        self.assertIsNone(get_release_by_tag(OWNER, REPO, "v9.9.9", self.cache(max_age=3600)))
+        self.assertEqual([404], self.statuses())
+        self.assertIsNone(get_release_by_tag(OWNER, REPO, "v9.9.9", self.cache()))
+        self.assertEqual([404, 404], self.statuses())
+
+    def test_falls_back_to_the_paginated_listing_after_a_direct_miss(self):
+        releases = resolve_release_tags(OWNER, REPO, ["v1.149.0", "v0.0.1-draft", "v9.9.9"], self.cache(), jobs=1)
+        self.assertEqual("v1.149.0", releases["v1.149.0"]["tag_name"])
+        self.assertTrue(releases["v0.0.1-draft"]["draft"])
+        self.assertIsNone(releases["v9.9.9"])
+        listing = f"/repos/{OWNER}/{REPO}/releases"
+        self.assertEqual([(listing, 200), (listing, 200)], [entry for entry in self.stand_in.api_log if entry[0] == listing])
+
+    def test_listing_stops_once_every_missing_tag_is_found(self):
+        self.stand_in.add_release(OWNER, "gadgets", "v2.0.0-draft", {}, draft=True)
+        self.stand_in.add_release(OWNER, "gadgets", "v2.0.0", {})
+        releases = resolve_release_tags(OWNER, "gadgets", ["v2.0.0-draft"], self.cache())
+        self.assertTrue(releases["v2.0.0-draft"]["draft"])
+        self.assertEqual([404, 200], self.statuses())
+
+    def test_release_listing_is_fetched_once_for_every_lookup(self):
+        listing = ReleaseListing(OWNER, REPO, self.cache())
+        self.assertEqual("v1.149.0", listing.find("v1.149.0")["tag_name"])
+        self.assertTrue(listing.find("v0.0.1-draft")["draft"])
+        self.assertEqual("v1.3.0", listing.find("v1.3.0")["tag_name"])
+        self.assertIsNone(listing.find("v9.9.9"))
+        listing_path = f"/repos/{OWNER}/{REPO}/releases"
+        self.assertEqual([(listing_path, 200), (listing_path, 200)], self.stand_in.api_log)
+
+    def test_rate_limit_tracker_waits_for_the_reset(self):
+        tracker = RateLimitTracker(reserve=2)
+        self.stand_in.rate_limit = 4
+        self.stand_in.rate_limit_reset = time.time() + 30
+        with mock.patch.object(release_metadata, "rate_limit", tracker), \
+                mock.patch.object(release_metadata.time, "sleep") as sleep:
+            get_release_by_tag(OWNER, REPO, "v1.0.0") # Leaves 3 remaining
+            get_release_by_tag(OWNER, REPO, "v1.1.0") # Leaves 2, the reserve
+            sleep.assert_not_called()
+            get_release_by_tag(OWNER, REPO, "v1.2.0")
+        sleep.assert_called_once()
+        self.assertAlmostEqual(31, sleep.call_args[0][0], delta=2)
+        self.assertEqual(3, len(self.stand_in.api_log))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Tests for remote_zip against a local HTTP server that honours Range requests."""
+import http.server
+import io
+import os
+import re
+import sys
+import threading
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sync_sdl3 # noqa: E402
+from downloader import TransientDownloadError # noqa: E402
+from remote_zip import RangeNotSupported, RemoteZip # noqa: E402
+
+class _ZipHandler(http.server.BaseHTTPRequestHandler):
+    """Serves self.server.payload, honouring single byte ranges when self.server.honour_range is set.
+
+    The first self.server.fail_next requests are answered with a 503 instead.
+    """
+
+    def do_GET(self):
+        payload = self.server.payload
+        self.server.requests.append(self.headers.get("Range"))
+        self.server.encodings.append(self.headers.get("Accept-Encoding"))
+        if self.server.fail_next:
+            self.server.fail_next -= 1
+            self._send(503, b"busy", {"Retry-After": "0"})
+            return
+        range_header = self.headers.get("Range")
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header or "")
+        if not self.server.honour_range or not match:
+            self._send(200, payload)
+            return
+
+        start, end = match.groups()
+        if start:
+            start = int(start)
+            end = min(int(end), len(payload) - 1) if end else len(payload) - 1
+        else:
+            start = max(0, len(payload) - int(end))
+            end = len(payload) - 1
+        self._send(206, payload[start:end + 1], {"Content-Range": f"bytes {start}-{end}/{len(payload)}"})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _build_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("SDL3-3.2.14/include/SDL3/SDL.h", b"#pragma once\n" * 200, zipfile.ZIP_DEFLATED)
+        zf.writestr("SDL3-3.2.14/lib/libSDL3.a", os.urandom(1024 * 1024), zipfile.ZIP_STORED)
+        zf.writestr("SDL3-3.2.14/lib/libSDL3.so.0", b"\x7fELF" + bytes(range(256)) * 2048, zipfile.ZIP_DEFLATED)
+        zf.writestr("SDL3-3.2.14/README.txt", b"stored member", zipfile.ZIP_STORED)
+    return buffer.getvalue()
+
+class RemoteZipTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.payload = _build_zip()
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ZipHandler)
+        cls.server.payload = cls.payload
+        cls.server.honour_range = True
+        cls.server.requests = []
+        cls.server.encodings = []
+        cls.server.fail_next = 0
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/SDL3-3.2.14-linux-x86_64.zip"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.honour_range = True
+        self.server.requests.clear()
+        self.server.encodings.clear()
+        self.server.fail_next = 0
+
+    def test_infolist_matches_local_central_directory(self):
+        with zipfile.ZipFile(io.BytesIO(self.payload)) as local, RemoteZip(self.url) as remote:
+            expected = [(i.filename, i.compress_type, i.compress_size, i.file_size, i.CRC, i.header_offset)
+                        for i in local.infolist()]
+            actual = [(i.filename, i.compress_type, i.compress_size, i.file_size, i.CRC, i.header_offset)
+                      for i in remote.infolist()]
+        self.assertEqual(expected, actual)
+
+    def test_extracts_deflated_and_stored_members(self):
+        with zipfile.ZipFile(io.BytesIO(self.payload)) as local, RemoteZip(self.url) as remote:
+            members = {info.filename: info for info in remote.infolist()}
+            for name in ("SDL3-3.2.14/lib/libSDL3.so.0", "SDL3-3.2.14/README.txt"):
+                out = io.BytesIO()
+                remote.extract_to(members[name], out)
+                self.assertEqual(local.read(name), out.getvalue())
+
+    def test_transfers_only_the_needed_byte_ranges(self):
+        with RemoteZip(self.url) as remote:
+            member = next(i for i in remote.infolist() if i.filename.endswith("libSDL3.so.0"))
+            remote.extract_to(member, io.BytesIO())
+            transferred = remote.bytes_transferred
+        self.assertTrue(all(header and header.startswith("bytes=") for header in self.server.requests))
+        self.assertEqual({"identity"}, set(self.server.encodings))
+        # The 1 MiB stored static library must not have been downloaded.
+        self.assertLess(transferred, len(self.payload) // 4)
+
+    def test_raises_range_not_supported_when_server_ignores_range(self):
+        self.server.honour_range = False
+        with RemoteZip(self.url) as remote:
+            with self.assertRaises(RangeNotSupported):
+                remote.infolist()
+
+    def test_retryable_status_raises_transient_error(self):
+        self.server.fail_next = 1
+        with RemoteZip(self.url) as remote:
+            with self.assertRaises(TransientDownloadError):
+                remote.infolist()
+            self.assertEqual(4, len(remote.infolist()))
+
+    def test_stream_library_member_retries_transient_errors(self):
+        self.server.fail_next = 2
+        out = io.BytesIO(b"stale bytes from an earlier attempt" * 100)
+        sync_sdl3.stream_library_member(self.url, "libSDL3.so.0", "lib", out)
+        with zipfile.ZipFile(io.BytesIO(self.payload)) as local:
+            self.assertEqual(local.read("SDL3-3.2.14/lib/libSDL3.so.0"), out.getvalue())
+        self.assertEqual(0, self.server.fail_next)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+"""Tests for the importable sync_sdl3 and update_tools APIs against the stand-in GitHub server."""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "benchmarks"))
+
+import downloader # noqa: E402
+import http_transport # noqa: E402
+import sync_sdl3 # noqa: E402
+import update_tools # noqa: E402
+from stand_in_github import LIBRARY_VERSIONS, StandInGitHub, build_zip, populate_releases # noqa: E402
+
+CSPROJ = '<Project><PropertyGroup Label="NuGet"><Version>{version}.0</Version></PropertyGroup></Project>'
+
+class SyncApiTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = StandInGitHub()
+        populate_releases(cls.stand_in, asset_size=16 * 1024, members=4)
+        cls.stand_in.add_release("example", "atlas", "v2.0.0", {
+            f"atlas-{platform}.zip": build_zip("atlas", 2, 1024, seed=index)
+            for index, platform in enumerate(("linux", "macos", "windows"))
+        })
+        cls.stand_in.start()
+        http_transport.close_session()
+        http_transport.set_api_base_url(cls.stand_in.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        http_transport.set_api_base_url(None)
+        http_transport.close_session()
+        cls.stand_in.stop()
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = self._tmpdir.name
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def write_csproj_files(self):
+        for lib_key, lib_config in sync_sdl3.LIBRARIES_CONFIG.items():
+            path = os.path.join(self.root, lib_config["csproj_path"])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(CSPROJ.format(version=LIBRARY_VERSIONS[lib_key]))
+
+    def test_import_has_no_side_effects(self):
+        code = "import sync_sdl3, update_tools"
+        env = dict(os.environ, PYTHONPATH=os.path.abspath(SCRIPTS_DIR), PYTHONDONTWRITEBYTECODE="1")
+        subprocess.run([sys.executable, "-c", code], cwd=self.root, env=env, check=True)
+        self.assertEqual([], os.listdir(self.root))
+
+    def test_sync_libraries_reports_per_asset_outcomes(self):
+        self.write_csproj_files()
+        result = sync_sdl3.sync_libraries(self.root, jobs=4)
+        self.assertTrue(result["ok"], result)
+        self.assertEqual(12, len(result["assets"]))
+        self.assertEqual({"installed"}, {outcome["status"] for outcome in result["assets"]})
+        self.assertTrue(all(outcome["bytes"] > 0 for outcome in result["assets"]))
+        self.assertEqual(sum(outcome["bytes"] for outcome in result["assets"]), result["bytes"])
+        self.assertEqual(LIBRARY_VERSIONS, result["versions"])
+        for outcome in result["assets"]:
+            lib_config = sync_sdl3.LIBRARIES_CONFIG[outcome["library"]]
+            prebuilt_dir = os.path.join(self.root, sync_sdl3.PREBUILT_SUBDIR)
+            self.assertTrue(os.path.isfile(sync_sdl3.get_installed_library_path(prebuilt_dir, outcome["platform"], lib_config)))
+        self.assertTrue(sync_sdl3.verify_libraries(self.root)["ok"])
+
+        again = sync_sdl3.sync_libraries(self.root, platforms=["linux"])
+        self.assertTrue(again["ok"])
+        self.assertEqual({"up-to-date"}, {outcome["status"] for outcome in again["assets"]})
+        self.assertEqual(0, again["bytes"])
+
+    def test_lock_only_records_zip_digests_that_were_hashed(self):
+        self.write_csproj_files()
+        prebuilt_dir = os.path.join(self.root, sync_sdl3.PREBUILT_SUBDIR)
+        result = sync_sdl3.sync_libraries(self.root, platforms=["linux"], use_range=False)
+        self.assertTrue(result["ok"], result)
+        locked = sync_sdl3.load_lock_file(prebuilt_dir)["sdl3-core"]["linux"]
+        self.assertEqual(result["assets"][0]["asset_sha256"], locked["asset_sha256"])
+        self.assertNotIn("asset_sha256_verified", locked)
+
+        # A ranged reinstall only fetches the member, so the zip digest is carried over unverified.
+        os.remove(sync_sdl3.get_installed_library_path(prebuilt_dir, "linux", sync_sdl3.LIBRARIES_CONFIG["sdl3-core"]))
+        again = sync_sdl3.sync_libraries(self.root, platforms=["linux"])
+        self.assertTrue(again["ok"], again)
+        self.assertEqual([("sdl3-core", "installed", None)],
+                         [(outcome["library"], outcome["status"], outcome["asset_sha256"]) for outcome in again["assets"][:1]])
+        relocked = sync_sdl3.load_lock_file(prebuilt_dir)["sdl3-core"]["linux"]
+        self.assertEqual(locked["asset_sha256"], relocked["asset_sha256"])
+        self.assertIs(False, relocked["asset_sha256_verified"])
+
+    def test_reinstall_rejects_a_member_that_does_not_match_the_lock(self):
+        self.write_csproj_files()
+        prebuilt_dir = os.path.join(self.root, sync_sdl3.PREBUILT_SUBDIR)
+        self.assertTrue(sync_sdl3.sync_libraries(self.root, platforms=["linux"])["ok"])
+        lock_data = sync_sdl3.load_lock_file(prebuilt_dir)
+        lock_data["sdl3-core"]["linux"]["sha256"] = "0" * 64
+        sync_sdl3.save_lock_file(prebuilt_dir, lock_data)
+        installed_path = sync_sdl3.get_installed_library_path(prebuilt_dir, "linux", sync_sdl3.LIBRARIES_CONFIG["sdl3-core"])
+        os.remove(installed_path)
+
+        result = sync_sdl3.sync_libraries(self.root, platforms=["linux"])
+        self.assertFalse(result["ok"])
+        self.assertEqual([("sdl3-core", "failed", "Checksum mismatch")],
+                         [(outcome["library"], outcome["status"], outcome["reason"]) for outcome in result["assets"][:1]])
+        self.assertFalse(os.path.exists(installed_path))
+
+    def test_sync_libraries_reports_missing_csproj(self):
+        result = sync_sdl3.sync_libraries(self.root, platforms=["linux"])
+        self.assertFalse(result["ok"])
+        self.assertEqual(4, len(result["assets"]))
+        self.assertTrue(all(outcome["reason"].startswith("Version not found") for outcome in result["assets"]))
+
+    def test_update_tool_reports_status(self):
+        tools_dir = os.path.join(self.root, "tools")
+        result = update_tools.update_tool(tools_dir)
+        self.assertEqual("updated", result["status"], result)
+        self.assertEqual(3, len(result["assets"]))
+        self.assertTrue(all(outcome["ok"] and outcome["bytes"] > 0 for outcome in result["assets"]))
+        self.assertTrue(os.listdir(os.path.join(tools_dir, update_tools.TOOL_NAME, "linux")))
+
+        again = update_tools.update_tool(tools_dir)
+        self.assertEqual("up-to-date", again["status"])
+        self.assertEqual(result["version"], again["previous_version"])
+        self.assertEqual([], again["assets"])
+
+    def test_update_tools_updates_every_declared_tool(self):
+        tools_dir = os.path.join(self.root, "tools")
+        os.makedirs(tools_dir)
+        with open(os.path.join(tools_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"atlas": {"repo": "example/atlas"}, "missing": {}}, f)
+
+        result = update_tools.update_tools(tools_dir, jobs=4)
+        statuses = {tool["tool"]: tool["status"] for tool in result["tools"]}
+        self.assertEqual({"atlas": "updated", "missing": "failed", "crunch": "updated"}, statuses)
+        self.assertFalse(result["ok"])
+        for name in ("atlas", "crunch"):
+            for platform in ("linux", "macos", "windows"):
+                self.assertTrue(os.listdir(os.path.join(tools_dir, name, platform)))
+        with open(os.path.join(tools_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual("example/atlas", manifest["atlas"]["repo"])
+        self.assertEqual("v2.0.0", manifest["atlas"]["version"])
+        self.assertEqual({"linux", "macos", "windows"}, set(manifest["atlas"]["files"]))
+        self.assertEqual(["atlas/include/file0000.h", "atlas/include/file0001.h"], list(manifest["atlas"]["files"]["linux"]))
+        self.assertEqual({}, manifest["missing"])
+
+        only_atlas = update_tools.update_tools(tools_dir, ["atlas"])
+        self.assertEqual(["atlas"], [tool["tool"] for tool in only_atlas["tools"]])
+        self.assertEqual("up-to-date", only_atlas["tools"][0]["status"])
+
+    def test_command_lines_exit_non_zero_on_failure(self):
+        sync_args = ["--root", self.root, "--platform", "linux", "--no-cache"]
+        self.assertEqual(1, sync_sdl3.main(sync_args)) # No csproj files to read versions from
+        self.write_csproj_files()
+        self.assertEqual(0, sync_sdl3.main(sync_args))
+
+        tools_dir = os.path.join(self.root, "tools")
+        os.makedirs(tools_dir)
+        with open(os.path.join(tools_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"missing": {}}, f)
+        self.assertEqual(1, update_tools.main(["--tools-dir", tools_dir, "--no-cache"]))
+        self.assertEqual(0, update_tools.main(["--tools-dir", tools_dir, "--no-cache", "--tool", "crunch"]))
+
+class SyncUnderFailuresTests(unittest.TestCase):
+    """Runs the library sync against a stand-in that fails a large share of asset requests."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = StandInGitHub(failure_rate=0.3, seed=3)
+        populate_releases(cls.stand_in, asset_size=16 * 1024, members=4)
+        cls.stand_in.start()
+        http_transport.close_session()
+        http_transport.set_api_base_url(cls.stand_in.url)
+        cls.original_backoff = downloader.BACKOFF_BASE
+        downloader.BACKOFF_BASE = 0.01
+
+    @classmethod
+    def tearDownClass(cls):
+        downloader.BACKOFF_BASE = cls.original_backoff
+        http_transport.set_api_base_url(None)
+        http_transport.close_session()
+        cls.stand_in.stop()
+
+    def test_every_asset_syncs_through_range_requests(self):
+        with tempfile.TemporaryDirectory() as root:
+            for lib_key, lib_config in sync_sdl3.LIBRARIES_CONFIG.items():
+                path = os.path.join(root, lib_config["csproj_path"])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(CSPROJ.format(version=LIBRARY_VERSIONS[lib_key]))
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                # One worker keeps the seeded failures on the same requests from run to run.
+                result = sync_sdl3.sync_libraries(root, jobs=1, use_range=True)
+            self.assertTrue(result["ok"], result)
+            self.assertTrue(sync_sdl3.verify_libraries(root)["ok"])
+        self.assertGreater(self.stand_in.stats()["failures_injected"], 0)
+        self.assertEqual({"installed"}, {outcome["status"] for outcome in result["assets"]})
+        self.assertIn("retrying", output.getvalue())
+        self.assertNotIn("downloading the full", output.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""Tests for the Chrome trace-event spans written by --trace."""
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tracing import Tracer # noqa: E402
+
+class TracerTests(unittest.TestCase):
+    def test_writes_complete_events_per_thread(self):
+        tracer = Tracer()
+        tracer.enable()
+        with tracer.span("sync", "main"):
+            def work():
+                with tracer.span("download", "download", url="http://example.invalid/a.zip") as trace_args:
+                    trace_args["bytes"] = 42
+            worker = threading.Thread(target=work, name="worker-0")
+            worker.start()
+            worker.join()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace.json")
+            tracer.write(path)
+            with open(path, encoding="utf-8") as f:
+                events = json.load(f)["traceEvents"]
+
+        spans = {event["name"]: event for event in events if event["ph"] == "X"}
+        self.assertEqual({"sync", "download"}, set(spans))
+        self.assertEqual(42, spans["download"]["args"]["bytes"])
+        self.assertNotEqual(spans["sync"]["tid"], spans["download"]["tid"])
+        self.assertLessEqual(spans["sync"]["ts"], spans["download"]["ts"])
+        self.assertGreaterEqual(spans["sync"]["ts"] + spans["sync"]["dur"], spans["download"]["ts"] + spans["download"]["dur"])
+        thread_names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+        self.assertIn("worker-0", thread_names)
+
+if __name__ == "__main__":
+    unittest.main()
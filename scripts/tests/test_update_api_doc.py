@@ -0,0 +1,165 @@
+"""Tests for incremental API.md generation in update_api_doc.py."""
+import os
+import sys
+import tempfile
+import threading
+import json
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import tracing # noqa: E402
+import update_api_doc # noqa: E402
+from update_api_doc import ParseCache # noqa: E402
+
+TIMER_CS = "namespace Night;\npublic static class Timer\n{\n  public static double GetTime() => 0;\n}\n"
+MOUSE_CS = "namespace Night;\npublic static class Mouse\n{\n  public static bool IsDown(MouseButton button) => false;\n}\n"
+BUTTON_CS = "namespace Night;\npublic enum MouseButton { Left, Right }\n"
+
+class UpdateApiDocTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = self._tmpdir.name
+        self.framework_dir = os.path.join(self.root, "src", "Night")
+        self.output = os.path.join(self.root, "docs", "API.md")
+        self.cache_dir = os.path.join(self.root, "cache")
+        self.write("Timer/Timer.cs", TIMER_CS)
+        self.write("Mouse/Mouse.cs", MOUSE_CS)
+        self.write("Mouse/MouseButton.cs", BUTTON_CS)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def write(self, relpath, text, mtime=1_000_000_000):
+        path = os.path.join(self.framework_dir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # A fixed mtime well in the past keeps entries out of the racy window.
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def run_update(self):
+        cache = ParseCache(self.framework_dir, self.cache_dir)
+        written = update_api_doc.update_api_doc(self.framework_dir, self.output, cache)
+        return written, cache
+
+    def test_only_changed_files_are_parsed_and_output_rewritten_on_change(self):
+        written, cache = self.run_update()
+        self.assertTrue(written)
+        self.assertEqual((3, 0), (cache.parsed, cache.hits))
+        with open(self.output, encoding="utf-8") as f:
+            markdown = f.read()
+        self.assertIn("- GetTime() - love.timer.getTime", markdown)
+        self.assertIn("- MouseButton", markdown)
+
+        written, cache = self.run_update()
+        self.assertFalse(written)
+        self.assertEqual((0, 3), (cache.parsed, cache.hits))
+
+        # A new mtime with the same content is settled by the content hash.
+        self.write("Timer/Timer.cs", TIMER_CS, mtime=1_100_000_000)
+        written, cache = self.run_update()
+        self.assertFalse(written)
+        self.assertEqual((0, 3), (cache.parsed, cache.hits))
+
+        self.write("Timer/Timer.cs", TIMER_CS.replace("GetTime", "GetDelta"), mtime=1_200_000_000)
+        written, cache = self.run_update()
+        self.assertTrue(written)
+        self.assertEqual((1, 2), (cache.parsed, cache.hits))
+        with open(self.output, encoding="utf-8") as f:
+            self.assertIn("- GetDelta() - love.timer.getDelta", f.read())
+
+    def test_deleted_files_are_pruned(self):
+        self.run_update()
+        os.remove(os.path.join(self.framework_dir, "Mouse", "MouseButton.cs"))
+        written, cache = self.run_update()
+        self.assertTrue(written)
+        self.assertEqual(2, len(cache.entries))
+        with open(self.output, encoding="utf-8") as f:
+            self.assertNotIn("MouseButton\n", f.read())
+
+    def test_walks_nested_namespaces_and_top_level_files(self):
+        self.write("Framework.cs", "namespace Night;\npublic static class Framework { public static void Run(IGame game) { } }\n")
+        self.write("Engine/Physics/Physics.cs", "namespace Night.Engine.Physics;\n"
+                   "public static class Physics { public static World NewWorld() => new(); }\npublic class World { }\n")
+        self.write("obj/Debug/Night.AssemblyInfo.cs", "public static class Generated { public static void Skip() { } }\n")
+        modules = [(module, os.path.relpath(path, self.framework_dir), is_main)
+                   for module, path, is_main in update_api_doc.find_cs_files(self.framework_dir)]
+        self.assertEqual([
+            ("Engine.Physics", os.path.join("Engine", "Physics", "Physics.cs"), True),
+            ("Framework", "Framework.cs", True),
+            ("Mouse", os.path.join("Mouse", "Mouse.cs"), True),
+            ("Mouse", os.path.join("Mouse", "MouseButton.cs"), False),
+            ("Timer", os.path.join("Timer", "Timer.cs"), True),
+        ], modules)
+
+        update_api_doc.update_api_doc(self.framework_dir, self.output)
+        with open(self.output, encoding="utf-8") as f:
+            markdown = f.read()
+        self.assertIn("## Engine.Physics\n\n### Types (Engine.Physics)\n\n- World", markdown)
+        self.assertIn("- NewWorld() - love.physics.newWorld", markdown)
+        self.assertIn("- Run() - love.framework.run", markdown)
+        self.assertNotIn("Generated", markdown)
+
+    def test_parallel_parse_matches_serial(self):
+        for index in range(8):
+            self.write(f"Graphics/Shape{index}.cs", f"namespace Night;\npublic struct Shape{index} {{ }}\n")
+        filepaths = [path for _, path, _ in update_api_doc.find_cs_files(self.framework_dir)]
+        serial = update_api_doc.parse_cs_files(filepaths, jobs=1)
+        original_min_bytes = update_api_doc.PARALLEL_MIN_BYTES
+        update_api_doc.PARALLEL_MIN_BYTES = 0
+        try:
+            cache = ParseCache(self.framework_dir, self.cache_dir)
+            parallel = update_api_doc.parse_cs_files(filepaths, cache, jobs=2)
+        finally:
+            update_api_doc.PARALLEL_MIN_BYTES = original_min_bytes
+        self.assertEqual(serial, parallel)
+        self.assertEqual(len(filepaths), cache.parsed)
+
+    def test_watch_regenerates_after_a_save(self):
+        original_wake = update_api_doc.WATCH_WAKE_INTERVAL
+        update_api_doc.WATCH_WAKE_INTERVAL = 0.05
+        cache = ParseCache(self.framework_dir, persistent=False)
+        stop = threading.Event()
+        watcher = threading.Thread(target=update_api_doc.watch_api_doc,
+                                   args=(self.framework_dir, self.output, cache, 1, 0.01, True, stop))
+        try:
+            watcher.start()
+            deadline = time.monotonic() + 10
+            while cache.parsed < 3 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.2) # Let the polling watcher take its first snapshot
+            self.write("Timer/Timer.cs", TIMER_CS.replace("GetTime", "GetDelta"), mtime=1_300_000_000)
+            markdown = ""
+            while "GetDelta" not in markdown and time.monotonic() < deadline:
+                time.sleep(0.05)
+                with open(self.output, encoding="utf-8") as f:
+                    markdown = f.read()
+        finally:
+            stop.set()
+            if watcher.is_alive():
+                watcher.join()
+            update_api_doc.WATCH_WAKE_INTERVAL = original_wake
+        self.assertIn("- GetDelta() - love.timer.getDelta", markdown)
+        self.assertEqual(4, cache.parsed)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_watch_writes_the_trace_when_stopped(self):
+        def watch(**kwargs):
+            with tracing.span("regenerate", "scan"):
+                pass
+            raise KeyboardInterrupt
+
+        trace_path = os.path.join(self.root, "trace.json")
+        with mock.patch.object(tracing, "tracer", tracing.Tracer()), \
+                mock.patch.object(update_api_doc, "watch_api_doc", side_effect=watch):
+            update_api_doc.main(["--watch", "--no-cache", "--trace", trace_path])
+        with open(trace_path, encoding="utf-8") as f:
+            names = {event["name"] for event in json.load(f)["traceEvents"] if event["ph"] == "X"}
+        self.assertEqual({"update_api_doc --watch", "regenerate"}, names)
+
+if __name__ == "__main__":
+    unittest.main()
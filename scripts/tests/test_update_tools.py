@@ -0,0 +1,92 @@
+"""Tests for update_tools' per-file delta extraction and asset matching."""
+import io
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from update_tools import extract_delta, match_platform_assets, safe_member_path # noqa: E402
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in members.items():
+            info = zipfile.ZipInfo(name)
+            info.external_attr = 0o755 << 16
+            zf.writestr(info, data)
+    buffer.seek(0)
+    return zipfile.ZipFile(buffer)
+
+class ExtractDeltaTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.dest = self._tmpdir.name
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def path(self, relative_path):
+        return os.path.join(self.dest, *relative_path.split("/"))
+
+    def test_writes_only_changed_members_and_removes_dropped_ones(self):
+        with _zip({"crunch": b"v1 binary", "docs/readme.txt": b"readme", "docs/old.txt": b"old"}) as zf:
+            files, stats = extract_delta(zf, self.dest)
+        self.assertEqual({"written": 3, "unchanged": 0, "removed": 0}, stats)
+        self.assertEqual({"size": 9, "crc32": f"{zipfile.crc32(b'v1 binary'):08x}"}, files["crunch"])
+        if os.name != "nt":
+            self.assertTrue(os.access(self.path("crunch"), os.X_OK))
+        os.utime(self.path("docs/readme.txt"), ns=(1_000_000_000, 1_000_000_000))
+        os.utime(self.path("crunch"), ns=(1_000_000_000, 1_000_000_000))
+
+        with _zip({"crunch": b"v2 binary", "docs/readme.txt": b"readme", "new/extra.dat": b"x"}) as zf:
+            new_files, stats = extract_delta(zf, self.dest, files)
+
+        self.assertEqual({"written": 2, "unchanged": 1, "removed": 1}, stats)
+        self.assertEqual(["crunch", "docs/readme.txt", "new/extra.dat"], list(new_files))
+        self.assertEqual(1_000_000_000, os.stat(self.path("docs/readme.txt")).st_mtime_ns)
+        self.assertNotEqual(1_000_000_000, os.stat(self.path("crunch")).st_mtime_ns)
+        with open(self.path("crunch"), "rb") as f:
+            self.assertEqual(b"v2 binary", f.read())
+        self.assertFalse(os.path.exists(self.path("docs/old.txt")))
+        self.assertTrue(os.path.exists(self.path("new/extra.dat")))
+
+    def test_leaves_unrecorded_files_alone(self):
+        os.makedirs(self.path("user"))
+        with open(self.path("user/notes.txt"), "w") as f:
+            f.write("mine")
+        with _zip({"crunch": b"binary"}) as zf:
+            _, stats = extract_delta(zf, self.dest, {"gone.txt": {"size": 1, "crc32": "00000000"}})
+        self.assertEqual(0, stats["removed"])
+        self.assertTrue(os.path.exists(self.path("user/notes.txt")))
+
+    def test_leaves_no_temporary_files_behind(self):
+        with open(self.path("crunch.tmp"), "wb") as f:
+            f.write(b"someone else's temporary file")
+        with _zip({"crunch": b"binary", "docs/readme.txt": b"readme"}) as zf:
+            extract_delta(zf, self.dest)
+        self.assertEqual(["crunch", "crunch.tmp", "docs"], sorted(os.listdir(self.dest)))
+        self.assertEqual(["readme.txt"], os.listdir(self.path("docs")))
+        with open(self.path("crunch.tmp"), "rb") as f:
+            self.assertEqual(b"someone else's temporary file", f.read())
+
+    def test_rejects_members_outside_the_target(self):
+        self.assertIsNone(safe_member_path("../evil"))
+        self.assertIsNone(safe_member_path("/etc/passwd"))
+        self.assertIsNone(safe_member_path("C:/evil"))
+        self.assertEqual("a/b", safe_member_path("a/./b"))
+
+class MatchPlatformAssetsTests(unittest.TestCase):
+    def test_keeps_the_first_zip_per_platform(self):
+        def asset(name):
+            return {"name": name, "browser_download_url": f"https://example.com/{name}"}
+        assets = [asset("crunch-linux.tar.gz"), asset("crunch-linux.zip"), asset("crunch-windows.zip"),
+                  asset("crunch-linux-debug.zip"), asset("crunch-macos.zip")]
+        matched = match_platform_assets(assets, {"linux": "linux", "macos": "macos", "windows": "windows"})
+        self.assertEqual([("linux", "crunch-linux.zip"), ("windows", "crunch-windows.zip"), ("macos", "crunch-macos.zip")],
+                         [(platform_key, matched_asset["name"]) for platform_key, matched_asset in matched])
+
+if __name__ == "__main__":
+    unittest.main()
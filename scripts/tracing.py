@@ -0,0 +1,94 @@
+"""Opt-in timing spans for the repo scripts, written in Chrome trace-event format.
+
+Pass --trace out.json to a script to record where its time goes (metadata lookups,
+downloads, extraction, installs, parsing, writing) and load the file in chrome://tracing
+or https://ui.perfetto.dev. Each span becomes a complete ("X") event on the thread that
+ran it, so concurrent workers show up as parallel tracks.
+
+Tracing is off unless a script enables it; span() then costs one attribute check.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+class Tracer:
+    """Collects trace events in memory until write() is called."""
+
+    def __init__(self):
+        self.enabled = False
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self._origin = time.perf_counter()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _record(self, event):
+        thread = threading.current_thread()
+        event.update(pid=os.getpid(), tid=thread.ident)
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, category="script", **args):
+        """Times the enclosed block as a complete event; args must be JSON-serialisable."""
+        start = self._now_us()
+        try:
+            yield args # Callers may add results (bytes, counts) to the span's args.
+        finally:
+            self._record({"name": name, "cat": category, "ph": "X", "ts": start,
+                          "dur": self._now_us() - start, "args": args})
+
+    def instant(self, name, category="script", **args):
+        """Records a point-in-time event."""
+        self._record({"name": name, "cat": category, "ph": "i", "s": "t", "ts": self._now_us(), "args": args})
+
+    def write(self, path, file=None):
+        """Writes the collected events as a Chrome trace JSON file, reporting it on file (default: stdout)."""
+        with self._lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                        for tid, name in self._threads.items()]
+            events = metadata + sorted(self._events, key=lambda event: event["ts"])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"Trace with {len(events) - len(metadata)} event(s) written to {path}", file=file)
+
+tracer = Tracer()
+
+def span(name, category="script", **args):
+    """Returns a context manager timing a block on the shared tracer, or a no-op when tracing is off."""
+    if not tracer.enabled:
+        return contextlib.nullcontext(args)
+    return tracer.span(name, category, **args)
+
+def add_trace_arguments(parser):
+    """Adds the shared --trace option to an argparse parser."""
+    parser.add_argument(
+        "--trace", metavar="OUT.json", default=None,
+        help="Record per-phase timing spans to a Chrome trace-event file (open in chrome://tracing or Perfetto)."
+    )
+
+@contextlib.contextmanager
+def trace_from_args(args, name, file=None):
+    """Enables tracing when --trace was given and writes the file when the block exits, even on failure.
+
+    The "trace written" message goes to file (default: stdout); scripts whose stdout is
+    parsed pass sys.stderr.
+    """
+    if not args.trace:
+        yield
+        return
+    tracer.enable()
+    try:
+        with tracer.span(name, "main"):
+            yield
+    finally:
+        tracer.write(args.trace, file)
@@ -1,6 +1,32 @@
+import argparse
+import hashlib
+import json
 import os
-import re
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+import cs_lexer
+from cs_lexer import parse_declarations
+from digests import sha256_file
+from file_watcher import DEFAULT_POLL_INTERVAL, SKIPPED_DIRS, open_watcher
+from download_cache import CACHE_DIR_ENV, default_cache_dir
+from tracing import add_trace_arguments, span, trace_from_args
+
+FRAMEWORK_DIR = os.path.join("src", "Night")
+OUTPUT_MD_FILE = os.path.join("docs", "API.md")
+# A file modified this soon before it was cached may change again within the same mtime
+# tick, so its content hash is checked on the next run even if size and mtime match.
+RACY_WINDOW_NS = 2 * 1000 ** 3
+DEFAULT_JOBS = os.cpu_count() or 1
+# Below this much source to parse, starting worker processes costs more than it saves.
+PARALLEL_MIN_BYTES = 1024 * 1024
+# Seconds to wait for a burst of saves to settle before regenerating in --watch mode
+DEFAULT_DEBOUNCE = 0.05
+# How often the watch loop wakes up to check whether it was asked to stop
+WATCH_WAKE_INTERVAL = 0.5
 
 def derive_love2d_api(class_name, method_name):
     """
@@ -19,122 +45,210 @@ def derive_love2d_api(class_name, method_name):
 
     return f"love.{module_name}.{love_method_name}"
 
-def parse_cs_file(filepath):
+class ParseCache:
     """
-    Parses a C# file to extract public static classes and their public static methods.
+    Per-file cache of parse_cs_file() results for one framework directory.
+    Entries are keyed by path and trusted while the file's size and mtime are unchanged;
+    otherwise the content hash decides whether the file really needs parsing again.
+    The whole cache is dropped when cs_lexer.py changes. A cache that is not persistent
+    lives in memory only (--watch --no-cache).
+    """
+
+    def __init__(self, framework_dir, cache_dir=None, persistent=True):
+        root = os.path.abspath(framework_dir)
+        key = hashlib.sha256(root.encode("utf-8")).hexdigest()[:16]
+        self.root = root
+        self.path = os.path.join(cache_dir or default_cache_dir(), "api-doc", f"{key}.json") if persistent else None
+        self.parser = sha256_file(cs_lexer.__file__)
+        self.entries = {}
+        self.hits = 0
+        self.parsed = 0
+        self._dirty = False
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("root") == root and data.get("parser") == self.parser:
+            self.entries = data.get("files", {})
+
+    def _key(self, filepath):
+        return os.path.relpath(os.path.abspath(filepath), self.root)
+
+    def get(self, filepath, stat):
+        """Returns the cached result for filepath if its size and mtime are unchanged, else None."""
+        entry = self.entries.get(self._key(filepath))
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        if entry["checked_ns"] - entry["mtime_ns"] < RACY_WINDOW_NS:
+            return None
+        self.hits += 1
+        return entry["result"]
+
+    def sha256(self, filepath):
+        """Returns the content hash recorded for filepath, or None."""
+        entry = self.entries.get(self._key(filepath))
+        return entry["sha256"] if entry else None
+
+    def put(self, filepath, stat, sha256, result=None):
+        """Records filepath's parse result and returns it.
+
+        A result of None means the content hash matched sha256(), so the cached result is
+        kept and only the recorded size and mtime are refreshed.
+        """
+        key = self._key(filepath)
+        if result is None:
+            result = self.entries[key]["result"]
+            self.hits += 1
+        else:
+            self.parsed += 1
+        self.entries[key] = {
+            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "checked_ns": time.time_ns(),
+            "sha256": sha256, "result": result,
+        }
+        self._dirty = True
+        return result
+
+    def invalidate(self, filepaths):
+        """Makes the next lookup of each file check its content hash, even if size and mtime look unchanged."""
+        for filepath in filepaths:
+            entry = self.entries.get(self._key(filepath))
+            if entry is not None:
+                entry["checked_ns"] = entry["mtime_ns"] # Inside the racy window
+
+    def prune(self, filepaths):
+        """Forgets every file not in filepaths, e.g. deleted ones."""
+        keep = {self._key(filepath) for filepath in filepaths}
+        for key in [key for key in self.entries if key not in keep]:
+            del self.entries[key]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty or self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"root": self.root, "parser": self.parser, "files": self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+def scan_cs_file(filepath, known_sha256=None):
+    """
+    Reads a C# file once and scans it for its public API.
+    Returns (stat, sha256, parse_declarations() result); the result is None when the
+    content hash equals known_sha256, since the caller already has it. Runs in worker processes.
+    """
+    stat = os.stat(filepath)
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if sha256 == known_sha256:
+        return stat, sha256, None
+    return stat, sha256, parse_declarations(data.decode('utf-8-sig'))
+
+def parse_cs_file(filepath, cache=None):
+    """
+    Returns parse_declarations() for a C# file, or None if it could not be read.
+    With a ParseCache, files whose size, mtime or content are unchanged are not parsed again.
     """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if cache is not None:
+            cached = cache.get(filepath, os.stat(filepath))
+            if cached is not None:
+                return cached
+        stat, sha256, result = scan_cs_file(filepath, cache.sha256(filepath) if cache is not None else None)
     except Exception as e:
         print(f"Error reading file {filepath}: {e}")
         return None
+    return cache.put(filepath, stat, sha256, result) if cache is not None else result
 
-    class_data = {}
-
-    # Regex to find public static classes
-    class_match = re.search(r"public\s+static\s+class\s+(\w+)", content)
-
-    if class_match:
-        class_name = class_match.group(1)
-        class_content_start = class_match.end()
-
-        # Rough way to get class content, assuming reasonably formatted code
-        # This might fail with complex nested structures or preprocessor directives
-        open_braces = 0
-        class_body_end = class_content_start
-        found_first_brace = False
-
-        for i in range(class_content_start, len(content)):
-            if content[i] == '{':
-                if not found_first_brace:
-                    found_first_brace = True
-                open_braces += 1
-            elif content[i] == '}':
-                open_braces -= 1
-                if found_first_brace and open_braces == 0:
-                    class_body_end = i
-                    break
-
-        class_body = content[class_match.end():class_body_end]
-
-        methods = defaultdict(list)
-        # Regex to find public static methods, including parameters
-        # This regex aims to capture [return_type] MethodName([params])
-        # Group 1: return_type (non-greedy)
-        # Group 2: method_name
-        # Group 3: params_str
-        method_pattern = re.compile(
-            r"public\s+static\s+(?:async\s+)?(.*?)\s+(\w+)\s*\(([^)]*)\)"
-        )
-
-        for method_match in method_pattern.finditer(class_body):
-            # Return type is group 1, method_name is group 2, params_str is group 3
-            method_name = method_match.group(2)
-            params_str = method_match.group(3).strip()
-
-            # Clean up parameter string: remove default values, extra spaces
-            params_list = []
-            if params_str:
-                raw_params = params_str.split(',')
-                for p in raw_params:
-                    p_cleaned = p.strip()
-                    # Remove default initializers like "= null" or "= 12"
-                    p_cleaned = re.sub(r"\s*=\s*.*", "", p_cleaned)
-                    params_list.append(p_cleaned)
-
-            full_signature = f"{method_name}({', '.join(params_list)})"
-            methods[method_name].append(full_signature)
-
-        if methods:
-            class_data[class_name] = dict(methods)
-
-    return class_data
-
-def parse_enums_cs_file(filepath):
+def parse_cs_files(filepaths, cache=None, jobs=DEFAULT_JOBS):
     """
-    Parses a C# file to extract public enums.
+    Parses many C# files, returning {filepath: parse_cs_file() result}.
+    Cache hits are answered from stat() alone; the remaining files are read and scanned
+    by a pool of jobs processes once there are enough bytes to repay the pool's startup.
+    Results are recorded in the cache in filepaths order, so they do not depend on which
+    worker finishes first.
     """
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        return [] # Silently return empty if file not found
-    except Exception as e:
-        print(f"Error reading enum file {filepath}: {e}")
-        return []
-
-    enums = []
-    # Regex to find public enums
-    enum_pattern = re.compile(r"public\s+enum\s+(\w+)")
-    for match in enum_pattern.finditer(content):
-        enums.append(match.group(1))
-    return sorted(list(set(enums)))
-
-def parse_types_cs_file(filepath):
+    results = {}
+    pending = []
+    pending_bytes = 0
+    for filepath in filepaths:
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            print(f"Error reading file {filepath}: {e}")
+            results[filepath] = None
+            continue
+        cached = cache.get(filepath, stat) if cache is not None else None
+        if cached is not None:
+            results[filepath] = cached
+        else:
+            pending.append(filepath)
+            pending_bytes += stat.st_size
+
+    known = [cache.sha256(filepath) if cache is not None else None for filepath in pending]
+    if jobs > 1 and len(pending) > 1 and pending_bytes >= PARALLEL_MIN_BYTES:
+        with span("parse in parallel", "parse", files=len(pending), bytes=pending_bytes):
+            with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+                futures = [executor.submit(scan_cs_file, filepath, sha256) for filepath, sha256 in zip(pending, known)]
+                scanned = []
+                for future in futures:
+                    try:
+                        scanned.append(future.result())
+                    except Exception as e:
+                        scanned.append(e)
+    else:
+        scanned = []
+        for filepath, sha256 in zip(pending, known):
+            with span("parse", "parse", file=filepath):
+                try:
+                    scanned.append(scan_cs_file(filepath, sha256))
+                except Exception as e:
+                    scanned.append(e)
+
+    for filepath, outcome in zip(pending, scanned):
+        if isinstance(outcome, Exception):
+            print(f"Error reading file {filepath}: {outcome}")
+            results[filepath] = None
+        else:
+            results[filepath] = cache.put(filepath, *outcome) if cache is not None else outcome[2]
+    return results
+
+def find_cs_files(framework_dir):
     """
-    Parses a C# file to extract public class names.
+    Walks framework_dir recursively and returns (module_name, filepath, is_main_file) for
+    every .cs file, sorted by module and path.
+    A directory is a module named after its path below framework_dir, so nested namespaces
+    such as Engine/Physics become "Engine.Physics"; its main file (Physics.cs) provides
+    the module's functions. A file directly in framework_dir (Framework.cs) is a module of
+    its own. Hidden directories and build output (bin, obj) are skipped.
     """
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        return [] # Silently return empty if file not found
-    except Exception as e:
-        print(f"Error reading types file {filepath}: {e}")
-        return []
+    found = []
+
+    def walk(directory, module_parts):
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIPPED_DIRS:
+                        walk(entry.path, module_parts + [entry.name])
+                elif entry.name.endswith(".cs") and entry.is_file():
+                    if module_parts:
+                        found.append((".".join(module_parts), entry.path, entry.name == f"{module_parts[-1]}.cs"))
+                    else:
+                        found.append((entry.name[:-len(".cs")], entry.path, True))
 
-    types = []
-    # Regex to find public classes (can be extended for structs, interfaces if needed)
-    # e.g., r"public\s+(?:class|struct|interface)\s+(\w+)"
-    class_pattern = re.compile(r"public\s+(?:class|struct)\s+(\w+)")
-    for match in class_pattern.finditer(content):
-        types.append(match.group(1))
-    return sorted(list(set(types)))
+    walk(framework_dir, [])
+    return sorted(found)
 
-def generate_markdown(all_module_data, output_file):
+def render_markdown(all_module_data):
     """
-    Generates a markdown file from the parsed API data.
+    Renders the parsed API data as markdown text.
     """
     markdown_lines = []
     markdown_lines.append(f"# Night / Love2D API\n")
@@ -190,94 +304,181 @@ def generate_markdown(all_module_data, output_file):
 
     # At end of document, add ONE blank line
     markdown_lines.append("")
+    return "\n".join(markdown_lines)
+
+def generate_markdown(all_module_data, output_file):
+    """
+    Generates a markdown file from the parsed API data.
+    The file is only rewritten when its text changes, so unchanged docs keep their mtime.
+    Returns True if the file was written.
+    """
+    markdown = render_markdown(all_module_data)
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            if f.read() == markdown:
+                print(f"Markdown documentation at {output_file} is up to date")
+                return False
+    except FileNotFoundError:
+        pass
 
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
-            f.write("\n".join(markdown_lines))
+            f.write(markdown)
         print(f"Markdown documentation generated at {output_file}")
+        return True
     except Exception as e:
         print(f"Error writing markdown file {output_file}: {e}")
+        return False
+
+def parse_args(argv=None):
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate docs/API.md from the public API in src/Night.")
+    parser.add_argument(
+        "--cache-dir", default=None,
+        help=f"Cache directory for per-file parse results (default: ${CACHE_DIR_ENV} or the per-user cache dir)."
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Parse every file again instead of using cached results.")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=DEFAULT_JOBS,
+        help=f"Number of processes to parse changed files with (default: {DEFAULT_JOBS})."
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running and regenerate the docs whenever a .cs file under src/Night changes; "
+             "with --trace, the trace is written when watching stops."
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=DEFAULT_DEBOUNCE,
+        help=f"With --watch, seconds without further changes to wait before regenerating (default: {DEFAULT_DEBOUNCE})."
+    )
+    parser.add_argument(
+        "--poll", action="store_true",
+        help=f"With --watch, poll every {DEFAULT_POLL_INTERVAL}s instead of using inotify."
+    )
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.watch:
+        cache = ParseCache(FRAMEWORK_DIR, args.cache_dir, persistent=not args.no_cache)
+        try:
+            # The trace covers the whole session and is written when watching stops.
+            with trace_from_args(args, "update_api_doc --watch"):
+                watch_api_doc(cache=cache, jobs=args.jobs, debounce=args.debounce, polling=args.poll)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+        return
+    cache = None if args.no_cache else ParseCache(FRAMEWORK_DIR, args.cache_dir)
+    with trace_from_args(args, "update_api_doc"):
+        update_api_doc(cache=cache, jobs=args.jobs)
 
-def main():
-    framework_dir = os.path.join("src", "Night")
-    output_md_file = os.path.join("docs", "API.md")
-
+def watch_api_doc(framework_dir=FRAMEWORK_DIR, output_md_file=OUTPUT_MD_FILE, cache=None, jobs=DEFAULT_JOBS,
+                  debounce=DEFAULT_DEBOUNCE, polling=False, stop=None):
+    """
+    Regenerates output_md_file, then keeps it current as .cs files under framework_dir change.
+    Bursts of changes are coalesced until debounce seconds pass without another, and only
+    the touched files are parsed again; the rest come from the in-memory cache. Runs until
+    interrupted, or until the stop threading.Event is set.
+    """
+    cache = cache if cache is not None else ParseCache(framework_dir, persistent=False)
+    update_api_doc(framework_dir, output_md_file, cache, jobs)
+    with open_watcher(framework_dir, ".cs", polling=polling) as watcher:
+        print(f"Watching {framework_dir} for changes ({watcher.kind}); press Ctrl+C to stop.")
+        while stop is None or not stop.is_set():
+            touched = watcher.changes(WATCH_WAKE_INTERVAL)
+            if not touched:
+                continue
+            while True:
+                more = watcher.changes(debounce)
+                if not more:
+                    break
+                touched |= more
+            started = time.perf_counter()
+            parsed_before = cache.parsed
+            cache.invalidate(touched)
+            update_api_doc(framework_dir, output_md_file, cache, jobs, verbose=False)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"  {len(touched)} changed file(s); parsed {cache.parsed - parsed_before} in {elapsed_ms:.0f} ms.")
+
+def update_api_doc(framework_dir=FRAMEWORK_DIR, output_md_file=OUTPUT_MD_FILE, cache=None, jobs=DEFAULT_JOBS,
+                   verbose=True):
+    """
+    Parses every module under framework_dir and regenerates output_md_file.
+    With a ParseCache only new or changed files are parsed. verbose=False drops the
+    per-module progress lines. Returns True if the file was written.
+    """
+    log = print if verbose else lambda *args: None
     all_module_data = defaultdict(lambda: {"functions": {}, "enums": [], "types": []})
 
     if not os.path.isdir(framework_dir):
         print(f"Error: Directory not found - {framework_dir}")
-        return
+        return False
 
-    # Iterate through subdirectories in framework_dir (each is a module)
-    for module_name in sorted(os.listdir(framework_dir)): # Sort for consistent processing order
-        module_path = os.path.join(framework_dir, module_name)
-        if os.path.isdir(module_path):
-            if module_name.startswith('.'): # Skip hidden directories like .git
-                continue
+    with span("find files", "scan"):
+        cs_files = find_cs_files(framework_dir)
+    parsed_files = parse_cs_files([filepath for _, filepath, _ in cs_files], cache, jobs)
 
-            print(f"Processing module: {module_name}...")
+    # Merge in sorted module and file order so the output never depends on parse order.
+    for module_name, module_files in groupby(cs_files, key=lambda item: item[0]):
+        module_files = list(module_files)
+        with span(module_name, "module"):
+            log(f"Processing module: {module_name}...")
 
             current_module_enums = set()
             current_module_types = set()
 
-            # Define the expected main module file for functions
-            main_module_cs_file_identifier = f"{module_name}.cs"
-            main_module_cs_file_path_expected = os.path.join(module_path, main_module_cs_file_identifier)
-
-            # 1. Parse main module file for functions if it exists
-            if os.path.exists(main_module_cs_file_path_expected):
-                print(f"  Parsing functions from main module file: {main_module_cs_file_path_expected}...")
-                parsed_functions_data = parse_cs_file(main_module_cs_file_path_expected)
-                if parsed_functions_data:
-                    for class_name_func, methods in parsed_functions_data.items():
-                        # Ensure the functions dict for this class_name_func exists
-                        if class_name_func not in all_module_data[module_name]["functions"]:
-                            all_module_data[module_name]["functions"][class_name_func] = defaultdict(list)
-
-                        for method_name, signatures in methods.items():
-                            all_module_data[module_name]["functions"][class_name_func][method_name].extend(signatures)
-                            all_module_data[module_name]["functions"][class_name_func][method_name] = \
-                                sorted(list(set(all_module_data[module_name]["functions"][class_name_func][method_name])))
-                else:
-                    print(f"    No functions found or error parsing in {main_module_cs_file_identifier}.")
-            else:
-                print(f"  Skipping functions: Main module file {main_module_cs_file_path_expected} not found.")
-
-            # 2. Iterate through ALL .cs files in the module directory for enums and types
-            print(f"  Scanning all .cs files in {module_path} for enums and types/structs...")
-            for item_name in sorted(os.listdir(module_path)):
-                item_path = os.path.join(module_path, item_name)
-                if os.path.isfile(item_path) and item_name.endswith(".cs"):
-                    # Parse for enums
-                    parsed_enums = parse_enums_cs_file(item_path)
-                    if parsed_enums:
-                        current_module_enums.update(parsed_enums)
-
-                    # Parse for types (classes/structs)
-                    parsed_types = parse_types_cs_file(item_path)
-                    if parsed_types:
-                        current_module_types.update(parsed_types)
+            # Functions come from the main module file; enums and types from every .cs file.
+            if not any(is_main for _, _, is_main in module_files):
+                log(f"  Skipping functions: Main module file {module_name.rsplit('.', 1)[-1]}.cs not found.")
+
+            for _, item_path, is_main in module_files:
+                parsed = parsed_files[item_path]
+                if parsed is None:
+                    continue
+                current_module_enums.update(parsed["enums"])
+                current_module_types.update(parsed["types"])
+                if not is_main:
+                    continue
+                if not parsed["functions"]:
+                    log(f"    No functions found in {os.path.basename(item_path)}.")
+                for class_name_func, methods in parsed["functions"].items():
+                    # Ensure the functions dict for this class_name_func exists
+                    if class_name_func not in all_module_data[module_name]["functions"]:
+                        all_module_data[module_name]["functions"][class_name_func] = defaultdict(list)
+
+                    for method_name, signatures in methods.items():
+                        all_module_data[module_name]["functions"][class_name_func][method_name].extend(signatures)
+                        all_module_data[module_name]["functions"][class_name_func][method_name] = \
+                            sorted(list(set(all_module_data[module_name]["functions"][class_name_func][method_name])))
 
             # Store aggregated enums and types
             if current_module_enums:
                 all_module_data[module_name]["enums"] = sorted(list(current_module_enums))
-                print(f"  Found {len(all_module_data[module_name]['enums'])} enums in module {module_name}.")
+                log(f"  Found {len(all_module_data[module_name]['enums'])} enums in module {module_name}.")
             else:
-                print(f"  No enums found in module {module_name}.")
+                log(f"  No enums found in module {module_name}.")
 
             if current_module_types:
                 all_module_data[module_name]["types"] = sorted(list(current_module_types))
-                print(f"  Found {len(all_module_data[module_name]['types'])} types/structs in module {module_name}.")
+                log(f"  Found {len(all_module_data[module_name]['types'])} types/structs in module {module_name}.")
             else:
-                print(f"  No types/structs found in module {module_name}.")
+                log(f"  No types/structs found in module {module_name}.")
 
-            print("") # Blank line after processing a module's files for readability in console
+        log("") # Blank line after processing a module's files for readability in console
+
+    if cache is not None:
+        log(f"Parsed {cache.parsed} file(s); reused {cache.hits} cached result(s).")
+        cache.prune(parsed_files)
+        with span("save parse cache", "write"):
+            cache.save()
 
     if all_module_data:
         os.makedirs(os.path.dirname(output_md_file), exist_ok=True)
-        generate_markdown(all_module_data, output_md_file)
-    else:
-        print("No API data parsed.")
+        with span("write markdown", "write", file=output_md_file):
+            return generate_markdown(all_module_data, output_md_file)
+    print("No API data parsed.")
+    return False
 
 if __name__ == "__main__":
     main()
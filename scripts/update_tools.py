@@ -1,60 +1,107 @@
+import argparse
+import contextlib
 import os
+import posixpath
 import requests
 import zipfile
 import shutil
 import json # Added for manifest handling
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bundle import BundleWriter, Mirror, add_bundle_arguments
+from digests import ChecksumMismatch, crc32_file, sha256_file
+from download_cache import add_cache_arguments, cache_from_args
+from downloader import (DEFAULT_SPILL_THRESHOLD, add_download_arguments, download_file, download_to_buffer,
+                        find_expected_sha256)
+from http_transport import api_url
+from release_metadata import add_metadata_arguments, fetch_json, metadata_cache_from_args
+from tracing import add_trace_arguments, span, trace_from_args
 
 # Configuration
+# Tools are declared in tools/manifest.json as {name: {"repo": "owner/name", "version": ...}};
+# an entry may also override "platforms" ({platform subdirectory: asset name substring}).
+# Updates record "files", {platform: {relative path: {"size", "crc32"}}}, which the next
+# update diffs against so unchanged files are left alone and removed ones are deleted.
+# DEFAULT_TOOLS supplies the repository for tools the manifest does not declare one for,
+# so a fresh checkout with no manifest still gets them.
 TOOL_NAME = "crunch"
-GITHUB_OWNER = "nightconcept"
-GITHUB_REPO = "crunch"
-GITHUB_API_URL_LATEST_RELEASE = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/latest"
+DEFAULT_TOOLS = {
+    "crunch": {"repo": "nightconcept/crunch"},
+}
+LATEST_RELEASE_PATH = "repos/{repo}/releases/latest"
+DEFAULT_JOBS = 4
 
-BASE_TARGET_DIR = os.path.join("tools", TOOL_NAME)
-MANIFEST_FILE_PATH = os.path.join("tools", "manifest.json")
+# The tools directory is passed to update_tools(); only the command line falls back to the
+# checkout this script lives in.
+DEFAULT_TOOLS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools")
+MANIFEST_FILE_NAME = "manifest.json"
 
 PLATFORM_IDENTIFIERS = {
     "linux": "linux",
     "macos": "macos",
     "windows": "windows"
 }
+COPY_BUFFER_SIZE = 1024 * 1024
 
 def ensure_dir_exists(path):
     """Ensures that a directory exists, creating it if necessary."""
     if not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
 
-def load_manifest():
+def load_manifest(tools_dir):
     """Loads the manifest file."""
-    ensure_dir_exists(os.path.dirname(MANIFEST_FILE_PATH))
-    if not os.path.exists(MANIFEST_FILE_PATH):
+    manifest_path = os.path.join(tools_dir, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
         return {}
     try:
-        with open(MANIFEST_FILE_PATH, 'r') as f:
+        with open(manifest_path, 'r') as f:
             return json.load(f)
     except (json.JSONDecodeError, FileNotFoundError):
         return {}
 
-def save_manifest(data):
+def save_manifest(tools_dir, data):
     """Saves data to the manifest file."""
-    ensure_dir_exists(os.path.dirname(MANIFEST_FILE_PATH))
-    with open(MANIFEST_FILE_PATH, 'w') as f:
+    ensure_dir_exists(tools_dir)
+    with open(os.path.join(tools_dir, MANIFEST_FILE_NAME), 'w') as f:
         json.dump(data, f, indent=4)
+        f.write("\n")
+
+def declared_tools(manifest_data, names=None):
+    """Returns {name: {"repo", "platforms"}} for the tools to update.
+
+    Covers every tool in the manifest plus DEFAULT_TOOLS, or only names when given. A tool
+    without a "repo" in either is returned with repo None.
+    """
+    if names is None:
+        names = list(dict.fromkeys([*manifest_data, *DEFAULT_TOOLS]))
+    tools = {}
+    for name in names:
+        entry = manifest_data.get(name, {})
+        default = DEFAULT_TOOLS.get(name, {})
+        tools[name] = {
+            "repo": entry.get("repo") or default.get("repo"),
+            "platforms": entry.get("platforms") or default.get("platforms") or PLATFORM_IDENTIFIERS,
+        }
+    return tools
 
-def get_latest_release_info():
-    """Fetches the latest release information from GitHub."""
-    print(f"Fetching latest release information for {GITHUB_OWNER}/{GITHUB_REPO}...")
+def get_latest_release_info(repo, metadata_cache=None):
+    """Fetches the latest release information for an owner/name repository, revalidating any cached copy."""
+    print(f"Fetching latest release information for {repo}...")
     try:
-        response = requests.get(GITHUB_API_URL_LATEST_RELEASE, timeout=30)
-        response.raise_for_status()
-        release_data = response.json()
+        release_data = fetch_json(api_url(LATEST_RELEASE_PATH.format(repo=repo)), metadata_cache)
+        if not release_data:
+            print("Error: Latest release information is not available from the offline bundle.")
+            return None
         version = release_data.get("tag_name")
         assets = release_data.get("assets", [])
         if not version or not assets:
             print("Error: Could not find version or assets in GitHub API response.")
             return None
 
-        print(f"Latest version found: {version}")
+        print(f"Latest version of {repo} found: {version}")
         return {"version": version, "assets": assets}
     except requests.exceptions.RequestException as e:
         print(f"Error fetching release info from GitHub: {e}")
@@ -64,102 +111,386 @@ def get_latest_release_info():
         return None
 
 
-def download_and_extract_asset(asset_name, asset_url, platform_subdir, base_download_path):
-    """Downloads a single asset and extracts it into a platform-specific subdirectory."""
+def safe_member_path(filename):
+    """Returns a zip member's path as a normalised relative POSIX path, or None if it would escape the target."""
+    path = posixpath.normpath(filename.replace("\\", "/"))
+    if path in (".", "") or path.startswith(("/", "../")) or path == ".." or ":" in path.split("/")[0]:
+        return None
+    return path
+
+def extract_delta(zip_ref, dest_dir, previous_files=None):
+    """Extracts only the members of zip_ref that differ from what is already in dest_dir.
+
+    A member is skipped when a file of the same size and CRC-32 is already on disk, so
+    unchanged binaries keep their mtime and downstream incremental builds stay valid.
+    Changed members are written to a temporary name and renamed into place. Files listed
+    in previous_files (the record from the last extraction) that the archive no longer
+    contains are deleted, along with directories they leave empty; other files in
+    dest_dir are never touched.
 
-    # Temporary download location for the zip file (e.g., in BASE_TARGET_DIR)
-    temp_zip_dir = base_download_path
-    # Use a generic name for the downloaded zip to avoid issues if asset_name is complex
-    # However, for clarity during download, asset_name is fine if it's just the filename.
-    zip_file_path = os.path.join(temp_zip_dir, asset_name)
+    Returns (files, stats): files is the new record, {relative path: {"size", "crc32"}},
+    for the manifest, and stats counts the members "written" and "unchanged" and the
+    files "removed".
+    """
+    files = {}
+    stats = {"written": 0, "unchanged": 0, "removed": 0}
+    ensure_dir_exists(dest_dir)
+    for info in zip_ref.infolist():
+        relative_path = safe_member_path(info.filename)
+        if relative_path is None:
+            print(f"  Warning: skipping unsafe archive member {info.filename}.")
+            continue
+        dest_path = os.path.join(dest_dir, *relative_path.split("/"))
+        if info.is_dir():
+            ensure_dir_exists(dest_path)
+            continue
+        files[relative_path] = {"size": info.file_size, "crc32": f"{info.CRC:08x}"}
+        try:
+            unchanged = os.path.getsize(dest_path) == info.file_size and crc32_file(dest_path) == info.CRC
+        except OSError:
+            unchanged = False
+        if unchanged:
+            stats["unchanged"] += 1
+            continue
 
-    ensure_dir_exists(temp_zip_dir) # Should already exist if base_download_path is BASE_TARGET_DIR
+        ensure_dir_exists(os.path.dirname(dest_path))
+        # A unique name per write, so concurrent updates never share a temporary file.
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(dest_path)}.", suffix=".tmp",
+                                        dir=os.path.dirname(dest_path))
+        try:
+            with zip_ref.open(info) as src, os.fdopen(fd, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            unix_mode = info.external_attr >> 16
+            if unix_mode:
+                os.chmod(tmp_path, unix_mode & 0o777)
+            os.replace(tmp_path, dest_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        stats["written"] += 1
 
+    for relative_path in sorted(set(previous_files or {}) - set(files)):
+        stale_path = os.path.join(dest_dir, *relative_path.split("/"))
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            continue
+        stats["removed"] += 1
+        parent = os.path.dirname(stale_path)
+        while os.path.abspath(parent) != os.path.abspath(dest_dir):
+            try:
+                os.rmdir(parent) # Only succeeds once the directory is empty
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+    return dict(sorted(files.items())), stats
+
+def download_asset(asset_url, dest_path, expected_sha256=None):
+    """Downloads a release asset from GitHub to dest_path, resuming and retrying on transient errors.
+
+    The asset is hashed while it streams in; a download that does not match expected_sha256
+    is deleted and ChecksumMismatch raised.
+    """
+    print(f"  Downloading from {asset_url}...")
+    return download_file(asset_url, dest_path, expected_sha256=expected_sha256)
+
+def download_and_extract_asset(asset_name, asset_url, platform_subdir, base_download_path, version=None, cache=None,
+                               mirror=None, bundle_writer=None, extract=True, expected_sha256=None,
+                               spill_threshold=DEFAULT_SPILL_THRESHOLD, cache_key=None, previous_files=None):
+    """Downloads a single asset and extracts it into a platform-specific subdirectory.
+
+    With a download cache the zip is reused from (or stored into) the cache; otherwise it
+    is buffered in memory (spilling to a temporary file only above spill_threshold bytes)
+    and extracted straight from there. A mirror serves the zip from an offline bundle
+    instead, and a bundle_writer records it into the bundle being exported. With
+    extract=False the zip is only fetched (used when exporting). A zip whose SHA-256 does
+    not match expected_sha256 is rejected before anything is extracted. cache_key replaces
+    version in the download cache key, keeping same-named assets of different tools apart.
+    Extraction goes through extract_delta(), with previous_files the platform's record
+    from the manifest.
+    Returns {"asset", "platform", "ok", "reason", "bytes", "seconds", "files", "written",
+    "unchanged", "removed"}; bytes counts what was downloaded, so cache and bundle hits
+    report 0, and files is the new per-file record (None when nothing was extracted).
+    """
     extract_to_path = os.path.join(base_download_path, platform_subdir)
-    ensure_dir_exists(extract_to_path)
+    started = time.perf_counter()
+    transferred = 0
+    files = None
+    stats = {"written": 0, "unchanged": 0, "removed": 0}
+
+    def outcome(reason=None):
+        return {"asset": asset_name, "platform": platform_subdir, "ok": reason is None, "reason": reason,
+                "bytes": transferred, "seconds": time.perf_counter() - started, "files": files, **stats}
 
     print(f"Processing {asset_name} for {platform_subdir}...")
     try:
-        print(f"  Downloading from {asset_url}...")
-        response = requests.get(asset_url, stream=True, timeout=60)
-        response.raise_for_status()
+        with span(asset_name, "asset", platform=platform_subdir, version=version), contextlib.ExitStack() as stack:
+            if mirror is not None:
+                zip_source = mirror.asset_path(asset_url)
+                if zip_source is None:
+                    print(f"  Error: {asset_name} is not in the offline bundle.")
+                    return outcome("Asset not in offline bundle")
+                if expected_sha256:
+                    actual_sha256 = sha256_file(zip_source)
+                    if actual_sha256 != expected_sha256:
+                        raise ChecksumMismatch(asset_name, expected_sha256, actual_sha256)
+            elif cache is not None:
+                def download_into_cache(dest):
+                    nonlocal transferred
+                    download_asset(asset_url, dest, expected_sha256)
+                    transferred = os.path.getsize(dest)
+                # Cached zips were verified when they were stored.
+                zip_source, cache_hit = cache.fetch(asset_name, cache_key or version, download_into_cache)
+                if cache_hit:
+                    print(f"  Using cached {asset_name}")
+            else:
+                print(f"  Downloading from {asset_url}...")
+                zip_source, _ = download_to_buffer(asset_url, spill_threshold, expected_sha256=expected_sha256)
+                stack.enter_context(zip_source)
+                transferred = zip_source.seek(0, os.SEEK_END)
+                zip_source.seek(0)
 
-        with open(zip_file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+            if bundle_writer is not None:
+                bundle_writer.add_asset(asset_url, asset_name, zip_source)
 
-        print(f"  Extracting to {extract_to_path}...")
-        with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_to_path)
+            if extract:
+                print(f"  Extracting to {extract_to_path}...")
+                with span("extract", "install", dest=extract_to_path) as trace_args, \
+                        zipfile.ZipFile(zip_source, 'r') as zip_ref:
+                    files, stats = extract_delta(zip_ref, extract_to_path, previous_files)
+                    trace_args.update(stats)
+                print(f"  {stats['written']} file(s) written, {stats['unchanged']} unchanged, {stats['removed']} removed.")
         print(f"  Successfully processed {asset_name}")
 
+    except ChecksumMismatch as e:
+        print(f"  Error: {e}; rejected before extraction.")
+        return outcome("Checksum mismatch")
     except requests.exceptions.RequestException as e:
         print(f"  Error downloading {asset_name}: {e}")
-        return False
+        return outcome(f"Download failed: {e}")
     except zipfile.BadZipFile:
         print(f"  Error: {asset_name} is not a valid zip file or is corrupted.")
-        return False
+        return outcome("Invalid zip file")
     except Exception as e:
         print(f"  An unexpected error occurred with {asset_name}: {e}")
-        return False
+        return outcome(f"Exception: {e}")
+    return outcome()
+
+def parse_args(argv=None):
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Download the latest releases of the tools declared in tools/manifest.json.")
+    parser.add_argument(
+        "--tools-dir", default=DEFAULT_TOOLS_DIR,
+        help="Directory holding manifest.json and one subdirectory per tool (default: this checkout's tools/)."
+    )
+    parser.add_argument(
+        "--tool", action="append", dest="tools", metavar="NAME",
+        help="Only update this tool; repeat for several (default: every tool in the manifest)."
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=DEFAULT_JOBS,
+        help=f"Number of release checks and asset downloads to run concurrently (default: {DEFAULT_JOBS})."
+    )
+    add_cache_arguments(parser)
+    add_download_arguments(parser)
+    add_metadata_arguments(parser)
+    add_bundle_arguments(parser)
+    add_trace_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+def main(argv=None):
+    """Main function to download and extract the declared tools."""
+    args = parse_args(argv)
+    cache = cache_from_args(args)
+    metadata_cache = metadata_cache_from_args(args)
+    mirror = None
+    bundle_writer = None
+    if args.mirror:
+        print(f"Using offline bundle {args.mirror}; no network access.")
+        mirror = Mirror(args.mirror)
+        metadata_cache = mirror
+    elif args.export_bundle:
+        bundle_writer = BundleWriter(args.export_bundle, metadata_cache)
+        metadata_cache = bundle_writer
+
+    try:
+        with trace_from_args(args, "update_tools"):
+            result = update_tools(args.tools_dir, args.tools, args.jobs, cache, metadata_cache, mirror, bundle_writer,
+                                  args.spill_threshold)
+        if bundle_writer is not None and result["ok"]:
+            bundle_writer.close()
     finally:
-        if os.path.exists(zip_file_path):
-            os.remove(zip_file_path)
-    return True
+        if mirror is not None:
+            mirror.close()
+    return 0 if result["ok"] else 1
 
-def main():
-    """Main function to download and extract crunch tools."""
-    print(f"Starting update process for {TOOL_NAME} tools into {BASE_TARGET_DIR}...")
-    ensure_dir_exists(BASE_TARGET_DIR)
+def plan_tools(tools_dir, names=None):
+    """Reads the manifest in tools_dir and returns the plan the other update phases share.
 
-    manifest_data = load_manifest()
-    current_tool_info = manifest_data.get(TOOL_NAME, {})
-    current_version = current_tool_info.get("version")
+    "tools" holds declared_tools() for names (default: every declared tool) and "results"
+    one result per tool, filled in by tool_asset_jobs() and finish_tools().
+    """
+    manifest_data = load_manifest(tools_dir)
+    tools = declared_tools(manifest_data, names)
+    print(f"Checking {len(tools)} tool(s) for updates into {tools_dir}: {', '.join(tools)}")
+    results = {}
+    for name in tools:
+        results[name] = {"tool": name, "ok": False, "status": "failed",
+                         "previous_version": manifest_data.get(name, {}).get("version"),
+                         "version": None, "seconds": 0.0, "bytes": 0, "assets": []}
+    return {"started": time.perf_counter(), "tools_dir": tools_dir, "manifest": manifest_data, "tools": tools,
+            "results": results}
 
-    latest_release_info = get_latest_release_info()
-    if not latest_release_info:
-        print(f"Could not retrieve latest release information for {TOOL_NAME}. Exiting.")
-        return
+def check_tool(plan, name, metadata_cache=None):
+    """Fetches a tool's latest release, returning get_latest_release_info() or None; safe to run on a worker thread."""
+    check_started = time.perf_counter()
+    with span(f"check {name}", "metadata"):
+        latest = get_latest_release_info(plan["tools"][name]["repo"], metadata_cache) if plan["tools"][name]["repo"] else None
+    plan["results"][name]["seconds"] += time.perf_counter() - check_started
+    return latest
 
-    latest_version = latest_release_info["version"]
+def tool_asset_jobs(plan, name, latest, bundle_writer=None):
+    """Turns a tool's latest release (or None) into process_tool_asset() jobs: [(name, platform_key, asset, assets), ...]."""
+    result = plan["results"][name]
+    if not plan["tools"][name]["repo"]:
+        print(f"Error: {name} declares no repository in {MANIFEST_FILE_NAME}. Skipping.")
+        return []
+    if not latest:
+        print(f"Could not retrieve latest release information for {name}. Skipping.")
+        return []
+    result["version"] = latest["version"]
+    current_version = result["previous_version"]
+    if current_version == latest["version"]:
+        print(f"{name} is already up to date (Version: {current_version}).")
+        result.update(ok=True, status="up-to-date")
+        if bundle_writer is None:
+            return []
+        print(f"Fetching the {name} assets for the bundle export...")
+    else:
+        print(f"New version of {name} available: {latest['version']}. (Current: {current_version or 'None'})")
+    return [(name, platform_key, asset, latest["assets"])
+            for platform_key, asset in match_platform_assets(latest["assets"], plan["tools"][name]["platforms"])]
 
-    if current_version == latest_version:
-        print(f"{TOOL_NAME} is already up to date (Version: {current_version}).")
-        return
+def process_tool_asset(plan, job, cache=None, mirror=None, bundle_writer=None, spill_threshold=DEFAULT_SPILL_THRESHOLD):
+    """Runs one tool_asset_jobs() job on a worker thread, returning the download_and_extract_asset() outcome."""
+    name, platform_key, asset, release_assets = job
+    result = plan["results"][name]
+    expected_sha256 = find_expected_sha256(release_assets, asset["name"], mirror, bundle_writer)
+    if not expected_sha256:
+        print(f"  Warning: {asset['name']} has no published SHA-256; it cannot be verified.")
+    return download_and_extract_asset(asset["name"], asset["browser_download_url"], platform_key,
+                                      os.path.join(plan["tools_dir"], name), result["version"], cache, mirror,
+                                      bundle_writer, extract=result["status"] != "up-to-date",
+                                      expected_sha256=expected_sha256, spill_threshold=spill_threshold,
+                                      cache_key=f"{name}@{result['version']}",
+                                      previous_files=plan["manifest"].get(name, {}).get("files", {}).get(platform_key))
 
-    print(f"New version of {TOOL_NAME} available: {latest_version}. (Current: {current_version or 'None'})")
-    print("Attempting to download and extract new version...")
+def finish_tools(plan, completed):
+    """Records finished process_tool_asset() jobs in the manifest and returns the update result.
 
-    all_successful_this_run = True
-    assets_processed_count = 0
+    completed is a list of (job, outcome) pairs. The manifest is written once, recording
+    each tool whose assets all succeeded. The result is JSON-serialisable:
+    {"ok", "seconds", "bytes", "tools"}, where tools holds one result per tool:
+    {"tool", "ok", "status", "previous_version", "version", "seconds", "bytes", "assets"}
+    with status "updated", "up-to-date" or "failed"; its seconds are the time spent on
+    that tool's release check and assets, summed across workers.
+    """
+    manifest_data = plan["manifest"]
+    results = plan["results"]
+    for job, outcome in completed:
+        results[job[0]]["assets"].append(outcome)
+        if not outcome["ok"]:
+            print(f"Failed to process asset {outcome['asset']} for platform {outcome['platform']}.")
 
-    for asset in latest_release_info["assets"]:
-        asset_name = asset.get("name", "").lower()
-        asset_url = asset.get("browser_download_url")
+    manifest_changed = False
+    for name, result in results.items():
+        outcomes = result["assets"]
+        result["bytes"] = sum(outcome["bytes"] for outcome in outcomes)
+        result["seconds"] += sum(outcome["seconds"] for outcome in outcomes)
+        if result["status"] == "up-to-date":
+            if not all(outcome["ok"] for outcome in outcomes):
+                result.update(ok=False, status="failed")
+            continue
+        if result["version"] is None:
+            continue
+        if outcomes and all(outcome["ok"] for outcome in outcomes):
+            entry = dict(manifest_data.get(name, {}))
+            entry.update(repo=plan["tools"][name]["repo"], version=result["version"])
+            entry["files"] = dict(sorted({**entry.get("files", {}),
+                                          **{outcome["platform"]: outcome["files"] for outcome in outcomes}}.items()))
+            manifest_data[name] = entry
+            manifest_changed = True
+            result.update(ok=True, status="updated")
+            print(f"{name} successfully updated to version {result['version']} ({len(outcomes)} asset(s) processed).")
+        elif not outcomes:
+            print(f"No suitable assets found for {name} in version {result['version']}.")
+        else:
+            print(f"Some assets for {name} version {result['version']} failed to download or extract. Not recorded in the manifest.")
 
-        if not asset_name or not asset_url or not asset_name.endswith(".zip"):
-            continue # Skip if not a zip or missing essential info
+    if manifest_changed:
+        with span("write manifest", "plan"):
+            save_manifest(plan["tools_dir"], manifest_data)
+    tool_results = list(results.values())
+    return {
+        "ok": all(result["ok"] for result in tool_results),
+        "seconds": time.perf_counter() - plan["started"],
+        "bytes": sum(result["bytes"] for result in tool_results),
+        "tools": tool_results,
+    }
+
+def update_tools(tools_dir, names=None, jobs=DEFAULT_JOBS, cache=None, metadata_cache=None, mirror=None,
+                 bundle_writer=None, spill_threshold=DEFAULT_SPILL_THRESHOLD):
+    """Brings the tools declared in tools_dir/manifest.json up to their latest releases.
+
+    names restricts the update to those tools. Latest-release checks for every tool run
+    concurrently, then the platform zips of every outdated tool are downloaded and
+    extracted by one shared pool of jobs workers, so updating several tools takes about
+    as long as updating the slowest.
 
-        processed_for_platform = False
-        for platform_key, id_string in PLATFORM_IDENTIFIERS.items():
+    The caches, mirror and bundle_writer are the objects the command line builds from its
+    options; callers keep ownership and close them. Returns finish_tools().
+    """
+    plan = plan_tools(tools_dir, names)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        latest_by_tool = dict(zip(plan["tools"], executor.map(lambda name: check_tool(plan, name, metadata_cache), plan["tools"])))
+        # Plan every (tool, platform zip) pair, then run them all in the same pool.
+        pending = []
+        for name, latest in latest_by_tool.items():
+            pending.extend(tool_asset_jobs(plan, name, latest, bundle_writer))
+        if pending:
+            print(f"\nProcessing {len(pending)} asset(s) with {min(jobs, len(pending))} worker(s)...")
+        # Collect in submission order so the output and manifest do not depend on completion order.
+        outcomes = executor.map(lambda job: process_tool_asset(plan, job, cache, mirror, bundle_writer, spill_threshold), pending)
+        completed = list(zip(pending, outcomes))
+    return finish_tools(plan, completed)
+
+def update_tool(tools_dir, name=TOOL_NAME, cache=None, metadata_cache=None, mirror=None, bundle_writer=None,
+                spill_threshold=DEFAULT_SPILL_THRESHOLD):
+    """Updates a single tool, returning its entry from update_tools()."""
+    return update_tools(tools_dir, [name], 1, cache, metadata_cache, mirror, bundle_writer, spill_threshold)["tools"][0]
+
+def match_platform_assets(assets, platforms):
+    """Pairs each platform with the first .zip asset whose lowercased name contains its identifier.
+
+    Later assets matching an already paired platform are ignored, so each platform is
+    extracted once. Returns [(platform_key, asset), ...] in release asset order.
+    """
+    matched = []
+    seen_platforms = set()
+    for asset in assets:
+        asset_name = asset.get("name", "").lower()
+        if not asset_name or not asset.get("browser_download_url") or not asset_name.endswith(".zip"):
+            continue # Skip if not a zip or missing essential info
+        for platform_key, id_string in platforms.items():
             if id_string in asset_name:
-                if not download_and_extract_asset(asset.get("name"), asset_url, platform_key, BASE_TARGET_DIR):
-                    all_successful_this_run = False
-                    print(f"Failed to process asset {asset.get('name')} for platform {platform_key}.")
-                else:
-                    assets_processed_count += 1
-                processed_for_platform = True
+                if platform_key not in seen_platforms:
+                    seen_platforms.add(platform_key)
+                    matched.append((platform_key, asset))
                 break # Asset matched a platform
-
-    if all_successful_this_run and assets_processed_count > 0:
-        manifest_data[TOOL_NAME] = {"version": latest_version}
-        save_manifest(manifest_data)
-        print(f"{TOOL_NAME} successfully updated to version {latest_version}.")
-        print(f"{assets_processed_count} asset(s) processed.")
-    elif assets_processed_count == 0:
-        print(f"No suitable assets found for {TOOL_NAME} in version {latest_version}.")
-    else:
-        print(f"Some assets for {TOOL_NAME} version {latest_version} failed to download or extract. Manifest not updated.")
+    return matched
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())